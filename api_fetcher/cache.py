@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from urllib.parse import urlencode
+
+from api_fetcher.logging import logger
+
+
+CACHE_DIR = Path(".api_cache")
+CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_SIZE = 100 * 1024 ** 2
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+
+@dataclass
+class CacheEntry:
+    """
+    Validators and metadata of a cached response.
+
+    Attributes:
+        key (str): Cache key of the request.
+        url (str): Request URL with its query string.
+        headers (dict[str, str]): The response headers from CACHED_HEADERS.
+        size (int): Size of the cached body in bytes.
+        stored_at (float): Unix time the response was stored or last revalidated.
+    """
+
+    key: str
+    url: str
+    headers: dict[str, str]
+    size: int
+    stored_at: float
+
+    def conditional_headers(self) -> dict[str, str]:
+        """
+        Returns the If-None-Match and If-Modified-Since headers revalidating the entry.
+        """
+        headers = {}
+
+        if "ETag" in self.headers:
+            headers["If-None-Match"] = self.headers["ETag"]
+        if "Last-Modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk cache of responses keyed by URL, revalidated with conditional requests.
+
+    Every entry is a body file and a JSON metadata file in `directory`.
+    New and revalidated entries are only staged: the body is written to a
+    temporary file, and the entries are committed once the data of the
+    run has been stored, so a failed run never leaves behind an entry
+    whose data was not written. On commit, entries older than `ttl`
+    seconds are evicted, then the least recently stored or revalidated
+    ones until the bodies fit in `max_size` bytes.
+    """
+
+    def __init__(
+            self,
+            directory: Path = CACHE_DIR,
+            ttl: float = CACHE_TTL,
+            max_size: int = CACHE_MAX_SIZE,
+            clock: Callable[[], float] = time.time,
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._staged: dict[str, CacheEntry] = {}
+
+    @staticmethod
+    def make_key(url: str, params: Mapping | None = None) -> str:
+        if params:
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    @staticmethod
+    def is_cacheable(headers: Mapping[str, str]) -> bool:
+        """
+        Tells whether a response has an ETag or Last-Modified validator to be revalidated with.
+        """
+        return "ETag" in headers or "Last-Modified" in headers
+
+    def _meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _body_path(self, key: str) -> Path:
+        return self.directory / f"{key}.body"
+
+    def get(self, key: str) -> CacheEntry | None:
+        """
+        Returns the committed entry of a key, unless it is missing, unreadable or expired.
+        """
+        try:
+            entry = CacheEntry(**json.loads(self._meta_path(key).read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        if self._clock() - entry.stored_at > self.ttl or not self._body_path(key).exists():
+            return None
+
+        return entry
+
+    def read_body(self, entry: CacheEntry) -> bytes:
+        return self._body_path(entry.key).read_bytes()
+
+    def stage(self, key: str, url: str, headers: Mapping[str, str], body: bytes) -> None:
+        """
+        Stages a response for the next commit, if it has an ETag or Last-Modified validator.
+
+        Args:
+            key (str): Cache key of the request.
+            url (str): Request URL.
+            headers (Mapping[str, str]): Response headers.
+            body (bytes): Response body.
+        """
+        if not self.is_cacheable(headers):
+            return
+
+        cached_headers = {name: headers[name] for name in CACHED_HEADERS if name in headers}
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._body_path(key).with_suffix(".body.tmp").write_bytes(body)
+        self._staged[key] = CacheEntry(key, url, cached_headers, len(body), self._clock())
+
+    def revalidated(self, entry: CacheEntry) -> None:
+        """
+        Stages the renewal of an entry the server answered with 304 Not Modified.
+        """
+        self._staged[entry.key] = CacheEntry(entry.key, entry.url, entry.headers, entry.size, self._clock())
+
+    def commit(self) -> None:
+        """
+        Writes the staged entries and evicts expired and least recently stored ones.
+        """
+        for key, entry in self._staged.items():
+            staged_body = self._body_path(key).with_suffix(".body.tmp")
+
+            if staged_body.exists():
+                os.replace(staged_body, self._body_path(key))
+
+            staged_meta = self._meta_path(key).with_suffix(".json.tmp")
+            staged_meta.write_text(json.dumps(asdict(entry)), encoding="utf-8")
+            os.replace(staged_meta, self._meta_path(key))
+
+        self._staged.clear()
+        self.evict()
+
+    def discard(self) -> None:
+        """
+        Drops the staged entries, keeping the committed ones.
+        """
+        for key in self._staged:
+            self._body_path(key).with_suffix(".body.tmp").unlink(missing_ok=True)
+
+        self._staged.clear()
+
+    def evict(self) -> int:
+        """
+        Removes expired entries, then the least recently stored ones until the bodies fit in max_size.
+
+        Returns:
+            int: Number of removed entries.
+        """
+        if not self.directory.exists():
+            return 0
+
+        entries = []
+        removed = 0
+
+        for meta_path in self.directory.glob("*.json"):
+            entry = self.get(meta_path.stem)
+
+            if entry is None:
+                self._remove(meta_path.stem)
+                removed += 1
+            else:
+                entries.append(entry)
+
+        # Bodies left without metadata by an interrupted commit.
+        known = {entry.key for entry in entries}
+        for body_path in self.directory.glob("*.body"):
+            if body_path.stem not in known:
+                body_path.unlink(missing_ok=True)
+
+        total_size = sum(entry.size for entry in entries)
+
+        for entry in sorted(entries, key=lambda entry: entry.stored_at):
+            if total_size <= self.max_size:
+                break
+
+            self._remove(entry.key)
+            total_size -= entry.size
+            removed += 1
+
+        if removed:
+            logger.info(f"Evicted {removed} responses from the cache.")
+
+        return removed
+
+    def _remove(self, key: str) -> None:
+        self._meta_path(key).unlink(missing_ok=True)
+        self._body_path(key).unlink(missing_ok=True)
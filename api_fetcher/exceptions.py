@@ -30,3 +30,9 @@ class APIDataError(BaseAPIRequestError):
 
     def __init__(self, message="API returned not json."):
         super().__init__(message)
+
+
+class APICircuitOpenError(BaseAPIRequestError):
+
+    def __init__(self, message="API is unavailable, requests are suspended by the circuit breaker."):
+        super().__init__(message)
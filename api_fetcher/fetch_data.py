@@ -1,10 +1,13 @@
 import asyncio
 import json
+import math
+from collections.abc import AsyncIterable, AsyncIterator
 
 import aiohttp
 from pydantic import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
+from api_fetcher.cache import ResponseCache
 from api_fetcher.database.models.posts import PostModel
 from api_fetcher.exceptions import (
     APITimeoutError,
@@ -12,12 +15,24 @@ from api_fetcher.exceptions import (
     APIResponseError,
     APIDataError,
 )
+from api_fetcher.json_stream import CHUNK_SIZE, iter_json_array
+from api_fetcher.rate_limiter import TokenBucket
+from api_fetcher.retry import NO_RETRY, CircuitBreaker, RetryPolicy, request
 from api_fetcher.schemas import PostSchema
+from api_fetcher.session import ConnectionStats, create_session
 from api_fetcher.storages import write_to_db, write_to_csv
 from api_fetcher.logging import logger
 
 
 JSONPLACEHOLDER_URL = "https://jsonplaceholder.typicode.com/posts"
+PAGE_SIZE = 100
+CONCURRENCY = 10
+BATCH_SIZE = 1000
+# Requests per second over all concurrent requests; throttling lowers it for the rest of the run.
+RATE_LIMIT = 20.0
+# Consecutive failures opening the circuit breaker, above CONCURRENCY so that a single blip
+# failing every request in flight does not open it.
+FAILURE_THRESHOLD = 2 * CONCURRENCY
 
 
 def validate_json(data: list[dict]) -> list[PostSchema]:
@@ -77,12 +92,13 @@ def create_post_instances(data: list[dict]) -> list[PostModel]:
     return posts
 
 
-async def get_posts(session: aiohttp.ClientSession) -> list[dict]:
+async def get_posts(session: aiohttp.ClientSession, retry: RetryPolicy = NO_RETRY) -> list[dict]:
     """
     Asynchronous function for sending requests to API and receiving the necessary data.
 
     Args:
         session (aiohttp.ClientSession): An active aiohttp session used to send HTTP requests.
+        retry (RetryPolicy): Retries of transient failures.
 
     Returns:
         list[dict]:
@@ -94,11 +110,12 @@ async def get_posts(session: aiohttp.ClientSession) -> list[dict]:
         APIConnectionError: If there is a connection error.
         APIResponseError: If the API returns a non-200 status code.
         APIDataError: If the API response contains invalid JSON.
+        APICircuitOpenError: If the circuit breaker suspended requests.
 
     """
     logger.info(f"Sending API request: {JSONPLACEHOLDER_URL}.")
     try:
-        async with session.get(JSONPLACEHOLDER_URL) as response:
+        async with request(session, "GET", JSONPLACEHOLDER_URL, retry) as response:
             if response.status == 200:
                 try:
                     json_response = await response.json()
@@ -119,6 +136,311 @@ async def get_posts(session: aiohttp.ClientSession) -> list[dict]:
         raise APITimeoutError()
 
 
+async def get_page(
+        session: aiohttp.ClientSession,
+        page: int,
+        limit: int = PAGE_SIZE,
+        url: str = JSONPLACEHOLDER_URL,
+        retry: RetryPolicy = NO_RETRY,
+        cache: ResponseCache | None = None,
+) -> tuple[list[dict] | None, int | None]:
+    """
+    Asynchronous function for requesting a single page of posts.
+
+    The body is parsed incrementally while it is received. With a cache,
+    a page cached by a previous run is requested conditionally; if the
+    server answers 304 Not Modified, the page is neither read nor parsed.
+
+    Args:
+        session (aiohttp.ClientSession): An active aiohttp session used to send HTTP requests.
+        page (int): Number of the page, starting at 1.
+        limit (int): Number of posts per page.
+        url (str): URL of the paginated collection.
+        retry (RetryPolicy): Retries of transient failures.
+        cache (ResponseCache | None): Cache of the pages of previous runs.
+
+    Returns:
+        tuple[list[dict] | None, int | None]:
+            The posts of the page, or None if it was not modified since it was cached,
+            and the total number of posts from the X-Total-Count header of the response,
+            or None if it is missing.
+
+    Raises:
+        APITimeoutError: If the request times out.
+        APIConnectionError: If there is a connection error.
+        APIResponseError: If the API returns a non-200 status code.
+        APIDataError: If the API response contains invalid JSON.
+        APICircuitOpenError: If the circuit breaker suspended requests.
+    """
+    params = {"_page": page, "_limit": limit}
+    key = ResponseCache.make_key(url, params)
+    entry = cache.get(key) if cache is not None else None
+    headers = entry.conditional_headers() if entry is not None else None
+
+    try:
+        async with request(session, "GET", url, retry, params=params, headers=headers) as response:
+            if response.status == 304 and entry is not None:
+                cache.revalidated(entry)
+                # The collection may have grown since the page was cached, so the cached total is not used.
+                total_count = response.headers.get("X-Total-Count")
+
+                return None, int(total_count) if total_count is not None else None
+
+            if response.status == 200:
+                # The raw body is only kept if the page is going to be cached.
+                body = bytearray() if cache is not None and ResponseCache.is_cacheable(response.headers) else None
+
+                async def read_chunks() -> AsyncIterator[bytes]:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        if body is not None:
+                            body.extend(chunk)
+                        yield chunk
+
+                try:
+                    json_response = [post async for post in iter_json_array(read_chunks())]
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    logger.error(f"Error processing json response of page {page}.", exc_info=True)
+                    raise APIDataError()
+
+                total_count = response.headers.get("X-Total-Count")
+
+                # Empty pages are not cached, so that a page past the end always ends the pagination.
+                if body is not None and json_response:
+                    cache.stage(key, str(response.url), response.headers, bytes(body))
+
+                return json_response, int(total_count) if total_count is not None else None
+
+            logger.warning(f"API returned error {response.status} for page {page}")
+            raise APIResponseError(status_code=response.status)
+    except aiohttp.ClientConnectionError:
+        logger.error(f"Error connecting to API for page {page}.", exc_info=True)
+        raise APIConnectionError()
+    except asyncio.TimeoutError:
+        logger.error(f"Response timeout exceeded for page {page}.", exc_info=True)
+        raise APITimeoutError()
+
+
+async def iter_post_pages(
+        session: aiohttp.ClientSession,
+        limit: int = PAGE_SIZE,
+        concurrency: int = CONCURRENCY,
+        url: str = JSONPLACEHOLDER_URL,
+        retry: RetryPolicy = NO_RETRY,
+        cache: ResponseCache | None = None,
+) -> AsyncIterator[list[dict]]:
+    """
+    Fetches all pages of posts concurrently and yields them as they complete.
+
+    The first page tells the total number of posts through the
+    X-Total-Count header; the remaining pages are then requested at once,
+    with at most `concurrency` requests in flight over the shared session.
+    Without the header, pages are requested in waves of `concurrency`
+    until a page comes back short. If a request fails, the pending
+    requests are cancelled and the error is raised. Pages that were not
+    modified since they were cached are skipped.
+
+    Args:
+        session (aiohttp.ClientSession): An active aiohttp session used to send HTTP requests.
+        limit (int): Number of posts per page.
+        concurrency (int): Maximum number of requests in flight.
+        url (str): URL of the paginated collection.
+        retry (RetryPolicy): Retries of transient failures, shared by all pages.
+        cache (ResponseCache | None): Cache of the pages of previous runs.
+
+    Yields:
+        list[dict]: The posts of a page, in order of completion.
+
+    Raises:
+        APITimeoutError: If a request times out.
+        APIConnectionError: If there is a connection error.
+        APIResponseError: If the API returns a non-200 status code.
+        APIDataError: If an API response contains invalid JSON.
+        APICircuitOpenError: If the circuit breaker suspended requests.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(page: int) -> tuple[list[dict] | None, int | None]:
+        async with semaphore:
+            return await get_page(session, page, limit, url, retry, cache)
+
+    async def fetch_as_completed(pages: range) -> AsyncIterator[list[dict] | None]:
+        tasks = [asyncio.ensure_future(fetch(page)) for page in pages]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                posts, _ = await task
+                yield posts
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    logger.info(f"Sending paginated API requests: {url}, {limit} records per page.")
+    posts, total_count = await fetch(1)
+    received = len(posts) if posts is not None else 0
+    not_modified = int(posts is None)
+
+    if posts:
+        yield posts
+
+    if total_count is not None:
+        async for posts in fetch_as_completed(range(2, math.ceil(total_count / limit) + 1)):
+            if posts is None:
+                not_modified += 1
+                continue
+
+            received += len(posts)
+            yield posts
+    else:
+        next_page = 2
+        # A page that was not modified is taken as full; the empty page past the end is never cached.
+        more_pages = posts is None or len(posts) == limit
+
+        while more_pages:
+            pages = range(next_page, next_page + concurrency)
+            next_page += concurrency
+
+            async for posts in fetch_as_completed(pages):
+                if posts is None:
+                    not_modified += 1
+                    continue
+
+                received += len(posts)
+
+                if len(posts) < limit:
+                    more_pages = False
+                if posts:
+                    yield posts
+
+    logger.info(f"Successful paginated API responses: {received} records received, {not_modified} pages not modified.")
+
+
+async def iter_posts(
+        session: aiohttp.ClientSession,
+        url: str = JSONPLACEHOLDER_URL,
+        retry: RetryPolicy = NO_RETRY,
+) -> AsyncIterator[dict]:
+    """
+    Streams the posts of a single large response one at a time.
+
+    Unlike get_posts, the body is never held in memory as a whole: it is
+    read in chunks and every post is yielded as soon as it is decoded.
+
+    Args:
+        session (aiohttp.ClientSession): An active aiohttp session used to send HTTP requests.
+        url (str): URL returning a JSON array of posts.
+        retry (RetryPolicy): Retries of transient failures before the body is read.
+
+    Yields:
+        dict: A post retrieved from the API.
+
+    Raises:
+        APITimeoutError: If the request times out.
+        APIConnectionError: If there is a connection error.
+        APIResponseError: If the API returns a non-200 status code.
+        APIDataError: If the API response is not a JSON array.
+        APICircuitOpenError: If the circuit breaker suspended requests.
+    """
+    logger.info(f"Sending streaming API request: {url}.")
+    try:
+        async with request(session, "GET", url, retry) as response:
+            if response.status != 200:
+                logger.warning(f"API returned error {response.status}")
+                raise APIResponseError(status_code=response.status)
+
+            received = 0
+
+            try:
+                async for post in iter_json_array(response.content):
+                    received += 1
+                    yield post
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                logger.error("Error processing json response.", exc_info=True)
+                raise APIDataError()
+
+            logger.info(f"Successful API response: {received} records received.")
+    except aiohttp.ClientConnectionError:
+        logger.error("Error connecting to API.", exc_info=True)
+        raise APIConnectionError()
+    except asyncio.TimeoutError:
+        logger.error("Response timeout exceeded.", exc_info=True)
+        raise APITimeoutError()
+
+
+async def iter_paginated_posts(session: aiohttp.ClientSession, **kwargs) -> AsyncIterator[dict]:
+    """
+    Yields the posts of the pages fetched by iter_post_pages one at a time.
+
+    Args:
+        session (aiohttp.ClientSession): An active aiohttp session used to send HTTP requests.
+        **kwargs: Page size, concurrency, URL, retry policy and cache passed to iter_post_pages.
+
+    Yields:
+        dict: A post retrieved from the API.
+    """
+    async for page in iter_post_pages(session, **kwargs):
+        for post in page:
+            yield post
+
+
+def store_posts(data: list[dict]) -> int:
+    """
+    Validates a batch of posts and writes it to the database and CSV.
+
+    Args:
+        data (list[dict]): A batch of raw post data.
+
+    Returns:
+        int: Number of stored posts.
+
+    Raises:
+        ValidationError: If the input data does not meet validation requirements.
+        SQLAlchemyError: If an error occurred while writing to the database.
+    """
+    data_to_write = create_post_instances(data)
+
+    if data_to_write:
+        write_to_db(data_to_write)
+        write_to_csv(data_to_write)
+
+    return len(data_to_write)
+
+
+async def ingest_posts(posts: AsyncIterable[dict], batch_size: int = BATCH_SIZE) -> int:
+    """
+    Validates and stores posts in batches while they are still being received.
+
+    At most one batch of posts is held in memory. Batches are stored in
+    a worker thread, so the event loop keeps receiving the responses in
+    flight, e.g. the pages requested concurrently by iter_post_pages,
+    while a batch is written.
+
+    Args:
+        posts (AsyncIterable[dict]): Raw post data, e.g. from iter_posts.
+        batch_size (int): Number of posts validated and written at once.
+
+    Returns:
+        int: Number of stored posts.
+
+    Raises:
+        ValidationError: If the input data does not meet validation requirements.
+        SQLAlchemyError: If an error occurred while writing to the database.
+    """
+    batch = []
+    stored = 0
+
+    async for post in posts:
+        batch.append(post)
+
+        if len(batch) >= batch_size:
+            stored += await asyncio.to_thread(store_posts, batch)
+            batch = []
+
+    if batch:
+        stored += await asyncio.to_thread(store_posts, batch)
+
+    return stored
+
+
 async def main() -> None:
     """
     The main asynchronous function to fetch posts, process them,
@@ -130,16 +452,23 @@ async def main() -> None:
     Raises:
         SQLAlchemyError: If an error occurred while writing to the database.
     """
-    async with aiohttp.ClientSession() as session:
-        posts = await get_posts(session)
-        data_to_write = create_post_instances(posts)
+    stats = ConnectionStats()
+    cache = ResponseCache()
 
-        if data_to_write:
-            try:
-                write_to_db(data_to_write)
-                write_to_csv(data_to_write)
-            except SQLAlchemyError as error:
-                raise SQLAlchemyError(f"Error while working with database: {error}")
+    async with create_session(stats, limit_per_host=CONCURRENCY) as session:
+        try:
+            retry = RetryPolicy(
+                breaker=CircuitBreaker(failure_threshold=FAILURE_THRESHOLD),
+                limiter=TokenBucket(RATE_LIMIT, burst=CONCURRENCY),
+            )
+            await ingest_posts(iter_paginated_posts(session, retry=retry, cache=cache))
+            # Only pages whose posts were stored are cached.
+            cache.commit()
+        except SQLAlchemyError as error:
+            raise SQLAlchemyError(f"Error while working with database: {error}")
+        finally:
+            cache.discard()
+            stats.log()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+import codecs
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+
+import aiohttp
+
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+NUMBER_CHARS = set("0123456789+-.eE")
+
+# States of JSONArrayParser.
+EXPECT_OPEN = "open"
+EXPECT_FIRST = "first"
+EXPECT_VALUE = "value"
+EXPECT_DELIMITER = "delimiter"
+FINISHED = "finished"
+
+
+class JSONArrayParser:
+    """
+    Incremental parser of the elements of a top-level JSON array.
+
+    Text is fed in arbitrary chunks and every element is returned as soon
+    as it is complete, so only the current element and the unconsumed
+    rest of the last chunk are held in memory. Elements are decoded with
+    json.JSONDecoder.raw_decode; a number at the end of the received text
+    is only accepted once a character that cannot continue it arrives, so
+    a number split across chunks is never cut short.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = EXPECT_OPEN
+
+    def feed(self, text: str) -> list:
+        """
+        Adds the next chunk of text.
+
+        Args:
+            text (str): The next chunk of the JSON document.
+
+        Returns:
+            list: The elements completed by this chunk.
+
+        Raises:
+            json.JSONDecodeError: If the document is not a JSON array.
+        """
+        buffer = self._buffer + text
+        position = 0
+        elements = []
+
+        while True:
+            position = self._skip_whitespace(buffer, position)
+
+            if position == len(buffer):
+                break
+
+            char = buffer[position]
+
+            if self._state == EXPECT_OPEN:
+                if char != "[":
+                    raise json.JSONDecodeError("Expecting '['", buffer, position)
+                self._state = EXPECT_FIRST
+                position += 1
+            elif self._state == EXPECT_DELIMITER or (self._state == EXPECT_FIRST and char == "]"):
+                if char == "]":
+                    self._state = FINISHED
+                elif char == ",":
+                    self._state = EXPECT_VALUE
+                else:
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+                position += 1
+            elif self._state == FINISHED:
+                raise json.JSONDecodeError("Extra data", buffer, position)
+            else:
+                try:
+                    element, end = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # The element is most likely incomplete; wait for more text.
+                    break
+
+                if isinstance(element, (int, float)) and NUMBER_CHARS.issuperset(buffer[end:]):
+                    # The number may continue in the next chunk.
+                    break
+
+                elements.append(element)
+                self._state = EXPECT_DELIMITER
+                position = end
+
+        self._buffer = buffer[position:]
+
+        return elements
+
+    def close(self) -> None:
+        """
+        Checks that the whole array has been fed.
+
+        Raises:
+            json.JSONDecodeError: If the array is incomplete or malformed.
+        """
+        if self._state != FINISHED or self._buffer.strip(WHITESPACE):
+            raise json.JSONDecodeError("Unterminated array", self._buffer, 0)
+
+    @staticmethod
+    def _skip_whitespace(buffer: str, position: int) -> int:
+        while position < len(buffer) and buffer[position] in WHITESPACE:
+            position += 1
+
+        return position
+
+
+async def iter_json_array(
+        stream: aiohttp.StreamReader | AsyncIterable[bytes],
+        chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator:
+    """
+    Yields the elements of a JSON array read from a response body in chunks.
+
+    The body is decoded as UTF-8 incrementally, so characters split
+    between chunks are handled.
+
+    Args:
+        stream (aiohttp.StreamReader | AsyncIterable[bytes]):
+            The body of a response, e.g. response.content, or its chunks.
+        chunk_size (int): Maximum number of bytes read at once from a StreamReader.
+
+    Yields:
+        The elements of the array, one at a time.
+
+    Raises:
+        json.JSONDecodeError: If the body is not a JSON array.
+        UnicodeDecodeError: If the body is not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parser = JSONArrayParser()
+
+    chunks = stream.iter_chunked(chunk_size) if isinstance(stream, aiohttp.StreamReader) else stream
+
+    async for chunk in chunks:
+        for element in parser.feed(decoder.decode(chunk)):
+            yield element
+
+    for element in parser.feed(decoder.decode(b"", final=True)):
+        yield element
+
+    parser.close()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections.abc import Callable
+
+from api_fetcher.logging import logger
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket shared by all concurrent requests to one upstream.
+
+    Up to `burst` requests are let through at once, after which they are
+    spaced at the sustained `rate`. The rate adapts to the upstream with
+    AIMD: every throttled response (429 or Retry-After) multiplies it by
+    `decrease`, every successful one adds `increase` to it, up to the
+    configured rate. A Retry-After pauses all requests for its duration.
+    Waiting requests are let through in arrival order.
+
+    Attributes:
+        rate (float): Current sustained rate in requests per second.
+        max_rate (float): Configured rate, the highest adapted rate.
+        burst (int): Number of requests that can be sent at once after a pause.
+        min_rate (float): Lowest adapted rate in requests per second.
+        increase (float): Requests per second added after a successful response.
+        decrease (float): Factor applied to the rate after a throttled response.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: int = 1,
+            min_rate: float = 0.1,
+            increase: float = 0.1,
+            decrease: float = 0.5,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Rate must be positive and burst at least 1.")
+
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> float:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        return now
+
+    def delay(self) -> float:
+        """
+        Takes a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one can be.
+        """
+        now = self._refill()
+
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """
+        Waits until the request may be sent.
+        """
+        async with self._lock:
+            while (delay := self.delay()) > 0:
+                await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after: float | None = None) -> None:
+        """
+        Slows down after the upstream throttled a request.
+
+        Args:
+            retry_after (float | None): Seconds from the Retry-After header, if any.
+        """
+        self._refill()
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        # Tokens collected at the old rate would let a burst through right away.
+        self._tokens = 0.0
+
+        if retry_after is not None:
+            self._paused_until = max(self._paused_until, self._clock() + retry_after)
+
+        logger.warning(f"API throttled requests, rate limited to {self.rate:.2f} requests/s.")
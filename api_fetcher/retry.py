@@ -0,0 +1,307 @@
+import asyncio
+import math
+import random
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from api_fetcher.exceptions import APICircuitOpenError
+from api_fetcher.logging import logger
+from api_fetcher.rate_limiter import TokenBucket
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# States of CircuitBreaker.
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """
+    Converts a Retry-After header into a number of seconds.
+
+    Args:
+        value (str | None): Header value, either delay seconds or an HTTP date.
+        now (float | None): Current Unix time, defaults to time.time().
+
+    Returns:
+        float | None: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if value is None:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an upstream that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    every new request fails fast with APICircuitOpenError, while retries
+    of requests already in progress wait for it to recover. Once
+    `recovery_time` seconds have passed, a single trial request is let
+    through: its success closes the circuit, its failure opens it again.
+    A trial without an outcome after another `recovery_time` seconds,
+    e.g. a cancelled one, is replaced by the next request.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            recovery_time: float = 30.0,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at = 0.0
+        self._trial_done: asyncio.Event | None = None
+        self._state = CLOSED
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_request(self) -> None:
+        """
+        Lets a request through or rejects it.
+
+        Raises:
+            APICircuitOpenError: If the circuit is open, or a trial request is already in flight.
+        """
+        if self._state == CLOSED:
+            return
+
+        if self.recovery_delay() <= 0:
+            logger.info("Circuit breaker is half-open, sending a trial request.")
+            self._state = HALF_OPEN
+            self._trial_started_at = self._clock()
+            self._trial_done = asyncio.Event()
+            return
+
+        raise APICircuitOpenError()
+
+    def recovery_delay(self) -> float:
+        """
+        Returns the seconds until a request can be let through, 0 if it can be now.
+        """
+        if self._state == CLOSED:
+            return 0.0
+
+        started_at = self._opened_at if self._state == OPEN else self._trial_started_at
+
+        return max(0.0, started_at + self.recovery_time - self._clock())
+
+    async def wait(self, max_delay: float = math.inf) -> None:
+        """
+        Waits until a request can be let through.
+
+        While the circuit is open, waits for the recovery time; while a
+        trial request is in flight, waits for its outcome.
+
+        Args:
+            max_delay (float): Longest wait for a recovery, in seconds.
+
+        Raises:
+            APICircuitOpenError: If the circuit recovers in more than max_delay seconds.
+        """
+        while True:
+            delay = self.recovery_delay()
+
+            if delay <= 0:
+                self.before_request()
+                return
+            if delay > max_delay:
+                raise APICircuitOpenError()
+
+            if self._state == HALF_OPEN:
+                try:
+                    await asyncio.wait_for(self._trial_done.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(delay)
+
+    def record_success(self) -> None:
+        if self._state != CLOSED:
+            logger.info("Circuit breaker is closed.")
+
+        self._failures = 0
+        self._state = CLOSED
+        self._end_trial()
+
+    def record_failure(self) -> None:
+        self._failures += 1
+
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                logger.warning(f"Circuit breaker is open for {self.recovery_time} s after {self._failures} failures.")
+
+            self._state = OPEN
+            self._opened_at = self._clock()
+            self._end_trial()
+
+    def _end_trial(self) -> None:
+        if self._trial_done is not None:
+            self._trial_done.set()
+            self._trial_done = None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Settings of request retries.
+
+    The delay before retry n (starting at 0) is
+    min(max_delay, base_delay * multiplier ** n), of which a random share
+    of up to `jitter` is dropped so that concurrent clients do not retry
+    in lockstep. A Retry-After header replaces the computed delay; when it
+    asks for more than `max_retry_after` seconds, the response is
+    returned instead of waiting.
+
+    Attributes:
+        attempts (int): Maximum number of attempts, including the first one.
+        base_delay (float): Delay before the first retry, in seconds.
+        multiplier (float): Growth factor of the delay.
+        max_delay (float): Cap of the computed delay, in seconds.
+        jitter (float): Share of the delay that is randomized, from 0 to 1.
+        max_retry_after (float): Longest Retry-After that is honored, in seconds.
+        retry_statuses (frozenset[int]): Response statuses that are retried.
+        methods (frozenset[str]): Methods that are retried; others are sent once.
+        breaker (CircuitBreaker | None): Circuit breaker shared by the requests of a run.
+        limiter (TokenBucket | None): Rate limiter shared by the requests of a run; every attempt waits for it.
+    """
+
+    attempts: int = 5
+    base_delay: float = 0.5
+    multiplier: float = 2.0
+    max_delay: float = 30.0
+    jitter: float = 1.0
+    max_retry_after: float = 120.0
+    retry_statuses: frozenset[int] = RETRY_STATUSES
+    methods: frozenset[str] = IDEMPOTENT_METHODS
+    breaker: CircuitBreaker | None = field(default=None, compare=False)
+    limiter: TokenBucket | None = field(default=None, compare=False)
+
+    def backoff(self, retry: int) -> float:
+        """
+        Returns the delay before the given retry, starting at 0, with jitter applied.
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** retry)
+
+        return delay * (1 - self.jitter * random.random())
+
+
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+@asynccontextmanager
+async def request(
+        session: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        policy: RetryPolicy = NO_RETRY,
+        **kwargs,
+) -> AsyncIterator[aiohttp.ClientResponse]:
+    """
+    Sends a request, retrying transient failures according to the policy.
+
+    Connection errors, timeouts and responses with a status from
+    `policy.retry_statuses` are retried. When the attempts run out, the
+    last error is raised or the last response is returned, so callers
+    handle them as if the request had been sent once. A retry waits for
+    an open circuit breaker to recover, unless that takes more than
+    `policy.max_retry_after` seconds.
+
+    Args:
+        session (aiohttp.ClientSession): An active aiohttp session used to send HTTP requests.
+        method (str): HTTP method.
+        url (str): Request URL.
+        policy (RetryPolicy): Retry settings.
+        **kwargs: Other arguments of session.request.
+
+    Yields:
+        aiohttp.ClientResponse: The final response, released on exit.
+
+    Raises:
+        aiohttp.ClientConnectionError: If the last attempt failed to connect.
+        asyncio.TimeoutError: If the last attempt timed out.
+        APICircuitOpenError: If the circuit breaker rejects the request or does not recover in time.
+    """
+    attempts = policy.attempts if method.upper() in policy.methods else 1
+    breaker = policy.breaker
+    limiter = policy.limiter
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+
+        if breaker is not None:
+            if attempt == 0:
+                breaker.before_request()
+            else:
+                await breaker.wait(policy.max_retry_after)
+        if limiter is not None:
+            await limiter.acquire()
+
+        try:
+            response = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+            if breaker is not None:
+                breaker.record_failure()
+            if last_attempt:
+                raise
+
+            delay = policy.backoff(attempt)
+            logger.warning(f"Request {method} {url} failed ({error!r}), retrying in {delay:.2f} s.")
+        else:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if limiter is not None:
+                if response.status == 429 or (response.status == 503 and retry_after is not None):
+                    limiter.on_throttled(retry_after)
+                elif response.status < 500:
+                    limiter.on_success()
+
+            if response.status not in policy.retry_statuses:
+                if breaker is not None:
+                    breaker.record_success()
+                break
+
+            # 429 means the client is too fast, not that the upstream is down.
+            if breaker is not None and response.status != 429:
+                breaker.record_failure()
+
+            delay = policy.backoff(attempt) if retry_after is None else retry_after
+
+            if last_attempt or delay > policy.max_retry_after:
+                break
+
+            response.release()
+            logger.warning(f"Request {method} {url} returned {response.status}, retrying in {delay:.2f} s.")
+
+        await asyncio.sleep(delay)
+
+    try:
+        yield response
+    finally:
+        response.release()
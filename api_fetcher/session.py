@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from importlib.util import find_spec
+from types import SimpleNamespace
+
+import aiohttp
+
+from api_fetcher.logging import logger
+
+
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 30.0
+DNS_CACHE_TTL = 300
+TOTAL_TIMEOUT = 300.0
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 30.0
+
+# aiohttp decodes brotli responses only when the brotli package is installed (`brotli` extra).
+HAS_BROTLI = find_spec("brotli") is not None or find_spec("brotlicffi") is not None
+ACCEPT_ENCODING = "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate"
+
+
+@dataclass
+class ConnectionStats:
+    """
+    Connection pool statistics of a session, collected through a TraceConfig.
+
+    Attributes:
+        requests (int): Number of finished requests.
+        new_connections (int): Number of opened connections.
+        reused_connections (int): Number of requests sent over a kept-alive connection.
+        dns_cache_hits (int): Number of host resolutions answered from the DNS cache.
+        dns_cache_misses (int): Number of host resolutions sent to the resolver.
+    """
+
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Returns a TraceConfig that updates these statistics.
+        """
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_end(session, context: SimpleNamespace, params) -> None:
+            self.requests += 1
+
+        async def on_connection_create_end(session, context: SimpleNamespace, params) -> None:
+            self.new_connections += 1
+
+        async def on_connection_reuseconn(session, context: SimpleNamespace, params) -> None:
+            self.reused_connections += 1
+
+        async def on_dns_cache_hit(session, context: SimpleNamespace, params) -> None:
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context: SimpleNamespace, params) -> None:
+            self.dns_cache_misses += 1
+
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+
+        return trace_config
+
+    @property
+    def reuse_rate(self) -> float:
+        connections = self.new_connections + self.reused_connections
+
+        return self.reused_connections / connections if connections else 0.0
+
+    def log(self) -> None:
+        logger.info(
+            f"Connection pool: {self.requests} requests, {self.new_connections} new connections, "
+            f"{self.reused_connections} reused ({self.reuse_rate:.0%}), "
+            f"DNS cache {self.dns_cache_hits} hits / {self.dns_cache_misses} misses."
+        )
+
+
+def create_session(
+        stats: ConnectionStats | None = None,
+        limit: int = CONNECTION_LIMIT,
+        limit_per_host: int = CONNECTION_LIMIT_PER_HOST,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int | None = DNS_CACHE_TTL,
+        total_timeout: float | None = TOTAL_TIMEOUT,
+        connect_timeout: float | None = CONNECT_TIMEOUT,
+        read_timeout: float | None = READ_TIMEOUT,
+        compress: bool = True,
+) -> aiohttp.ClientSession:
+    """
+    Creates a ClientSession with a tuned connection pool and timeouts.
+
+    Connections are kept alive between requests and shared by all
+    concurrent requests, at most `limit_per_host` of them to one host, and
+    resolved hosts are cached for `dns_cache_ttl` seconds. Must be called
+    inside a running event loop.
+
+    Args:
+        stats (ConnectionStats | None): Statistics updated by the session's requests.
+        limit (int): Maximum number of open connections, 0 for no limit.
+        limit_per_host (int): Maximum number of open connections to one host, 0 for no limit.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+        dns_cache_ttl (int | None): Seconds resolved addresses are cached, None to cache forever.
+        total_timeout (float | None): Limit of a whole request including reading the body, in seconds.
+        connect_timeout (float | None): Limit of getting a connection from the pool or opening one, in seconds.
+        read_timeout (float | None): Limit of waiting for the next chunk of the response, in seconds.
+        compress (bool): Whether to ask for gzip/deflate (and brotli, if installed) compressed responses.
+
+    Returns:
+        aiohttp.ClientSession: The session, to be used as an async context manager.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=keepalive_timeout,
+        ttl_dns_cache=dns_cache_ttl,
+    )
+    timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+    headers = {"Accept-Encoding": ACCEPT_ENCODING if compress else "identity"}
+
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers=headers,
+        trace_configs=[stats.trace_config()] if stats is not None else None,
+    )
@@ -1,7 +1,9 @@
 import csv
 from pathlib import Path
 
+from sqlalchemy import insert
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 
 from api_fetcher.database.models.posts import PostModel
 from api_fetcher.database.settings import get_db
@@ -9,30 +11,65 @@ from api_fetcher.database.settings import get_db
 
 PATH_TO_CSV_FILE = Path("posts.csv")
 HEADERS = [column.name for column in PostModel.__table__.columns]
+BULK_CHUNK_SIZE = 10_000
 
 
-def write_to_db(data: list[PostModel]) -> None:
+def insert_posts(db: Session, data: list[PostModel], chunk_size: int = BULK_CHUNK_SIZE) -> None:
     """
-    The function writes the prepared data to the database.
+    Bulk inserts posts and sets their generated ids.
+
+    Every chunk of posts is inserted by a single executemany INSERT ...
+    RETURNING id in its own transaction, bypassing the ORM unit of work,
+    so no per-row flush or refresh SELECT is needed. If a chunk fails, it
+    is rolled back and the chunks before it stay committed.
 
     Args:
-        data (list[PostModel]): A list of PostModel objects to be saved in the database.
+        db (Session): Database session.
+        data (list[PostModel]): PostModel objects to insert, not added to any session.
+        chunk_size (int): Number of posts inserted in one transaction.
 
     Returns:
         None
+
+    Raises:
+        SQLAlchemyError: If a chunk could not be inserted.
     """
-    with get_db() as db:
-        try:
-            db.add_all(data)
-            db.commit()
+    statement = insert(PostModel).returning(PostModel.id, sort_by_parameter_order=True)
 
-            for post in data:
-                db.refresh(post)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
 
+        try:
+            ids = db.execute(
+                statement,
+                [{"user_id": post.user_id, "title": post.title, "body": post.body} for post in chunk],
+            ).scalars().all()
+            db.commit()
         except SQLAlchemyError as error:
             db.rollback()
             raise error
 
+        for post, post_id in zip(chunk, ids):
+            post.id = post_id
+
+
+def write_to_db(data: list[PostModel], chunk_size: int = BULK_CHUNK_SIZE) -> None:
+    """
+    The function writes the prepared data to the database.
+
+    Args:
+        data (list[PostModel]): A list of PostModel objects to be saved in the database.
+        chunk_size (int): Number of posts inserted in one transaction.
+
+    Returns:
+        None
+
+    Raises:
+        SQLAlchemyError: If a chunk could not be inserted.
+    """
+    with get_db() as db:
+        insert_posts(db, data, chunk_size)
+
 
 def write_to_csv(data: list[PostModel]) -> None:
     """
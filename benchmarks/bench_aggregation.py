@@ -0,0 +1,62 @@
+"""
+Compares the Python and NumPy aggregation backends end to end.
+
+Every backend analyzes the same synthetic log file from disk, so the time
+includes reading, parsing and building the columns, not only the
+aggregation itself. The NumPy backend matches the memory-mapped file
+block by block straight into columns.
+
+Usage:
+    python -m benchmarks.bench_aggregation [--size 100MB] [--ips 100000] [--seed 42]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.generate_logs import parse_size, write_log
+from cli_log_analyzer.dataclass import AnalysisOptions
+from cli_log_analyzer.parallel import analyze_file
+
+
+BACKENDS = {
+    "python": AnalysisOptions(),
+    "python --mmap": AnalysisOptions(use_mmap=True),
+    "numpy": AnalysisOptions(backend="numpy"),
+}
+
+
+def measure(name: str, input_path: Path, options: AnalysisOptions):
+    start = time.perf_counter()
+    result = analyze_file(input_path, options)
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<16} {elapsed:8.2f} s {result.count / elapsed:16,.0f} rows/s")
+
+    return result, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default="100MB", help="Size of the generated log")
+    parser.add_argument("--ips", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as working_dir:
+        input_path = Path(working_dir) / "access.log"
+        count = write_log(input_path, args.size, args.seed, ips=args.ips)
+        print(f"Analyzing {count:,} lines ({input_path.stat().st_size / 1024 ** 2:,.1f} MB)")
+
+        results = {name: measure(name, input_path, options) for name, options in BACKENDS.items()}
+
+    statistics = [result for result, _ in results.values()]
+    assert all(result == statistics[0] for result in statistics)
+
+    numpy_time = results["numpy"][1]
+    print(f"NumPy speedup over python: {results['python'][1] / numpy_time:.1f}x, "
+          f"over python --mmap: {results['python --mmap'][1] / numpy_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares the throughput of the single compiled log grammar used by
+data_formater with the previous implementation based on six re.search calls.
+
+Usage:
+    python -m benchmarks.bench_data_formater [--lines 2000000] [--seed 42]
+"""
+import argparse
+import re
+import time
+
+from benchmarks.generate_logs import generate_lines
+from cli_log_analyzer.dataclass import NginxLog
+from cli_log_analyzer.parsers import data_formater
+
+
+def legacy_data_formater(data: list[str]) -> list[NginxLog]:
+    return [
+        NginxLog(
+            ip=re.search(r"\d+.\d+.\d+.\d+", element).group(0),
+            timestamp=re.search(r"\d+/\w{3}/\d+:\d+:\d+:\d+ [+-]\d+", element).group(0),
+            method=re.search(r'"([A-Z]{3,10}) ', element).group(1),
+            path_=re.search(r"/[\w./?=&-]* ", element).group(0),
+            status=int(re.search(r'" (\d{3}) ', element).group(1)),
+            response_size=int(re.search(r"\d+$", element).group(0)),
+        )
+        for element in data
+    ]
+
+
+def measure(name: str, formater, lines: list[str]) -> float:
+    start = time.perf_counter()
+    formater(lines)
+    elapsed = time.perf_counter() - start
+    rate = len(lines) / elapsed
+
+    print(f"{name:<10} {elapsed:8.2f} s {rate:14,.0f} lines/s")
+
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines, args.seed)
+    print(f"Parsing {len(lines):,} synthetic lines")
+
+    before = measure("six-regex", legacy_data_formater, lines)
+    after = measure("compiled", data_formater, lines)
+
+    print(f"Speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Measures the throughput and peak memory of every stage of the analyzer pipeline.
+
+The stages are run cumulatively, each pipeline in a fresh process so that
+its peak RSS is not inflated by the previous one:
+
+    read           lines are read from the file
+    data_formater  ... and parsed into NginxLog objects
+    analyze_data   ... and aggregated into LogStatistics
+    save_result    ... and the report is built and written
+
+Lines are processed in batches, so memory stays bounded for files of any
+size. The time of a stage only includes its own work; lines/s and MB/s are
+computed from it. The report is written once, so only its time is shown.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--size 100MB] [--ips 10000] [--error-rate 0.05]
+        [--seed 42] [--batch 100000] [--log access.log]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+
+from benchmarks.generate_logs import parse_size, write_log
+from cli_log_analyzer.dataclass import LogStatistics
+from cli_log_analyzer.parsers import data_formater
+from cli_log_analyzer.readers import iter_lines
+from cli_log_analyzer.utilities import build_report, collect_statistics, report_arguments, save_result
+
+
+STAGES = ("read", "data_formater", "analyze_data", "save_result")
+
+
+def run_pipeline(input_path: Path, last_stage: str, batch_lines: int) -> tuple[float, int, int]:
+    """
+    Runs the stages up to last_stage over the whole file.
+
+    Args:
+        input_path (Path): Path to the log file.
+        last_stage (str): The measured stage, one of STAGES.
+        batch_lines (int): Number of lines read and parsed at once.
+
+    Returns:
+        tuple[float, int, int]: Seconds spent in last_stage, processed lines and peak RSS in bytes.
+    """
+    depth = STAGES.index(last_stage)
+    elapsed = 0.0
+    count = 0
+    statistics = LogStatistics()
+    lines = iter_lines(input_path)
+
+    while True:
+        start = time.perf_counter()
+        batch = list(islice(lines, batch_lines))
+        if depth == 0:
+            elapsed += time.perf_counter() - start
+
+        if not batch:
+            break
+        count += len(batch)
+
+        if depth >= 1:
+            start = time.perf_counter()
+            records = data_formater(batch)
+            if depth == 1:
+                elapsed += time.perf_counter() - start
+
+        if depth >= 2:
+            start = time.perf_counter()
+            collect_statistics(records, statistics)
+            if depth == 2:
+                elapsed += time.perf_counter() - start
+
+    if depth == 3:
+        start = time.perf_counter()
+        # save_result writes to the working directory, which is a temporary one here.
+        save_result(**report_arguments(build_report(statistics)))
+        elapsed += time.perf_counter() - start
+
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return elapsed, count, peak_rss if os.uname().sysname == "Darwin" else peak_rss * 1024
+
+
+def run_isolated(input_path: Path, stage: str, batch_lines: int, working_dir: Path) -> tuple[float, int, int]:
+    os.chdir(working_dir)
+
+    return run_pipeline(input_path, stage, batch_lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default="100MB", help="Size of the generated log, 1MB to 10GB")
+    parser.add_argument("--ips", type=int, default=10_000)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch", type=int, default=100_000, help="Lines per batch")
+    parser.add_argument("--log", type=Path, default=None, help="Benchmark an existing log instead of generating one")
+    args = parser.parse_args()
+
+    # Spawned workers start with a fresh address space, unlike forked ones.
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as working_dir:
+        input_path = args.log
+
+        if input_path is None:
+            input_path = Path(working_dir) / "access.log"
+            count = write_log(input_path, args.size, args.seed, ips=args.ips, error_rate=args.error_rate)
+            print(f"Generated {count:,} lines, {args.ips:,} IPs, error rate {args.error_rate:.0%}")
+
+        megabytes = input_path.stat().st_size / 1024 ** 2
+        print(f"Benchmarking {input_path} ({megabytes:,.1f} MB)\n")
+        print(f"{'stage':<14} {'seconds':>9} {'lines/s':>14} {'MB/s':>9} {'peak RSS MB':>12}")
+
+        for stage in STAGES:
+            with context.Pool(1) as pool:
+                elapsed, count, peak_rss = pool.apply(run_isolated, (input_path, stage, args.batch, working_dir))
+
+            # The report is written once per run, so a per-line rate means nothing for it.
+            per_line = elapsed and stage != "save_result"
+            lines_rate = f"{count / elapsed:14,.0f}" if per_line else f"{'-':>14}"
+            megabytes_rate = f"{megabytes / elapsed:9,.1f}" if per_line else f"{'-':>9}"
+            print(f"{stage:<14} {elapsed:9.3f} {lines_rate} {megabytes_rate} {peak_rss / 1024 ** 2:12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compares the rows/s of the bulk insert used by write_to_db with the previous
+ORM implementation based on add_all and a refresh of every row.
+
+Every run writes to a fresh SQLite database in a temporary directory.
+The ORM implementation issues one SELECT per row, so by default it is
+only measured up to --legacy-max rows.
+
+Usage:
+    python -m benchmarks.bench_storages [--rows 1000 100000 1000000] [--chunk 10000]
+        [--legacy-max 100000]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from api_fetcher.database.models.base import Base
+from api_fetcher.database.models.posts import PostModel
+from api_fetcher.storages import BULK_CHUNK_SIZE, insert_posts
+
+
+def make_posts(count: int) -> list[PostModel]:
+    return [
+        PostModel(user_id=index % 10 + 1, title=f"title {index}", body=f"body of post {index}")
+        for index in range(count)
+    ]
+
+
+def legacy_insert_posts(db: Session, data: list[PostModel]) -> None:
+    db.add_all(data)
+    db.commit()
+
+    for post in data:
+        db.refresh(post)
+
+
+def measure(name: str, insert, count: int, working_dir: Path) -> float:
+    engine = create_engine(f"sqlite:///{working_dir / f'{name}-{count}.db'}")
+    Base.metadata.create_all(engine)
+    posts = make_posts(count)
+
+    with Session(engine) as db:
+        start = time.perf_counter()
+        insert(db, posts)
+        elapsed = time.perf_counter() - start
+
+    engine.dispose()
+    rate = count / elapsed
+
+    print(f"{name:<8} {count:>10,} rows {elapsed:9.2f} s {rate:12,.0f} rows/s")
+
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk", type=int, default=BULK_CHUNK_SIZE, help="Rows per bulk transaction")
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="Largest run of the ORM implementation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as working_dir:
+        for count in args.rows:
+            after = measure("bulk", lambda db, posts: insert_posts(db, posts, args.chunk), count, Path(working_dir))
+
+            if count <= args.legacy_max:
+                before = measure("orm", legacy_insert_posts, count, Path(working_dir))
+                print(f"Speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares strptime with the cached slicing TimestampDecoder on $time_local values.
+
+Usage:
+    python -m benchmarks.bench_timestamps [--lines 2000000] [--seed 42] [--per-second 20]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from cli_log_analyzer.timestamps import TimestampDecoder, parse_timestamp_strptime
+
+
+def generate_timestamps(count: int, seed: int, per_second: int) -> list[str]:
+    """
+    Generates ordered timestamps with about per_second log lines sharing each second.
+    """
+    rnd = random.Random(seed)
+    moment = datetime(2024, 2, 10, tzinfo=timezone(timedelta(hours=2)))
+    values = []
+
+    for _ in range(count):
+        if rnd.randrange(per_second) == 0:
+            moment += timedelta(seconds=1)
+        values.append(moment.strftime("%d/%b/%Y:%H:%M:%S %z"))
+
+    return values
+
+
+def measure(name: str, parse, values: list[str]) -> float:
+    start = time.perf_counter()
+
+    for value in values:
+        parse(value)
+
+    elapsed = time.perf_counter() - start
+    rate = len(values) / elapsed
+
+    print(f"{name:<10} {elapsed:8.2f} s {rate:14,.0f} values/s")
+
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--per-second", type=int, default=20)
+    args = parser.parse_args()
+
+    values = generate_timestamps(args.lines, args.seed, args.per_second)
+    print(f"Decoding {len(values):,} timestamps, about {args.per_second} per second")
+
+    before = measure("strptime", parse_timestamp_strptime, values)
+    after = measure("decoder", TimestampDecoder(), values)
+    uncached = measure("distinct", TimestampDecoder(), sorted(set(values)))
+
+    print(f"Speedup: {after / before:.2f}x (distinct seconds only: {uncached / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
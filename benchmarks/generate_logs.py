@@ -0,0 +1,159 @@
+"""
+Writes a reproducible synthetic Nginx access log of a given size.
+
+Usage:
+    python -m benchmarks.generate_logs access.log [--size 100MB] [--ips 10000]
+        [--error-rate 0.05] [--combined] [--seed 42]
+"""
+import argparse
+import random
+import re
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+
+
+METHODS = ["GET"] * 8 + ["POST"] * 3 + ["PUT", "DELETE"]
+PATHS = ["/", "/index.html", "/api/login", "/api/register", "/static/app.js", "/search?q=test", "/dashboard"]
+SUCCESS_STATUSES = [200] * 12 + [201, 204, 301, 302, 304]
+ERROR_STATUSES = [400, 401, 403, 404, 404, 404, 429, 500, 502, 503, 504]
+REFERERS = ["-", "https://example.com/", "https://www.google.com/"]
+USER_AGENTS = [
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_3) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15",
+    "curl/8.5.0",
+]
+SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+BLOCK_LINES = 10_000
+
+
+def parse_size(value: str) -> int:
+    """
+    Converts a size like "512KB", "100MB" or "10GB" into bytes.
+
+    Raises:
+        ValueError: If the value is not a number with an optional B, KB, MB or GB unit.
+    """
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?B?)", value.strip().upper())
+
+    if match is None:
+        raise ValueError(f"Invalid size: {value!r}")
+
+    return int(float(match[1]) * SIZE_UNITS[match[2]])
+
+
+def iter_log_lines(
+        seed: int = 42,
+        ips: int = 10_000,
+        error_rate: float = 0.05,
+        combined: bool = False,
+        lines_per_second: int = 20,
+) -> Iterator[str]:
+    """
+    Endlessly yields realistic access log lines, the same ones for the same arguments.
+
+    IP popularity follows a Pareto distribution over `ips` distinct
+    addresses, so a few clients send most requests. Timestamps increase
+    by one second every `lines_per_second` lines on average and response
+    sizes are log-normally distributed.
+
+    Args:
+        seed (int): Seed of the random generator.
+        ips (int): Number of distinct client IPs.
+        error_rate (float): Share of 4xx and 5xx responses.
+        combined (bool): Whether to write the combined format with referer, user agent and $request_time.
+        lines_per_second (int): Average number of lines sharing a timestamp.
+
+    Yields:
+        str: A log line with its newline.
+    """
+    rnd = random.Random(seed)
+    addresses = [f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}" for index in range(ips)]
+    rnd.shuffle(addresses)
+    moment = datetime(2024, 2, 10, tzinfo=timezone.utc)
+    timestamp = moment.strftime("%d/%b/%Y:%H:%M:%S %z")
+
+    while True:
+        if rnd.randrange(lines_per_second) == 0:
+            moment += timedelta(seconds=1)
+            timestamp = moment.strftime("%d/%b/%Y:%H:%M:%S %z")
+
+        ip = addresses[min(int(rnd.paretovariate(1.2)) - 1, ips - 1)]
+
+        if rnd.random() < error_rate:
+            status = rnd.choice(ERROR_STATUSES)
+            size = rnd.randrange(100, 1_000)
+        else:
+            status = rnd.choice(SUCCESS_STATUSES)
+            size = int(rnd.lognormvariate(8, 1.5))
+
+        line = f'{ip} - - [{timestamp}] "{rnd.choice(METHODS)} {rnd.choice(PATHS)} HTTP/1.1" {status} {size}'
+
+        if combined:
+            line += f' "{rnd.choice(REFERERS)}" "{rnd.choice(USER_AGENTS)}" {rnd.expovariate(20):.3f}'
+
+        yield line + "\n"
+
+
+def generate_lines(count: int, seed: int = 42, **kwargs) -> list[str]:
+    """
+    Returns the first count lines of iter_log_lines with the given arguments.
+    """
+    return list(islice(iter_log_lines(seed, **kwargs), count))
+
+
+def write_log(output_path: Path, size: int, seed: int = 42, **kwargs) -> int:
+    """
+    Writes lines of iter_log_lines until the file reaches at least size bytes.
+
+    Args:
+        output_path (Path): Path to the written log file.
+        size (int): Target size in bytes.
+        seed (int): Seed of the random generator.
+        **kwargs: Other arguments of iter_log_lines.
+
+    Returns:
+        int: Number of written lines.
+    """
+    lines = iter_log_lines(seed, **kwargs)
+    written = 0
+    count = 0
+
+    with open(output_path, "w", encoding="utf-8") as file:
+        while written < size:
+            block = "".join(islice(lines, BLOCK_LINES))
+            # The last block is cut at the first line end after the target size.
+            if written + len(block) > size:
+                block = block[:block.index("\n", size - written - 1) + 1]
+
+            file.write(block)
+            written += len(block)
+            count += block.count("\n")
+
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--size", type=parse_size, default="100MB", help="Target size, from 1MB to 10GB")
+    parser.add_argument("--ips", type=int, default=10_000, help="Number of distinct client IPs")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of 4xx and 5xx responses")
+    parser.add_argument("--combined", action="store_true", help="Write the combined format with $request_time")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    count = write_log(
+        args.output,
+        args.size,
+        args.seed,
+        ips=args.ips,
+        error_rate=args.error_rate,
+        combined=args.combined,
+    )
+    print(f"Wrote {count:,} lines ({args.output.stat().st_size / 1024 ** 2:,.1f} MB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
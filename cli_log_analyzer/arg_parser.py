@@ -1,17 +1,212 @@
 import argparse
+import sys
 
+from cli_log_analyzer.follow import compile_follow_format
+from cli_log_analyzer.rollups import compile_index_format
+from cli_log_analyzer.utilities import AGGREGATORS
+
+
+COMMANDS = ("analyze", "index")
 
 parser = argparse.ArgumentParser(
     prog="NginxParser",
-    description="Reads the name of the log file",
+    description="Analyzes Nginx log files or indexes them into per-hour rollups",
+)
+subparsers = parser.add_subparsers(
+    dest="command",
+    required=True,
+)
+
+# options shared by the commands that parse log files
+files_parser = argparse.ArgumentParser(add_help=False)
+files_parser.add_argument(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of worker processes (default: 1 for a single file, CPU count for several files)",
+)
+files_parser.add_argument(
+    "--lenient",
+    action="store_true",
+    help="Count and skip malformed lines instead of aborting the analysis",
+)
+files_parser.add_argument(
+    "--max-samples",
+    type=int,
+    default=10,
+    help="Number of malformed lines reported with their line numbers in --lenient mode",
+)
+files_parser.add_argument(
+    "--log-format",
+    default=None,
+    metavar="FORMAT",
+    help=(
+        "Nginx log_format string of the files, e.g. "
+        "'$remote_addr - $remote_user [$time_local] \"$request\" $status $body_bytes_sent'; "
+        "the common and combined formats are detected by default"
+    ),
+)
+
+# analyze parser
+analyze_parser = subparsers.add_parser(
+    "analyze",
+    parents=[files_parser],
+    help="Analyze log files (the default command)",
+)
+analyze_parser.add_argument(
+    "log_file",
+    type=str,
+    nargs="*",
+    default=[],
+    help="Paths or glob patterns of plain or compressed Nginx log files",
+)
+analyze_parser.add_argument(
+    "--per-file",
+    action="store_true",
+    help="Report the results of every file in addition to the combined results",
+)
+analyze_parser.add_argument(
+    "--checkpoint",
+    type=str,
+    default=None,
+    help="Checkpoint file storing offsets and totals, so that only appended lines are parsed",
+)
+analyze_parser.add_argument(
+    "--follow",
+    action="store_true",
+    help="Follow the growing log file and report statistics of a rolling time window",
+)
+analyze_parser.add_argument(
+    "--window",
+    type=int,
+    default=300,
+    help="Length of the rolling window in seconds for --follow",
+)
+analyze_parser.add_argument(
+    "--bucket",
+    type=int,
+    default=10,
+    help="Granularity of the rolling window in seconds for --follow",
+)
+analyze_parser.add_argument(
+    "--interval",
+    type=float,
+    default=10.0,
+    help="Seconds between two reports for --follow",
+)
+analyze_parser.add_argument(
+    "--approx",
+    type=int,
+    nargs="?",
+    const=1000,
+    default=None,
+    metavar="CAPACITY",
+    help="Count IP requests approximately, keeping at most 2 * CAPACITY IPs in memory (default 1000)",
+)
+analyze_parser.add_argument(
+    "--backend",
+    choices=["python", "numpy"],
+    default="python",
+    help="Aggregation backend; numpy requires the optional numpy package",
+)
+analyze_parser.add_argument(
+    "--metrics",
+    nargs="+",
+    choices=list(AGGREGATORS),
+    default=[],
+    help="Additional metrics computed in the same pass over the data",
 )
-parser.add_argument(
+analyze_parser.add_argument(
+    "--mmap",
+    action="store_true",
+    help="Memory-map the file and match raw bytes instead of decoded lines",
+)
+analyze_parser.add_argument(
+    "--format",
+    choices=["text", "json", "ndjson", "csv"],
+    default="text",
+    help="Format of the report file; text is appended, other formats replace the file",
+)
+analyze_parser.add_argument(
+    "--output",
+    type=str,
+    default=None,
+    help="Path of the report file (default: analysis_result.<format>)",
+)
+analyze_parser.add_argument(
+    "--quiet",
+    action="store_true",
+    help="Only write the report file without logging the results to the console",
+)
+analyze_parser.add_argument(
+    "--index",
+    type=str,
+    default=None,
+    help="Answer from the per-hour rollups of this index; the given log files are indexed first",
+)
+analyze_parser.add_argument(
+    "--since",
+    type=str,
+    default=None,
+    help="Start of the queried time range for --index, e.g. 2024-02-10 or 2024-02-10T14:00",
+)
+analyze_parser.add_argument(
+    "--until",
+    type=str,
+    default=None,
+    help="End of the queried time range for --index (exclusive)",
+)
+
+# index parser
+index_parser = subparsers.add_parser(
+    "index",
+    parents=[files_parser],
+    help="Parse log files once into per-hour rollups",
+)
+index_parser.add_argument(
     "log_file",
     type=str,
-    default="cli_log_analyzer/access.log",
-    help="Source directory with Nginx data",
+    nargs="+",
+    help="Paths or glob patterns of plain or compressed Nginx log files",
+)
+index_parser.add_argument(
+    "--index",
+    type=str,
+    default="log_index.db",
+    help="SQLite file of the rollups; appended lines are added on every run",
 )
 
 
-def get_args():
-    return parser.parse_args()
+def get_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line, running "analyze" when no command is given.
+
+    Args:
+        argv (list[str] | None): Command-line arguments, sys.argv[1:] by default.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+
+    if not argv or argv[0] not in (*COMMANDS, "-h", "--help"):
+        argv = ["analyze", *argv]
+
+    args = parser.parse_args(argv)
+
+    if args.command == "analyze" and not args.log_file and args.index is None:
+        analyze_parser.error("the following arguments are required: log_file")
+
+    if args.log_format is not None:
+        # Follow mode and indexing need the timestamp of every entry.
+        command_parser = index_parser if args.command == "index" else analyze_parser
+
+        try:
+            if args.command == "analyze" and args.follow:
+                compile_follow_format(args.log_format)
+            elif args.command == "index" or (args.index is not None and args.log_file):
+                compile_index_format(args.log_format)
+        except ValueError as error:
+            command_parser.error(f"--log-format: {error}")
+
+    return args
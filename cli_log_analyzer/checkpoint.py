@@ -0,0 +1,212 @@
+import json
+import os
+from pathlib import Path
+
+from cli_log_analyzer.compression import detect_compression
+from cli_log_analyzer.dataclass import AnalysisOptions, LogStatistics
+from cli_log_analyzer.parallel import collect_ranges
+
+
+CHECKPOINT_VERSION = 1
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def load_checkpoint(checkpoint_path: Path) -> dict:
+    """
+    Loads the per-file states stored by a previous run.
+
+    Args:
+        checkpoint_path (Path): Path to the checkpoint file.
+
+    Returns:
+        dict:
+            States keyed by "<device>:<inode>" of the analyzed files.
+            Empty if the checkpoint does not exist or has another version.
+    """
+    if not checkpoint_path.is_file():
+        return {}
+
+    with open(checkpoint_path, "r", encoding="utf-8") as file:
+        checkpoint = json.load(file)
+
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        return {}
+
+    return checkpoint["files"]
+
+
+def save_checkpoint(checkpoint_path: Path, files: dict) -> None:
+    """
+    Atomically replaces the checkpoint with the given per-file states.
+
+    Args:
+        checkpoint_path (Path): Path to the checkpoint file.
+        files (dict): States keyed by "<device>:<inode>" of the analyzed files.
+
+    Returns:
+        None
+    """
+    temporary_path = checkpoint_path.with_name(f"{checkpoint_path.name}.tmp")
+
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump({"version": CHECKPOINT_VERSION, "files": files}, file)
+
+    os.replace(temporary_path, checkpoint_path)
+
+
+def find_complete_end(input_path: Path, start: int, file_size: int) -> int:
+    """
+    Finds the end of the last complete line after start.
+
+    A line that is still being written has no trailing newline yet; it is
+    left for the next run.
+
+    Args:
+        input_path (Path): Path to the log file.
+        start (int): Offset from which the file is analyzed.
+        file_size (int): Current size of the file.
+
+    Returns:
+        int: Offset after the last newline, or start if there is none.
+    """
+    with open(input_path, "rb") as file:
+        block_end = file_size
+
+        while block_end > start:
+            block_start = max(start, block_end - TAIL_BLOCK_SIZE)
+            file.seek(block_start)
+            newline = file.read(block_end - block_start).rfind(b"\n")
+
+            if newline != -1:
+                return block_start + newline + 1
+
+            block_end = block_start
+
+    return start
+
+
+def is_compatible(state: dict, options: AnalysisOptions) -> bool:
+    """
+    Checks that a stored state was collected with the same aggregation settings.
+
+    Statistics of other metrics, another log format, approximate instead
+    of exact IP counts (or another capacity) or another handling of
+    malformed lines cannot be extended with the statistics of new lines.
+    """
+    return (
+        set(state["statistics"].get("metrics", {})) == set(options.metrics)
+        and state.get("log_format") == options.log_format
+        and state.get("ip_capacity") == options.ip_capacity
+        and state.get("lenient", False) == options.lenient
+    )
+
+
+def plan_incremental(
+        input_path: Path,
+        state: dict | None,
+        options: AnalysisOptions,
+) -> tuple[LogStatistics, int, tuple[int | None, int | None] | None]:
+    """
+    Decides which bytes of the file still have to be analyzed.
+
+    The file is analyzed from the beginning if there is no state, the file
+    was truncated or the state is not compatible with the options.
+    Compressed files cannot be appended to, so their stored statistics are
+    reused as long as the size is unchanged.
+
+    Args:
+        input_path (Path): Path to the plain or compressed log file.
+        state (dict | None): State of the same inode stored by the previous run.
+        options (AnalysisOptions): Reader and aggregation settings.
+
+    Returns:
+        tuple[LogStatistics, int, tuple[int | None, int | None] | None]:
+            Statistics of the already analyzed bytes, the offset analyzed up to
+            after this run, and the (start, end) range still to be analyzed,
+            (None, None) for the whole file, or None if there is nothing new.
+    """
+    file_size = input_path.stat().st_size
+
+    if state is not None and state["offset"] <= file_size and is_compatible(state, options):
+        statistics = LogStatistics.from_dict(state["statistics"])
+        offset = state["offset"]
+    else:
+        statistics = options.create_statistics()
+        offset = 0
+
+    if detect_compression(input_path):
+        if offset == file_size:
+            return statistics, offset, None
+
+        return options.create_statistics(), file_size, (None, None)
+
+    end = find_complete_end(input_path, offset, file_size)
+
+    return statistics, end, (offset, end) if end > offset else None
+
+
+def collect_incremental(
+        input_paths: list[Path],
+        checkpoint_path: Path,
+        options: AnalysisOptions | None = None,
+        workers: int = 1,
+) -> list[LogStatistics]:
+    """
+    Analyzes the files incrementally and updates the checkpoint.
+
+    Files are identified by device and inode rather than by path, so a log
+    rotated to a new name keeps its progress, while the new file created
+    in its place is analyzed from the beginning. States of files that are
+    no longer analyzed are dropped. The unread bytes of all files are
+    analyzed together, in worker processes if workers > 1.
+
+    Args:
+        input_paths (list[Path]): Paths to the plain or compressed log files.
+        checkpoint_path (Path): Path to the checkpoint file.
+        options (AnalysisOptions | None): Reader and aggregation settings.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list[LogStatistics]: Statistics of every file, in the order of input_paths.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    options = options or AnalysisOptions()
+    stored_files = load_checkpoint(checkpoint_path)
+    keys = []
+    results = []
+    offsets = []
+    ranges = []
+    pending = []
+
+    for index, input_path in enumerate(input_paths):
+        file_stat = input_path.stat()
+        key = f"{file_stat.st_dev}:{file_stat.st_ino}"
+        statistics, offset, unread = plan_incremental(input_path, stored_files.get(key), options)
+
+        keys.append(key)
+        results.append(statistics)
+        offsets.append(offset)
+
+        if unread is not None:
+            ranges.append((input_path, *unread))
+            pending.append(index)
+
+    for index, partial in zip(pending, collect_ranges(ranges, workers, options)):
+        results[index].merge(partial)
+
+    files = {
+        key: {
+            "path": str(input_path),
+            "offset": offset,
+            "log_format": options.log_format,
+            "ip_capacity": options.ip_capacity,
+            "lenient": options.lenient,
+            "statistics": statistics.to_dict(),
+        }
+        for key, input_path, offset, statistics in zip(keys, input_paths, offsets, results)
+    }
+    save_checkpoint(checkpoint_path, files)
+
+    return results
@@ -0,0 +1,172 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, TextIO
+
+
+# Leading bytes identifying the supported compression formats.
+MAGIC_NUMBERS = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+BLOCK_SIZE = 1024 * 1024
+QUEUE_SIZE = 8
+
+
+def detect_compression(input_path: Path) -> str | None:
+    """
+    Detects the compression format of a file from its magic bytes.
+
+    Args:
+        input_path (Path): Path to the file.
+
+    Returns:
+        str | None: "gzip", "bz2", "xz" or "zstd", or None for an uncompressed file.
+    """
+    with open(input_path, "rb") as file:
+        header = file.read(max(len(magic) for magic in MAGIC_NUMBERS))
+
+    for magic, compression in MAGIC_NUMBERS.items():
+        if header.startswith(magic):
+            return compression
+
+    return None
+
+
+def open_decompressor(input_path: Path, compression: str) -> BinaryIO:
+    """
+    Opens a binary stream of the decompressed file content.
+
+    Args:
+        input_path (Path): Path to the compressed file.
+        compression (str): Compression format returned by detect_compression.
+
+    Returns:
+        BinaryIO: Stream of decompressed bytes.
+
+    Raises:
+        ModuleNotFoundError: If a zstd file is read without the zstandard package.
+        ValueError: If the compression format is not supported.
+    """
+    if compression == "gzip":
+        return gzip.open(input_path, "rb")
+    if compression == "bz2":
+        return bz2.open(input_path, "rb")
+    if compression == "xz":
+        return lzma.open(input_path, "rb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError("Reading zstd-compressed logs requires the 'zstandard' package.")
+
+        return zstandard.ZstdDecompressor().stream_reader(open(input_path, "rb"), closefd=True)
+
+    raise ValueError(f"Unsupported compression format: {compression}.")
+
+
+class BackgroundReader(io.RawIOBase):
+    """
+    Raw stream that reads blocks of another stream in a background thread.
+
+    Decompression releases the GIL, so reading ahead in a separate thread
+    overlaps decompression of the next blocks with parsing of the current one.
+    At most QUEUE_SIZE blocks are buffered.
+    """
+
+    def __init__(self, stream: BinaryIO, block_size: int = BLOCK_SIZE):
+        super().__init__()
+        self._stream = stream
+        self._block_size = block_size
+        self._blocks = queue.Queue(maxsize=QUEUE_SIZE)
+        self._stopped = threading.Event()
+        self._current = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stopped.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _produce(self) -> None:
+        try:
+            while block := self._stream.read(self._block_size):
+                if not self._put(block):
+                    return
+        except Exception as error:
+            self._put(error)
+        finally:
+            self._put(None)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._current:
+            if self._eof:
+                return 0
+
+            block = self._blocks.get()
+
+            if block is None:
+                self._eof = True
+                return 0
+            if isinstance(block, Exception):
+                raise block
+
+            self._current = memoryview(block)
+
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stopped.set()
+            self._thread.join()
+            self._stream.close()
+
+        super().close()
+
+
+def open_log(input_path: Path) -> TextIO:
+    """
+    Opens a log file for reading text, decompressing it transparently.
+
+    Compressed files are recognized by their magic bytes, not by extension,
+    and are decompressed in large blocks by a background thread. Bytes that
+    are not valid UTF-8 are replaced, so they end up in a malformed entry
+    instead of aborting the read.
+
+    Args:
+        input_path (Path): Path to the plain or compressed log file.
+
+    Returns:
+        TextIO: Text stream of the log content.
+
+    Raises:
+        ModuleNotFoundError: If a zstd file is read without the zstandard package.
+    """
+    compression = detect_compression(input_path)
+
+    if compression is None:
+        return open(input_path, "r", encoding="utf-8", errors="replace")
+
+    raw = BackgroundReader(open_decompressor(input_path, compression))
+
+    return io.TextIOWrapper(io.BufferedReader(raw, buffer_size=BLOCK_SIZE), encoding="utf-8", errors="replace")
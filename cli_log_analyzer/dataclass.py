@@ -1,7 +1,16 @@
-from dataclasses import dataclass
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
+from cli_log_analyzer.sketches import HeavyHitters
 
-@dataclass()
+if TYPE_CHECKING:
+    from cli_log_analyzer.log_format import LogFormat
+
+
+@dataclass(slots=True)
 class NginxLog:
     ip: str
     timestamp: str
@@ -9,3 +18,333 @@ class NginxLog:
     path_: str
     status: int
     response_size: int
+    request_time: float | None = None
+
+
+@dataclass()
+class BadLines:
+    """
+    Number of malformed log entries skipped in lenient mode and a sample of them.
+
+    Attributes:
+        count (int): Number of skipped entries.
+        samples (list[tuple[int, str]]): Line numbers and contents of the first skipped entries.
+        max_samples (int): Maximum number of kept samples.
+    """
+    count: int = 0
+    samples: list[tuple[int, str]] = field(default_factory=list)
+    max_samples: int = 10
+
+    def add(self, line_number: int, line: str | bytes) -> None:
+        self.count += 1
+
+        if len(self.samples) < self.max_samples:
+            if isinstance(line, bytes):
+                line = line.decode(errors="replace")
+            self.samples.append((line_number, line.rstrip("\r\n")))
+
+    def merge(self, other: "BadLines", line_offset: int = 0) -> None:
+        """
+        Appends the entries skipped after the entries counted so far.
+
+        Args:
+            other (BadLines): Skipped entries of the following lines.
+            line_offset (int): Number of lines before the first line of other.
+        """
+        self.count += other.count
+        self.max_samples = max(self.max_samples, other.max_samples)
+        room = self.max_samples - len(self.samples)
+
+        if room > 0:
+            self.samples.extend((line_number + line_offset, line) for line_number, line in other.samples[:room])
+
+
+@dataclass()
+class LogStatistics:
+    """
+    Running aggregates of parsed log entries.
+
+    Entries are folded in one at a time, so the memory used does not depend
+    on the number of processed lines, only on the number of distinct IPs
+    and status codes. With a HeavyHitters summary as ip_requests the memory
+    for IPs is bounded as well, at the cost of approximate counts.
+    """
+    total_size: int = 0
+    count: int = 0
+    ip_requests: Counter = field(default_factory=Counter)
+    client_errors: Counter = field(default_factory=Counter)
+    server_errors: Counter = field(default_factory=Counter)
+    metrics: dict = field(default_factory=dict)
+    bad_lines: BadLines = field(default_factory=BadLines)
+
+    def add(self, ip: str, status: int, response_size: int) -> None:
+        self.total_size += response_size
+        self.count += 1
+        self.ip_requests[ip] += 1
+
+        if 400 <= status < 500:
+            self.client_errors[status] += 1
+        elif 500 <= status < 600:
+            self.server_errors[status] += 1
+
+    def update(self, entity: NginxLog) -> None:
+        self.add(entity.ip, entity.status, entity.response_size)
+
+        if self.metrics:
+            for metric in self.metrics.values():
+                metric.add(entity)
+
+    def merge(self, other: "LogStatistics") -> None:
+        if isinstance(other.ip_requests, HeavyHitters) and not isinstance(self.ip_requests, HeavyHitters):
+            self.ip_requests = HeavyHitters(other.ip_requests.capacity, list(self.ip_requests.items()))
+            self.ip_requests.prune()
+
+        if other.bad_lines.count:
+            self.bad_lines.merge(other.bad_lines, self.count + self.bad_lines.count)
+
+        self.total_size += other.total_size
+        self.count += other.count
+        self.ip_requests.update(other.ip_requests)
+        self.client_errors.update(other.client_errors)
+        self.server_errors.update(other.server_errors)
+
+        for name, metric in other.metrics.items():
+            if name in self.metrics:
+                self.metrics[name].merge(metric)
+            else:
+                self.metrics[name] = metric
+
+    def to_dict(self) -> dict:
+        """
+        Serializes the statistics into JSON-compatible data.
+
+        Counters are stored as lists of pairs to keep their insertion order,
+        which decides the order of equally common items in the report.
+        """
+        data = {
+            "total_size": self.total_size,
+            "count": self.count,
+            "ip_requests": list(self.ip_requests.items()),
+            "client_errors": list(self.client_errors.items()),
+            "server_errors": list(self.server_errors.items()),
+        }
+
+        if isinstance(self.ip_requests, HeavyHitters):
+            data["ip_capacity"] = self.ip_requests.capacity
+            data["ip_error"] = self.ip_requests.error
+
+        if self.metrics:
+            data["metrics"] = {name: metric.to_dict() for name, metric in self.metrics.items()}
+
+        if self.bad_lines.count:
+            data["bad_lines"] = {
+                "count": self.bad_lines.count,
+                "samples": self.bad_lines.samples,
+                "max_samples": self.bad_lines.max_samples,
+            }
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LogStatistics":
+        # Imported here because the aggregators themselves depend on this module.
+        from cli_log_analyzer.utilities import AGGREGATORS
+
+        if "ip_capacity" in data:
+            ip_requests = HeavyHitters(data["ip_capacity"], data["ip_requests"], data["ip_error"])
+        else:
+            ip_requests = Counter(dict(data["ip_requests"]))
+
+        return cls(
+            total_size=data["total_size"],
+            count=data["count"],
+            ip_requests=ip_requests,
+            client_errors=Counter({int(status): count for status, count in data["client_errors"]}),
+            server_errors=Counter({int(status): count for status, count in data["server_errors"]}),
+            metrics={
+                name: AGGREGATORS[name].from_dict(metric)
+                for name, metric in data.get("metrics", {}).items()
+            },
+            bad_lines=BadLines(
+                data["bad_lines"]["count"],
+                [(line_number, line) for line_number, line in data["bad_lines"]["samples"]],
+                data["bad_lines"]["max_samples"],
+            ) if "bad_lines" in data else BadLines(),
+        )
+
+
+@dataclass()
+class AnalysisOptions:
+    """
+    Settings that decide how log files are read and aggregated.
+
+    Attributes:
+        use_mmap (bool): Whether to match the memory-mapped bytes of plain files directly.
+        ip_capacity (int | None):
+            Number of IPs tracked by an approximate HeavyHitters summary,
+            or None to count every IP exactly.
+        backend (str):
+            "python" to fold entries one by one, or "numpy" to aggregate
+            columnar batches with NumPy.
+        metrics (tuple[str, ...]):
+            Names of additional aggregators from utilities.AGGREGATORS
+            computed in the same pass. They need complete parsed entries,
+            so the memory-mapped reader and the NumPy backend are not used.
+        log_format (str | None):
+            Nginx log_format string of the analyzed files, or None for
+            the built-in common and combined formats.
+        lenient (bool):
+            Whether malformed entries are counted and skipped instead of
+            aborting the analysis.
+        max_samples (int): Number of malformed entries kept as samples in lenient mode.
+    """
+    use_mmap: bool = False
+    ip_capacity: int | None = None
+    backend: str = "python"
+    metrics: tuple[str, ...] = ()
+    log_format: str | None = None
+    lenient: bool = False
+    max_samples: int = 10
+
+    @property
+    def reads_mmap(self) -> bool:
+        """
+        Whether plain files are matched in their memory-mapped form.
+
+        They are with use_mmap and with the NumPy backend, which parses them
+        straight into columns, unless additional metrics need complete entries.
+        """
+        return (self.use_mmap or self.backend == "numpy") and not self.metrics
+
+    def create_statistics(self) -> LogStatistics:
+        # Imported here because the aggregators themselves depend on this module.
+        from cli_log_analyzer.utilities import AGGREGATORS
+
+        statistics = LogStatistics(
+            metrics={name: AGGREGATORS[name]() for name in self.metrics},
+            bad_lines=BadLines(max_samples=self.max_samples),
+        )
+
+        if self.ip_capacity:
+            statistics.ip_requests = HeavyHitters(self.ip_capacity)
+
+        return statistics
+
+    def compile_log_format(self) -> "LogFormat | None":
+        """
+        Compiles the log format, capturing only the fields read by the enabled metrics.
+
+        Returns:
+            LogFormat | None: The compiled parser, or None for the built-in formats.
+
+        Raises:
+            ValueError: If the log format lacks the IP, status or response size, or a field of an enabled metric.
+        """
+        if self.log_format is None:
+            return None
+
+        from cli_log_analyzer.log_format import REQUIRED_FIELDS, VARIABLES, compile_log_format
+        from cli_log_analyzer.utilities import AGGREGATORS
+
+        fields = REQUIRED_FIELDS.union(*(AGGREGATORS[name].fields for name in self.metrics))
+        compiled = compile_log_format(self.log_format, fields)
+
+        for name in self.metrics:
+            aggregator = AGGREGATORS[name]
+            missing = set(aggregator.fields) - set(aggregator.optional_fields) - compiled.fields
+
+            if missing:
+                variables = sorted(
+                    f"${variable}" for variable, (provided, _, _) in VARIABLES.items() if missing & set(provided)
+                )
+                raise ValueError(f"The {name} metric requires a log format with {' and '.join(variables)}.")
+
+        return compiled
+
+
+class LogBatch:
+    """
+    Columnar container of the aggregated fields of many log entries.
+
+    Statuses and response sizes are stored in typed arrays and IPs as
+    integer codes into a table of distinct IP strings, so a record costs
+    about 14 bytes instead of a Python object per field. IP codes are
+    assigned in order of first occurrence.
+
+    Attributes:
+        ip_codes (array): Code of the IP of every record.
+        ip_values (list[str]): Distinct IPs, indexed by their code.
+        statuses (array): Status code of every record.
+        sizes (array): Response size of every record.
+    """
+
+    def __init__(self):
+        self.ip_codes = array("I")
+        self.ip_values: list[str] = []
+        self.statuses = array("H")
+        self.sizes = array("Q")
+        self._ip_index: dict[str, int] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[NginxLog]) -> "LogBatch":
+        batch = cls()
+
+        for record in records:
+            batch.append(record.ip, record.status, record.response_size)
+
+        return batch
+
+    @classmethod
+    def from_fields(cls, fields: Iterable[tuple[str, int, int]]) -> "LogBatch":
+        batch = cls()
+
+        for ip, status, response_size in fields:
+            batch.append(ip, status, response_size)
+
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.ip_codes)
+
+    def __iter__(self) -> Iterator[tuple[str, int, int]]:
+        ip_values = self.ip_values
+
+        for code, status, response_size in zip(self.ip_codes, self.statuses, self.sizes):
+            yield ip_values[code], status, response_size
+
+    def append(self, ip: str, status: int, response_size: int) -> None:
+        code = self._ip_index.get(ip)
+
+        if code is None:
+            code = self._ip_index[ip] = len(self.ip_values)
+            self.ip_values.append(ip)
+
+        self.ip_codes.append(code)
+        self.statuses.append(status)
+        self.sizes.append(response_size)
+
+    def to_statistics(self) -> LogStatistics:
+        """
+        Aggregates the columns in bulk.
+
+        Counting is done over the integer columns, and the counters are
+        built in order of first occurrence, so the result equals folding
+        the records into a LogStatistics one by one.
+
+        Returns:
+            LogStatistics: Aggregated statistics of the records.
+        """
+        code_counts = Counter(self.ip_codes)
+        status_counts = Counter(self.statuses)
+
+        return LogStatistics(
+            total_size=sum(self.sizes),
+            count=len(self),
+            ip_requests=Counter({ip: code_counts[code] for code, ip in enumerate(self.ip_values)}),
+            client_errors=Counter({
+                status: count for status, count in status_counts.items() if 400 <= status < 500
+            }),
+            server_errors=Counter({
+                status: count for status, count in status_counts.items() if 500 <= status < 600
+            }),
+        )
@@ -0,0 +1,219 @@
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from cli_log_analyzer.dataclass import LogStatistics, NginxLog
+from cli_log_analyzer.log_format import LogFormat, compile_timestamped_format
+from cli_log_analyzer.parsers import parse_line
+from cli_log_analyzer.timestamps import parse_timestamp
+from cli_log_analyzer.utilities import build_report, merge_statistics, report_statistics
+
+
+class RollingWindow:
+    """
+    Statistics of the log entries of the last `window` seconds.
+
+    Entries are aggregated into buckets of `bucket_size` seconds by their
+    log timestamp. Buckets that fall out of the window are dropped as a
+    whole, so memory is bounded by the number of buckets and the distinct
+    IPs and statuses within them, not by the number of entries.
+
+    Attributes:
+        window (int): Length of the window in seconds.
+        bucket_size (int): Length of a single bucket in seconds.
+        latest (int | None): Newest log timestamp seen so far, the end of the window.
+    """
+
+    def __init__(self, window: int = 300, bucket_size: int = 10):
+        self.window = window
+        self.bucket_size = bucket_size
+        self.latest = None
+        self._buckets: deque[tuple[int, LogStatistics]] = deque()
+
+    def add(self, entity: NginxLog, timestamp: int | None = None) -> None:
+        """
+        Adds a log entry to the bucket of its timestamp.
+
+        Args:
+            entity (NginxLog): Parsed log entry.
+            timestamp (int | None): Unix timestamp of the entry, parsed from entity if omitted.
+        """
+        if timestamp is None:
+            timestamp = parse_timestamp(entity.timestamp)
+
+        if self.latest is None or timestamp > self.latest:
+            self.latest = timestamp
+            self.expire()
+
+        if timestamp <= self.latest - self.window:
+            return
+
+        start = timestamp - timestamp % self.bucket_size
+
+        if not self._buckets or self._buckets[-1][0] < start:
+            self._buckets.append((start, LogStatistics()))
+            self._buckets[-1][1].update(entity)
+            return
+
+        # Entries are usually in order, so the bucket is found near the end.
+        for index in range(len(self._buckets) - 1, -1, -1):
+            bucket_start, statistics = self._buckets[index]
+
+            if bucket_start == start:
+                statistics.update(entity)
+                return
+            if bucket_start < start:
+                break
+        else:
+            index = -1
+
+        self._buckets.insert(index + 1, (start, LogStatistics()))
+        self._buckets[index + 1][1].update(entity)
+
+    def expire(self) -> None:
+        """
+        Drops the buckets that lie entirely outside of the window.
+        """
+        while self._buckets and self._buckets[0][0] + self.bucket_size <= self.latest - self.window:
+            self._buckets.popleft()
+
+    def statistics(self) -> LogStatistics:
+        """
+        Merges the buckets of the window into a single LogStatistics.
+
+        Returns:
+            LogStatistics: Statistics of the entries within the window.
+        """
+        return merge_statistics(statistics for _, statistics in self._buckets)
+
+
+def follow_lines(input_path: Path, poll_interval: float = 1.0) -> Iterator[str | None]:
+    """
+    Yields lines appended to the file, like `tail -F`.
+
+    Reading starts at the current end of the file. A partially written
+    line is held back until its newline arrives. When the file is replaced
+    (e.g. by log rotation) the rest of the old file is read and then the
+    new file is followed from its beginning; a truncated file is followed
+    from its beginning as well. Bytes that are not valid UTF-8 are
+    replaced, so they end up in a malformed entry.
+
+    Args:
+        input_path (Path): Path to the log file.
+        poll_interval (float): Seconds to wait for new data when the end of the file is reached.
+
+    Yields:
+        str | None: A complete line, or None each time no new data is available.
+    """
+    file = open(input_path, "rb")
+    file.seek(0, os.SEEK_END)
+    pending = b""
+
+    try:
+        while True:
+            chunk = file.readline()
+
+            if chunk:
+                pending += chunk
+
+                if pending.endswith(b"\n"):
+                    yield pending.decode(errors="replace")
+                    pending = b""
+
+                continue
+
+            try:
+                path_stat = os.stat(input_path)
+            except FileNotFoundError:
+                path_stat = None
+
+            if path_stat is not None and path_stat.st_ino != os.fstat(file.fileno()).st_ino:
+                file.close()
+                file = open(input_path, "rb")
+                pending = b""
+                continue
+
+            if path_stat is not None and path_stat.st_size < file.tell():
+                file.seek(0)
+                pending = b""
+                continue
+
+            yield None
+            time.sleep(poll_interval)
+    finally:
+        file.close()
+
+
+def compile_follow_format(log_format: str) -> LogFormat:
+    """
+    Compiles a log format for follow mode, which needs the timestamp of every entry.
+
+    Args:
+        log_format (str): Nginx log_format string of the followed file.
+
+    Returns:
+        LogFormat: The compiled parser, capturing the timestamp.
+
+    Raises:
+        ValueError: If the format lacks a required variable or $time_local.
+    """
+    return compile_timestamped_format(log_format, "Following a log")
+
+
+def follow(
+        input_path: Path,
+        window: int = 300,
+        bucket_size: int = 10,
+        interval: float = 10.0,
+        poll_interval: float = 1.0,
+        log_format: str | None = None,
+        output: Callable[[list[dict]], None] | None = None,
+) -> None:
+    """
+    Follows a growing log file and periodically reports the rolling-window statistics.
+
+    Malformed lines are logged and skipped instead of stopping the process.
+    Runs until interrupted.
+
+    Args:
+        input_path (Path): Path to the log file.
+        window (int): Length of the window in seconds.
+        bucket_size (int): Length of a single bucket of the window in seconds.
+        interval (float): Seconds between two reports.
+        poll_interval (float): Seconds to wait for new data at the end of the file.
+        log_format (str | None): Nginx log_format string of the file, or None for the built-in formats.
+        output (Callable[[list[dict]], None] | None):
+            Writes the report built by build_report at every interval,
+            by default it is saved and logged like report_statistics does.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the log format lacks a required variable or $time_local, which the window needs.
+    """
+    parse = parse_line if log_format is None else compile_follow_format(log_format).parse
+
+    rolling_window = RollingWindow(window, bucket_size)
+    next_report = time.monotonic() + interval
+
+    for line in follow_lines(input_path, poll_interval):
+        if line is not None:
+            try:
+                rolling_window.add(parse(line))
+            except (AttributeError, ValueError) as error:
+                logging.warning(f"Skipping malformed log entry: {error}")
+
+        if time.monotonic() >= next_report:
+            statistics = rolling_window.statistics()
+            source = f"{input_path} (last {window} s)"
+
+            if output is None:
+                report_statistics(statistics, source)
+            else:
+                output([build_report(statistics, source)])
+
+            next_report = time.monotonic() + interval
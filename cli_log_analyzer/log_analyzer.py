@@ -1,10 +1,20 @@
 import argparse
-import re
+import glob
+import os
 from pathlib import Path
 
 from cli_log_analyzer.arg_parser import get_args
-from cli_log_analyzer.dataclass import NginxLog
-from cli_log_analyzer.utilities import analyze_data
+from cli_log_analyzer.checkpoint import collect_incremental
+from cli_log_analyzer.dataclass import AnalysisOptions
+from cli_log_analyzer.follow import follow
+from cli_log_analyzer.parallel import collect_files
+# The reading and parsing helpers live in readers and parsers, so that worker processes
+# do not import the CLI; they are re-exported here for the list-based API.
+from cli_log_analyzer.parsers import data_formater, iter_records, parse_line  # noqa: F401
+from cli_log_analyzer.readers import extract_data, iter_lines  # noqa: F401
+from cli_log_analyzer.rollups import index_files, parse_time, query_index
+from cli_log_analyzer.utilities import build_report, log_report, merge_statistics
+from cli_log_analyzer.writers import write_reports
 
 
 def check_file(args: argparse.Namespace) -> Path:
@@ -29,72 +39,168 @@ def check_file(args: argparse.Namespace) -> Path:
     return source_file
 
 
-def extract_data(input_path: Path) -> list[str]:
+def check_files(args: argparse.Namespace) -> list[Path]:
     """
-    Reads log file content and returns a list of log entries.
+    Expands glob patterns and verifies the existence of the log files.
 
     Args:
-        input_path (Path): Path to the log file.
+        args (argparse.Namespace):
+            Parsed command-line arguments containing one or more log file
+            paths or glob patterns.
 
     Returns:
-        list[str]:
-            A list of log entries, each representing a single line from the log file.
+        list[Path]: Resolved absolute paths to the log files, without duplicates.
+
+    Raises:
+        FileNotFoundError: If a file does not exist or a pattern matches no files.
     """
-    with open(input_path, "r") as file:
-        data = file.readlines()
+    patterns = [args.log_file] if isinstance(args.log_file, str) else args.log_file
+    source_files = []
+
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            matches = sorted(path for path in glob.glob(pattern) if Path(path).is_file())
+
+            if not matches:
+                raise FileNotFoundError(f"No files match the pattern {pattern}.")
+        else:
+            matches = [pattern]
+
+        for match in matches:
+            source_file = check_file(argparse.Namespace(log_file=match))
+
+            if source_file not in source_files:
+                source_files.append(source_file)
 
-        return data
+    return source_files
 
 
-def data_formater(data: list[str]) -> list[NginxLog]:
+def output_reports(args: argparse.Namespace, reports: list[dict]) -> None:
     """
-    Parses raw log data and converts it into structured NginxLog instances.
+    Writes the reports of the run in the selected format and logs them unless quiet.
 
     Args:
-        data (list[str]): A list of log entries.
+        args (argparse.Namespace):
+            Parsed command-line arguments containing optionally the output
+            format, the output path and the quiet flag.
+        reports (list[dict]): Reports built by build_report.
 
     Returns:
-        list[NginxLog]: A list of NginxLog objects, each containing structured log data.
-
-    Raises:
-        AttributeError: If a log entry does not match the expected format.
+        None
     """
-    entity_list = []
-
-    try:
-        for element in data:
-            entity_list.append(
-                NginxLog(
-                    ip=re.search(r"\d+.\d+.\d+.\d+", element).group(0),
-                    timestamp=re.search(r"\d+/\w{3}/\d+:\d+:\d+:\d+ [+-]\d+", element).group(0),
-                    method = re.search(r'"([A-Z]{3,10}) ', element).group(1),
-                    path_ = re.search(r"/[\w./?=&-]* ", element).group(0),
-                    status = int(re.search(r'" (\d{3}) ', element).group(1)),
-                    response_size = int(re.search(r"\d+$", element).group(0)),
-                )
-            )
-    except AttributeError as error:
-        raise AttributeError(f"An unexpected error occurred: {error}")
+    output = getattr(args, "output", None)
+    write_reports(reports, getattr(args, "format", "text"), Path(output) if output else None)
 
-    return entity_list
+    if not getattr(args, "quiet", False):
+        for report in reports:
+            log_report(report)
 
 
 def main(args: argparse.Namespace) -> None:
     """
     Main function that orchestrates log file processing and analysis.
 
+    Files are streamed: lines are read lazily, parsed and folded into
+    the running aggregates, so memory usage does not grow with file size.
+    With more than one worker the files are analyzed in a process pool and
+    plain files are split into byte ranges. The memory-mapped reader matches
+    the raw bytes of the file and decodes only the aggregated fields.
+    Compressed files can only be read sequentially and are always streamed.
+    With a checkpoint only the lines appended since the previous run are
+    parsed and merged into the stored totals. The results of all files are
+    merged into one report. In follow mode the first file is followed like
+    `tail -F` and rolling-window statistics are reported periodically,
+    written and logged with the output settings of the run.
+    In approximate mode IP requests are counted by a bounded-memory summary.
+    The NumPy backend aggregates batches of entries with vectorized operations.
+    Additional metrics from the aggregator registry are computed in the same pass.
+    A custom Nginx log_format is compiled into a parser of only the needed fields.
+    In lenient mode malformed lines are counted, sampled and skipped.
+    The "index" command parses the files once into per-hour rollups, and
+    "analyze" with an index answers time-range queries from those rollups.
+    The reports of a run are written at once as text, JSON, NDJSON or CSV.
+
     Args:
         args (argparse.Namespace):
-            Parsed command-line arguments containing the log file path.
+            Parsed command-line arguments containing the log file paths
+            and optionally the number of worker processes, the reader mode,
+            whether to report every file separately, the checkpoint path,
+            the follow mode settings, the approximate IP summary capacity,
+            the aggregation backend, the additional metrics, the log format
+            the lenient mode settings, the command, the index settings
+            and the output settings.
 
     Returns:
         None
     """
-    access_file = check_file(args)
+    access_files = check_files(args)
+
+    if getattr(args, "follow", False):
+        try:
+            follow(
+                access_files[0],
+                window=args.window,
+                bucket_size=args.bucket,
+                interval=args.interval,
+                log_format=getattr(args, "log_format", None),
+                output=lambda reports: output_reports(args, reports),
+            )
+        except KeyboardInterrupt:
+            pass
+
+        return
+
+    workers = getattr(args, "workers", None)
+    options = AnalysisOptions(
+        use_mmap=getattr(args, "mmap", False),
+        ip_capacity=getattr(args, "approx", None),
+        backend=getattr(args, "backend", "python"),
+        metrics=tuple(getattr(args, "metrics", ())),
+        log_format=getattr(args, "log_format", None),
+        lenient=getattr(args, "lenient", False),
+        max_samples=getattr(args, "max_samples", 10),
+    )
+    # Compiled once up front, so an unusable log format fails before any file is read.
+    options.compile_log_format()
+
+    if workers is None:
+        workers = min(len(access_files), os.cpu_count() or 1)
+
+    checkpoint = getattr(args, "checkpoint", None)
+
+    command = getattr(args, "command", "analyze")
+    index = getattr(args, "index", None)
+
+    if command == "index" or index:
+        if options.metrics:
+            raise ValueError("Additional metrics cannot be answered from the per-hour rollups.")
+
+        if access_files:
+            index_files(access_files, Path(index), workers, options)
+
+        if command == "index":
+            return
+
+        since = getattr(args, "since", None)
+        until = getattr(args, "until", None)
+        statistics = query_index(Path(index), parse_time(since), parse_time(until))
+        output_reports(args, [build_report(statistics, source=f"{index} ({since or '...'} - {until or '...'})")])
+
+        return
+
+    if checkpoint:
+        results = collect_incremental(access_files, Path(checkpoint), options, workers)
+    else:
+        results = collect_files(access_files, workers, options)
+
+    reports = []
+
+    if getattr(args, "per_file", False) and len(access_files) > 1:
+        for access_file, statistics in zip(access_files, results):
+            reports.append(build_report(statistics, source=str(access_file)))
 
-    raw_data = extract_data(access_file)
-    processed_data = data_formater(raw_data)
-    analyze_data(processed_data)
+    reports.append(build_report(merge_statistics(results)))
+    output_reports(args, reports)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from cli_log_analyzer.dataclass import NginxLog
+
+
+# Fields without which the basic statistics cannot be computed.
+REQUIRED_FIELDS = frozenset({"ip", "status", "response_size"})
+QUOTED_VALUE = r'(?:[^"\\]|\\.)*'
+# Nginx variables with a known layout, as (NginxLog fields, pattern capturing them, pattern matching them).
+VARIABLES = {
+    "remote_addr": (("ip",), r"(?P<ip>\S+)", r"\S+"),
+    "time_local": (
+        ("timestamp",),
+        r"(?P<timestamp>\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4})",
+        r"\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4}",
+    ),
+    "request": (
+        ("method", "path_"),
+        r"(?P<method>[A-Z]{3,10}) (?P<path_>\S* )[^\"]*",
+        r'[^"]*',
+    ),
+    "status": (("status",), r"(?P<status>\d{3})", r"\d{3}"),
+    "body_bytes_sent": (("response_size",), r"(?P<response_size>\d+|-)", r"\d+|-"),
+    "bytes_sent": (("response_size",), r"(?P<response_size>\d+|-)", r"\d+|-"),
+    "request_time": (("request_time",), r"(?P<request_time>\d+(?:\.\d+)?|-)", r"\d+(?:\.\d+)?|-"),
+    "http_referer": ((), QUOTED_VALUE, QUOTED_VALUE),
+    "http_user_agent": ((), QUOTED_VALUE, QUOTED_VALUE),
+}
+VARIABLE_PATTERN = re.compile(r"\$(?:\{(\w+)\}|(\w+))")
+
+
+@dataclass(frozen=True)
+class LogFormat:
+    """
+    Parser compiled from an Nginx log_format string.
+
+    Attributes:
+        log_format (str): The source log_format string.
+        fields (frozenset[str]): NginxLog fields captured by the patterns.
+        pattern (re.Pattern): Pattern matching a decoded log line.
+        bytes_pattern (re.Pattern): The same pattern for raw bytes.
+    """
+    log_format: str
+    fields: frozenset[str]
+    pattern: re.Pattern
+    bytes_pattern: re.Pattern
+
+    def parse(self, line: str) -> NginxLog:
+        """
+        Parses a single log entry, leaving the fields that are not captured empty.
+
+        Args:
+            line (str): A single log entry.
+
+        Returns:
+            NginxLog: Structured log data.
+
+        Raises:
+            AttributeError: If the log entry does not match the log format.
+        """
+        match = self.pattern.match(line)
+
+        if match is None:
+            raise AttributeError(f"Log entry does not match the log format: {line!r}")
+
+        groups = match.groupdict("")
+        response_size = groups["response_size"]
+        request_time = groups.get("request_time")
+
+        return NginxLog(
+            ip=groups["ip"],
+            timestamp=groups.get("timestamp", ""),
+            method=groups.get("method", ""),
+            path_=groups.get("path_", ""),
+            status=int(groups["status"]),
+            response_size=int(response_size) if response_size != "-" else 0,
+            request_time=float(request_time) if request_time and request_time != "-" else None,
+        )
+
+
+@lru_cache()
+def compile_log_format(log_format: str, fields: frozenset[str] = REQUIRED_FIELDS) -> LogFormat:
+    """
+    Compiles an Nginx log_format string into a single anchored pattern.
+
+    Only the variables that provide one of the requested fields become
+    capturing groups; every other variable is matched without capturing.
+    Variables with an unknown layout match everything up to the next literal
+    character of the format, so matching never backtracks across fields.
+
+    Args:
+        log_format (str): Nginx log_format string, e.g.
+            '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent'.
+        fields (frozenset[str]): NginxLog fields needed by the enabled aggregations.
+
+    Returns:
+        LogFormat: The compiled parser.
+
+    Raises:
+        ValueError: If the format lacks a variable for one of the required fields.
+    """
+    fields = fields | REQUIRED_FIELDS
+    parts = []
+    captured = set()
+    position = 0
+    variables = list(VARIABLE_PATTERN.finditer(log_format))
+
+    for index, variable in enumerate(variables):
+        parts.append(re.escape(log_format[position:variable.start()]))
+        position = variable.end()
+        name = variable.group(1) or variable.group(2)
+
+        if name in VARIABLES:
+            provided, capturing, plain = VARIABLES[name]
+            needed = [field for field in provided if field in fields and field not in captured]
+
+            if needed:
+                parts.append(capturing)
+                captured.update(provided)
+            else:
+                parts.append(f"(?:{plain})")
+            continue
+
+        next_start = variables[index + 1].start() if index + 1 < len(variables) else len(log_format)
+        literal = log_format[position:next_start]
+        parts.append(f"[^{re.escape(literal[0])}]*" if literal else r".*?")
+
+    parts.append(re.escape(log_format[position:]))
+    missing = REQUIRED_FIELDS - captured
+
+    if missing:
+        raise ValueError(f"The log format does not provide the fields: {', '.join(sorted(missing))}.")
+
+    pattern = "".join(parts) + r"\s*$"
+
+    return LogFormat(
+        log_format=log_format,
+        fields=frozenset(captured),
+        pattern=re.compile(pattern),
+        bytes_pattern=re.compile(pattern.encode()),
+    )
+
+
+def compile_timestamped_format(log_format: str, purpose: str) -> LogFormat:
+    """
+    Compiles a log format for a mode that needs the timestamp of every entry.
+
+    Args:
+        log_format (str): Nginx log_format string.
+        purpose (str): What the timestamps are needed for, starting the error message, e.g. "Following a log".
+
+    Returns:
+        LogFormat: The compiled parser, capturing the timestamp.
+
+    Raises:
+        ValueError: If the format lacks a required variable or $time_local.
+    """
+    compiled = compile_log_format(log_format, REQUIRED_FIELDS | {"timestamp"})
+
+    if "timestamp" not in compiled.fields:
+        raise ValueError(f"{purpose} requires a log format with $time_local.")
+
+    return compiled
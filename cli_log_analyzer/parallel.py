@@ -0,0 +1,362 @@
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from cli_log_analyzer.compression import detect_compression
+from cli_log_analyzer.dataclass import AnalysisOptions, LogStatistics, NginxLog
+from cli_log_analyzer.parsers import (
+    LOG_PATTERN_BYTES,
+    iter_mmap_fields,
+    iter_records,
+    iter_valid_records,
+    parse_line,
+)
+from cli_log_analyzer.readers import iter_lines, iter_range_lines
+from cli_log_analyzer.utilities import collect_fields, collect_statistics
+from cli_log_analyzer.vectorized import collect_mmap_vectorized, collect_vectorized
+
+
+def split_file(input_path: Path, parts: int, start: int = 0, end: int | None = None) -> list[tuple[int, int]]:
+    """
+    Splits the file into byte ranges of roughly equal size aligned to line starts.
+
+    Args:
+        input_path (Path): Path to the log file.
+        parts (int): Desired number of ranges.
+        start (int): Offset of a line start from which the file is split.
+        end (int | None): Offset of a line start up to which the file is split, or None for its end.
+
+    Returns:
+        list[tuple[int, int]]:
+            Non-empty (start, end) byte ranges covering start to end in order.
+            Fewer ranges than requested are returned for small files.
+    """
+    file_size = input_path.stat().st_size if end is None else end
+    boundaries = [start]
+
+    with open(input_path, "rb") as file:
+        for part in range(1, parts):
+            target = max(start + (file_size - start) * part // parts, boundaries[-1])
+
+            if target >= file_size:
+                break
+
+            # Reading the rest of the line that contains the byte before target
+            # moves to the first line start at or after target.
+            file.seek(max(target - 1, 0))
+            file.readline()
+            boundaries.append(min(file.tell(), file_size))
+
+    boundaries.append(file_size)
+
+    return [
+        (start, end)
+        for start, end in zip(boundaries, boundaries[1:])
+        if start < end
+    ]
+
+
+def aggregate_fields(
+        data: Iterable[tuple[str, int, int]],
+        options: AnalysisOptions,
+        statistics: LogStatistics | None = None,
+) -> LogStatistics:
+    """
+    Aggregates (ip, status, response size) tuples with the configured backend.
+
+    Args:
+        data (Iterable[tuple[str, int, int]]): Aggregated fields of log entries.
+        options (AnalysisOptions): Reader and aggregation settings.
+        statistics (LogStatistics | None):
+            Aggregates to fold the entries into. New ones created from options by default.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the entries.
+    """
+    if statistics is None:
+        statistics = options.create_statistics()
+
+    if options.backend == "numpy":
+        return collect_vectorized(data, statistics)
+
+    return collect_fields(data, statistics)
+
+
+def aggregate_records(
+        data: Iterable[NginxLog],
+        options: AnalysisOptions,
+        statistics: LogStatistics | None = None,
+) -> LogStatistics:
+    """
+    Aggregates parsed log entries with the configured backend.
+
+    Args:
+        data (Iterable[NginxLog]): Parsed log entries.
+        options (AnalysisOptions): Reader and aggregation settings.
+        statistics (LogStatistics | None):
+            Aggregates to fold the entries into. New ones created from options by default.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the entries.
+    """
+    if statistics is None:
+        statistics = options.create_statistics()
+
+    if options.backend == "numpy" and not options.metrics:
+        return aggregate_fields(
+            ((entity.ip, entity.status, entity.response_size) for entity in data),
+            options,
+            statistics,
+        )
+
+    return collect_statistics(data, statistics)
+
+
+def analyze_lines(data: Iterable[str], options: AnalysisOptions) -> LogStatistics:
+    """
+    Parses log entries with the configured log format and aggregates them.
+
+    In lenient mode malformed entries are counted and sampled instead of
+    aborting; well-formed entries are parsed by the same code either way.
+
+    Args:
+        data (Iterable[str]): Log entries.
+        options (AnalysisOptions): Reader and aggregation settings.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the entries.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format outside of lenient mode.
+    """
+    log_format = options.compile_log_format()
+    parse = log_format.parse if log_format is not None else parse_line
+    statistics = options.create_statistics()
+
+    if options.lenient:
+        records = iter_valid_records(data, statistics.bad_lines, parse)
+    else:
+        records = iter_records(data, parse)
+
+    return aggregate_records(records, options, statistics)
+
+
+def analyze_mmap(
+        input_path: Path,
+        options: AnalysisOptions,
+        start: int = 0,
+        end: int | None = None,
+) -> LogStatistics:
+    """
+    Matches the memory-mapped bytes with the configured log format and aggregates them.
+
+    Args:
+        input_path (Path): Path to the plain log file.
+        options (AnalysisOptions): Reader and aggregation settings.
+        start (int): Offset of the first byte to read, at a line start.
+        end (int | None): Offset of the first byte after the range, at a line start.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the range.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format outside of lenient mode.
+    """
+    log_format = options.compile_log_format()
+    pattern = log_format.bytes_pattern if log_format is not None else LOG_PATTERN_BYTES
+    statistics = options.create_statistics()
+
+    if options.backend == "numpy" and not options.lenient:
+        return collect_mmap_vectorized(input_path, start, end, pattern, statistics)
+
+    bad_lines = statistics.bad_lines if options.lenient else None
+
+    return aggregate_fields(iter_mmap_fields(input_path, start, end, pattern, bad_lines), options, statistics)
+
+
+def analyze_chunk(
+        input_path: Path,
+        start: int,
+        end: int,
+        options: AnalysisOptions | None = None,
+) -> LogStatistics:
+    """
+    Parses and aggregates the lines of a single byte range.
+
+    Args:
+        input_path (Path): Path to the log file.
+        start (int): Offset of the first byte of the range.
+        end (int): Offset of the first byte after the range.
+        options (AnalysisOptions | None): Reader and aggregation settings.
+
+    Returns:
+        LogStatistics: Partial statistics of the range.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    options = options or AnalysisOptions()
+
+    if options.reads_mmap:
+        return analyze_mmap(input_path, options, start, end)
+
+    return analyze_lines(iter_range_lines(input_path, start, end), options)
+
+
+def analyze_file(input_path: Path, options: AnalysisOptions | None = None) -> LogStatistics:
+    """
+    Parses and aggregates a whole file in the current process.
+
+    Args:
+        input_path (Path): Path to the plain or compressed log file.
+        options (AnalysisOptions | None):
+            Reader and aggregation settings. The memory-mapped reader
+            is not used for compressed files, which can only be streamed.
+
+    Returns:
+        LogStatistics: Statistics of the file.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    options = options or AnalysisOptions()
+
+    if options.reads_mmap and detect_compression(input_path) is None:
+        return analyze_mmap(input_path, options)
+
+    return analyze_lines(iter_lines(input_path), options)
+
+
+def analyze_task(
+        input_path: Path,
+        start: int | None,
+        end: int | None,
+        options: AnalysisOptions,
+) -> LogStatistics:
+    if start is None:
+        return analyze_file(input_path, options)
+
+    return analyze_chunk(input_path, start, end, options)
+
+
+def plan_tasks(
+        ranges: list[tuple[Path, int | None, int | None]],
+        workers: int,
+) -> list[tuple[int, Path, int | None, int | None]]:
+    """
+    Splits the work of analyzing several files into tasks for worker processes.
+
+    Each range is split further when there are more workers than ranges.
+    Compressed files cannot be split and are a single task each.
+
+    Args:
+        ranges (list[tuple[Path, int | None, int | None]]):
+            (path, start, end) of the analyzed byte ranges, where start
+            and end are None for a whole file.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list[tuple[int, Path, int | None, int | None]]:
+            Tasks in order as (range index, path, start, end), where
+            start and end are None for a task covering the whole file.
+    """
+    parts = max(1, workers // len(ranges)) if ranges else 1
+    tasks = []
+
+    for index, (input_path, start, end) in enumerate(ranges):
+        if parts > 1 and detect_compression(input_path) is None:
+            tasks.extend(
+                (index, input_path, part_start, part_end)
+                for part_start, part_end in split_file(input_path, parts, start or 0, end)
+            )
+        else:
+            tasks.append((index, input_path, start, end))
+
+    return tasks
+
+
+def collect_ranges(
+        ranges: list[tuple[Path, int | None, int | None]],
+        workers: int = 1,
+        options: AnalysisOptions | None = None,
+) -> list[LogStatistics]:
+    """
+    Analyzes byte ranges of several files, concurrently in a process pool if workers > 1.
+
+    The partial statistics of each range are merged in file order, so the
+    result is identical to analyzing the ranges sequentially.
+
+    Args:
+        ranges (list[tuple[Path, int | None, int | None]]):
+            (path, start, end) of the analyzed byte ranges, where start
+            and end are None for a whole plain or compressed file.
+        workers (int): Number of worker processes.
+        options (AnalysisOptions | None): Reader and aggregation settings.
+
+    Returns:
+        list[LogStatistics]: Statistics of every range, in the order of ranges.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    options = options or AnalysisOptions()
+
+    if workers <= 1:
+        return [analyze_task(input_path, start, end, options) for input_path, start, end in ranges]
+
+    tasks = plan_tasks(ranges, workers)
+    results = [options.create_statistics() for _ in ranges]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks) or 1)) as executor:
+        partials = executor.map(
+            analyze_task,
+            [input_path for _, input_path, _, _ in tasks],
+            [start for _, _, start, _ in tasks],
+            [end for _, _, _, end in tasks],
+            [options] * len(tasks),
+        )
+
+        for (index, *_), partial in zip(tasks, partials):
+            results[index].merge(partial)
+
+    return results
+
+
+def collect_files(
+        input_paths: list[Path],
+        workers: int = 1,
+        options: AnalysisOptions | None = None,
+) -> list[LogStatistics]:
+    """
+    Analyzes several files, concurrently in a process pool if workers > 1.
+
+    Args:
+        input_paths (list[Path]): Paths to the plain or compressed log files.
+        workers (int): Number of worker processes.
+        options (AnalysisOptions | None): Reader and aggregation settings.
+
+    Returns:
+        list[LogStatistics]: Statistics of every file, in the order of input_paths.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    return collect_ranges([(input_path, None, None) for input_path in input_paths], workers, options)
+
+
+def collect_parallel(input_path: Path, workers: int, options: AnalysisOptions | None = None) -> LogStatistics:
+    """
+    Analyzes a single file in worker processes and merges the partial results.
+
+    Args:
+        input_path (Path): Path to the log file.
+        workers (int): Number of worker processes.
+        options (AnalysisOptions | None): Reader and aggregation settings.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the whole file.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    return collect_files([input_path], workers, options)[0]
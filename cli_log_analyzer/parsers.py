@@ -0,0 +1,331 @@
+import mmap
+import re
+from collections.abc import Callable, Iterable, Iterator
+from functools import lru_cache
+from pathlib import Path
+
+from cli_log_analyzer.dataclass import BadLines, LogBatch, NginxLog
+
+
+# Nginx "common" and "combined" log formats:
+# $remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent
+# followed by optional "$http_referer" "$http_user_agent" and $request_time.
+LOG_PATTERN = re.compile(
+    r"(?P<ip>\S+) \S+ \S+ "
+    r"\[(?P<timestamp>\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4})\] "
+    r'"(?P<method>[A-Z]{3,10}) (?P<path_>\S* )[^"]*" '
+    r"(?P<status>\d{3}) (?P<response_size>\d+|-)"
+    r'(?: "(?:[^"\\]|\\.)*" "(?:[^"\\]|\\.)*")?'
+    r"(?: (?P<request_time>\d+(?:\.\d+)?))?"
+    r"\s*$"
+)
+# The same grammar for matching raw bytes of a memory-mapped file.
+LOG_PATTERN_BYTES = re.compile(LOG_PATTERN.pattern.encode())
+AGGREGATED_FIELDS = ("ip", "status", "response_size")
+NAMED_GROUP_PATTERN = re.compile(rb"\(\?P<(\w+)>")
+BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def parse_line(line: str) -> NginxLog:
+    """
+    Parses a single log entry into an NginxLog instance.
+
+    Args:
+        line (str): A single log entry.
+
+    Returns:
+        NginxLog: Structured log data.
+
+    Raises:
+        AttributeError: If the log entry does not match the expected format.
+    """
+    match = LOG_PATTERN.match(line)
+
+    if match is None:
+        raise AttributeError(f"Log entry does not match the expected format: {line!r}")
+
+    response_size = match["response_size"]
+    request_time = match["request_time"]
+
+    return NginxLog(
+        ip=match["ip"],
+        timestamp=match["timestamp"],
+        method=match["method"],
+        path_=match["path_"],
+        status=int(match["status"]),
+        response_size=int(response_size) if response_size != "-" else 0,
+        request_time=float(request_time) if request_time is not None else None,
+    )
+
+
+def iter_records(data: Iterable[str], parse: Callable[[str], NginxLog] = parse_line) -> Iterator[NginxLog]:
+    """
+    Lazily parses log entries into NginxLog instances.
+
+    Args:
+        data (Iterable[str]): Log entries, e.g. a list or the iter_lines generator.
+        parse (Callable[[str], NginxLog]):
+            Parser of a single entry, e.g. LogFormat.parse of a custom log format.
+
+    Yields:
+        NginxLog: Structured log data for each entry.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    try:
+        for element in data:
+            yield parse(element)
+    except AttributeError as error:
+        raise AttributeError(f"An unexpected error occurred: {error}")
+
+
+def iter_valid_records(
+        data: Iterable[str],
+        bad_lines: BadLines,
+        parse: Callable[[str], NginxLog] = parse_line,
+) -> Iterator[NginxLog]:
+    """
+    Lazily parses log entries, counting and skipping the malformed ones.
+
+    Args:
+        data (Iterable[str]): Log entries.
+        bad_lines (BadLines): Collects the number and samples of the skipped entries.
+        parse (Callable[[str], NginxLog]): Parser of a single entry.
+
+    Yields:
+        NginxLog: Structured log data for each well-formed entry.
+    """
+    for line_number, element in enumerate(data, 1):
+        try:
+            entity = parse(element)
+        except (AttributeError, ValueError):
+            bad_lines.add(line_number, element)
+            continue
+
+        yield entity
+
+
+def data_formater(data: list[str]) -> list[NginxLog]:
+    """
+    Parses raw log data and converts it into structured NginxLog instances.
+
+    Args:
+        data (list[str]): A list of log entries.
+
+    Returns:
+        list[NginxLog]: A list of NginxLog objects, each containing structured log data.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    return list(iter_records(data))
+
+
+def batch_formater(data: Iterable[str]) -> LogBatch:
+    """
+    Parses raw log data into a compact columnar batch.
+
+    Only the aggregated fields are kept, which needs far less memory than
+    a list of NginxLog objects when many entries have to be held at once.
+
+    Args:
+        data (Iterable[str]): Log entries.
+
+    Returns:
+        LogBatch: IPs, statuses and response sizes of the entries.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    return LogBatch.from_records(iter_records(data))
+
+
+def iter_mmap_fields(
+        input_path: Path,
+        start: int = 0,
+        end: int | None = None,
+        pattern: re.Pattern = LOG_PATTERN_BYTES,
+        bad_lines: BadLines | None = None,
+) -> Iterator[tuple[str, int, int]]:
+    """
+    Lazily extracts the aggregated fields from a memory-mapped log file.
+
+    Lines are located by scanning the mapped buffer for newlines and matched
+    in place with the bytes grammar, so the file is neither copied into
+    Python strings nor decoded. Only the IP, status and response size of
+    each entry are converted to Python objects.
+
+    Args:
+        input_path (Path): Path to the log file.
+        start (int): Offset of the first byte to read, at a line start.
+        end (int | None): Offset of the first byte after the range, at a line start.
+            Defaults to the end of the file.
+        pattern (re.Pattern):
+            Bytes pattern with the ip, status and response_size groups,
+            e.g. LogFormat.bytes_pattern of a custom log format.
+        bad_lines (BadLines | None):
+            Collects malformed entries, which are then skipped.
+            By default a malformed entry aborts the analysis.
+
+    Yields:
+        tuple[str, int, int]: IP address, status code and response size of an entry.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format and bad_lines is None.
+    """
+    if input_path.stat().st_size == 0:
+        return
+
+    with (
+        open(input_path, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+    ):
+        if hasattr(buffer, "madvise"):
+            buffer.madvise(mmap.MADV_SEQUENTIAL)
+
+        end = len(buffer) if end is None else end
+        match = pattern.match
+        find = buffer.find
+        position = start
+        # Line numbers are only needed for samples, so lines are counted lazily when one is taken.
+        counted_position = start
+        counted_lines = 0
+
+        while position < end:
+            newline = find(b"\n", position, end)
+
+            if newline == -1:
+                newline = end
+
+            entry = match(buffer, position, newline)
+
+            if entry is None:
+                if bad_lines is not None:
+                    line_number = 0
+
+                    if len(bad_lines.samples) < bad_lines.max_samples:
+                        counted_lines += buffer[counted_position:position].count(b"\n")
+                        counted_position = position
+                        line_number = counted_lines + 1
+
+                    bad_lines.add(line_number, buffer[position:newline])
+                    position = newline + 1
+                    continue
+
+                line = buffer[position:newline].decode(errors="replace")
+                raise AttributeError(
+                    f"An unexpected error occurred: "
+                    f"Log entry does not match the expected format: {line!r}"
+                )
+
+            response_size = entry["response_size"]
+
+            yield (
+                entry["ip"].decode(errors="replace"),
+                int(entry["status"]),
+                int(response_size) if response_size != b"-" else 0,
+            )
+
+            position = newline + 1
+
+
+@lru_cache
+def compile_fields_pattern(pattern: re.Pattern) -> re.Pattern:
+    """
+    Turns a bytes line pattern into a multiline one that captures only the aggregated fields.
+
+    With findall, such a pattern extracts the fields of every line of a
+    block in a single call, as tuples of bytes in the order of the groups.
+
+    Args:
+        pattern (re.Pattern): Bytes pattern with the ip, status and response_size groups.
+
+    Returns:
+        re.Pattern: Pattern matching a whole line at every line start.
+    """
+    def replace(group: re.Match) -> bytes:
+        return group[0] if group[1].decode() in AGGREGATED_FIELDS else b"(?:"
+
+    return re.compile(b"^(?:" + NAMED_GROUP_PATTERN.sub(replace, pattern.pattern) + b")", re.MULTILINE)
+
+
+def iter_mmap_matches(
+        input_path: Path,
+        start: int = 0,
+        end: int | None = None,
+        pattern: re.Pattern = LOG_PATTERN_BYTES,
+        block_size: int = BLOCK_SIZE,
+) -> Iterator[list[tuple[bytes, ...]]]:
+    """
+    Extracts the aggregated fields of a memory-mapped log file block by block.
+
+    Every block of about block_size bytes, aligned to line ends, is matched
+    with a single findall of compile_fields_pattern(pattern), so no Python
+    code runs per line. A block with another number of matches than lines
+    contains a malformed entry; it is then matched line by line to report it.
+
+    Args:
+        input_path (Path): Path to the log file.
+        start (int): Offset of the first byte to read, at a line start.
+        end (int | None): Offset of the first byte after the range, at a line start.
+            Defaults to the end of the file.
+        pattern (re.Pattern): Bytes pattern with the ip, status and response_size groups.
+        block_size (int): Number of bytes matched at once.
+
+    Yields:
+        list[tuple[bytes, ...]]: The groups of compile_fields_pattern(pattern) of every line of a block.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+    """
+    if input_path.stat().st_size == 0:
+        return
+
+    fields_pattern = compile_fields_pattern(pattern)
+    findall = fields_pattern.findall
+    match = fields_pattern.match
+
+    with (
+        open(input_path, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+    ):
+        if hasattr(buffer, "madvise"):
+            buffer.madvise(mmap.MADV_SEQUENTIAL)
+
+        end = len(buffer) if end is None else end
+        position = start
+
+        while position < end:
+            block_end = end
+
+            if position + block_size < end:
+                block_end = buffer.rfind(b"\n", position, position + block_size) + 1 or end
+
+            matches = findall(buffer, position, block_end)
+            lines = buffer[position:block_end].count(b"\n") + (buffer[block_end - 1] != ord("\n"))
+
+            if len(matches) != lines:
+                matches = []
+                line_start = position
+
+                while line_start < block_end:
+                    newline = buffer.find(b"\n", line_start, block_end)
+
+                    if newline == -1:
+                        newline = block_end
+
+                    entry = match(buffer, line_start, newline)
+
+                    if entry is None:
+                        line = buffer[line_start:newline].decode(errors="replace")
+                        raise AttributeError(
+                            f"An unexpected error occurred: "
+                            f"Log entry does not match the expected format: {line!r}"
+                        )
+
+                    matches.append(entry.groups())
+                    line_start = newline + 1
+
+            yield matches
+            position = block_end
@@ -0,0 +1,65 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+from cli_log_analyzer.compression import open_log
+
+
+def extract_data(input_path: Path) -> list[str]:
+    """
+    Reads log file content and returns a list of log entries.
+
+    Args:
+        input_path (Path): Path to the plain or compressed log file.
+
+    Returns:
+        list[str]:
+            A list of log entries, each representing a single line from the log file.
+    """
+    with open_log(input_path) as file:
+        data = file.readlines()
+
+        return data
+
+
+def iter_lines(input_path: Path) -> Iterator[str]:
+    """
+    Lazily reads the log file line by line.
+
+    Unlike extract_data, only the current line is held in memory,
+    so arbitrarily large files can be processed. Compressed files
+    are decompressed on the fly.
+
+    Args:
+        input_path (Path): Path to the plain or compressed log file.
+
+    Yields:
+        str: A single line from the log file.
+    """
+    with open_log(input_path) as file:
+        yield from file
+
+
+def iter_range_lines(input_path: Path, start: int, end: int) -> Iterator[str]:
+    """
+    Lazily reads the lines that begin within the byte range [start, end).
+
+    Like open_log, bytes that are not valid UTF-8 are replaced.
+
+    Args:
+        input_path (Path): Path to the log file.
+        start (int): Offset of the first byte of the range, at a line start.
+        end (int): Offset of the first byte after the range, at a line start.
+
+    Yields:
+        str: A single line from the range.
+    """
+    with open(input_path, "rb") as file:
+        file.seek(start)
+        position = start
+
+        for line in file:
+            if position >= end:
+                break
+
+            position += len(line)
+            yield line.decode(errors="replace")
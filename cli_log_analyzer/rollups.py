@@ -0,0 +1,396 @@
+import logging
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import Column, Connection, Engine, Integer, MetaData, String, Table, create_engine, func, literal_column, select
+from sqlalchemy.dialects.sqlite import insert
+
+from cli_log_analyzer.checkpoint import find_complete_end
+from cli_log_analyzer.compression import detect_compression
+from cli_log_analyzer.dataclass import AnalysisOptions, BadLines, LogStatistics, NginxLog
+from cli_log_analyzer.log_format import LogFormat, compile_timestamped_format
+from cli_log_analyzer.parsers import iter_records, iter_valid_records, parse_line
+from cli_log_analyzer.readers import iter_lines, iter_range_lines
+from cli_log_analyzer.timestamps import parse_timestamp
+from cli_log_analyzer.utilities import TOP_ERRORS, TOP_IPS
+
+
+HOUR = 3600
+
+metadata = MetaData()
+
+hourly = Table(
+    "hourly",
+    metadata,
+    Column("hour", Integer, primary_key=True),
+    Column("count", Integer, nullable=False),
+    Column("total_size", Integer, nullable=False),
+)
+hourly_ips = Table(
+    "hourly_ips",
+    metadata,
+    Column("hour", Integer, primary_key=True),
+    Column("ip", String, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+hourly_errors = Table(
+    "hourly_errors",
+    metadata,
+    Column("hour", Integer, primary_key=True),
+    Column("status", Integer, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+indexed_files = Table(
+    "indexed_files",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("path", String, nullable=False),
+    Column("offset", Integer, nullable=False),
+)
+
+
+def open_index(index_path: Path) -> Engine:
+    """
+    Opens the SQLite rollup index, creating its tables if needed.
+
+    Args:
+        index_path (Path): Path to the SQLite file.
+
+    Returns:
+        Engine: Engine connected to the index.
+    """
+    engine = create_engine(f"sqlite:///{index_path}")
+    metadata.create_all(engine)
+
+    return engine
+
+
+def collect_hourly(data: Iterable[NginxLog]) -> dict[int, LogStatistics]:
+    """
+    Folds log entries into separate statistics for every hour.
+
+    Args:
+        data (Iterable[NginxLog]): Parsed log entries with timestamps.
+
+    Returns:
+        dict[int, LogStatistics]: Statistics keyed by the Unix timestamp of the start of the hour.
+    """
+    hours = {}
+
+    for entity in data:
+        timestamp = parse_timestamp(entity.timestamp)
+        hour = timestamp - timestamp % HOUR
+        statistics = hours.get(hour)
+
+        if statistics is None:
+            statistics = hours[hour] = LogStatistics()
+
+        statistics.update(entity)
+
+    return hours
+
+
+def compile_index_format(log_format: str) -> LogFormat:
+    """
+    Compiles a log format for indexing, which needs the timestamp of every entry to find its hour.
+
+    Args:
+        log_format (str): Nginx log_format string of the indexed files.
+
+    Returns:
+        LogFormat: The compiled parser, capturing the timestamp.
+
+    Raises:
+        ValueError: If the format lacks a required variable or $time_local.
+    """
+    return compile_timestamped_format(log_format, "Indexing a log")
+
+
+def index_range(
+        input_path: Path,
+        start: int,
+        end: int | None,
+        options: AnalysisOptions,
+) -> tuple[dict[int, LogStatistics], BadLines]:
+    """
+    Parses a byte range of a plain file, or a whole compressed file, into per-hour statistics.
+
+    Args:
+        input_path (Path): Path to the log file.
+        start (int): Offset of the first byte of the range, at a line start.
+        end (int | None): Offset of the first byte after the range, or None for a compressed file.
+        options (AnalysisOptions): Log format and lenient mode settings.
+
+    Returns:
+        tuple[dict[int, LogStatistics], BadLines]: Per-hour statistics and the skipped malformed entries.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format outside of lenient mode.
+        ValueError: If a timestamp does not match the $time_local layout.
+    """
+    parse = parse_line
+
+    if options.log_format is not None:
+        parse = compile_index_format(options.log_format).parse
+
+    lines = iter_lines(input_path) if end is None else iter_range_lines(input_path, start, end)
+    bad_lines = BadLines(max_samples=options.max_samples)
+
+    if options.lenient:
+        records = iter_valid_records(lines, bad_lines, parse)
+    else:
+        records = iter_records(lines, parse)
+
+    return collect_hourly(records), bad_lines
+
+
+def write_rollups(connection: Connection, hours: dict[int, LogStatistics]) -> None:
+    """
+    Adds per-hour statistics to the rollups, summing them with the stored ones.
+
+    Args:
+        connection (Connection): Connection with an open transaction.
+        hours (dict[int, LogStatistics]): Statistics keyed by the start of the hour.
+
+    Returns:
+        None
+    """
+    if not hours:
+        return
+
+    rows = [
+        {"hour": hour, "count": statistics.count, "total_size": statistics.total_size}
+        for hour, statistics in hours.items()
+    ]
+    statement = insert(hourly)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[hourly.c.hour],
+            set_={
+                "count": hourly.c.count + statement.excluded.count,
+                "total_size": hourly.c.total_size + statement.excluded.total_size,
+            },
+        ),
+        rows,
+    )
+
+    ip_rows = [
+        {"hour": hour, "ip": ip, "count": count}
+        for hour, statistics in hours.items()
+        for ip, count in statistics.ip_requests.items()
+    ]
+    error_rows = [
+        {"hour": hour, "status": status, "count": count}
+        for hour, statistics in hours.items()
+        for errors in (statistics.client_errors, statistics.server_errors)
+        for status, count in errors.items()
+    ]
+
+    for table, key, rows in ((hourly_ips, "ip", ip_rows), (hourly_errors, "status", error_rows)):
+        if rows:
+            statement = insert(table)
+            connection.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[table.c.hour, table.c[key]],
+                    set_={"count": table.c.count + statement.excluded.count},
+                ),
+                rows,
+            )
+
+
+def index_files(
+        input_paths: list[Path],
+        index_path: Path,
+        workers: int = 1,
+        options: AnalysisOptions | None = None,
+) -> BadLines:
+    """
+    Parses the lines appended since the last run into the per-hour rollups.
+
+    Like the checkpoint, the index remembers the indexed offset of every
+    file by device and inode, so every line is parsed once no matter how
+    often the files are indexed. A truncated plain file is indexed from its
+    beginning again; a compressed file is indexed once as a whole.
+
+    Args:
+        input_paths (list[Path]): Paths to the plain or compressed log files.
+        index_path (Path): Path to the SQLite file of the rollups.
+        workers (int): Number of worker processes, each indexing a file.
+        options (AnalysisOptions | None): Log format and lenient mode settings.
+
+    Returns:
+        BadLines: Malformed entries skipped in lenient mode.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format outside of lenient mode.
+        ValueError: If a timestamp does not match the $time_local layout.
+    """
+    options = options or AnalysisOptions()
+    engine = open_index(index_path)
+    tasks = []
+
+    with engine.connect() as connection:
+        offsets = dict(connection.execute(select(indexed_files.c.key, indexed_files.c.offset)).all())
+
+    for input_path in input_paths:
+        file_stat = input_path.stat()
+        key = f"{file_stat.st_dev}:{file_stat.st_ino}"
+        offset = offsets.get(key, 0)
+
+        if detect_compression(input_path):
+            if key not in offsets:
+                tasks.append((key, input_path, 0, None, file_stat.st_size))
+            continue
+
+        if offset > file_stat.st_size:
+            offset = 0
+
+        end = find_complete_end(input_path, offset, file_stat.st_size)
+
+        if end > offset:
+            tasks.append((key, input_path, offset, end, end))
+
+    bad_lines = BadLines(max_samples=options.max_samples)
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            results = list(executor.map(
+                index_range,
+                [input_path for _, input_path, _, _, _ in tasks],
+                [start for _, _, start, _, _ in tasks],
+                [end for _, _, _, end, _ in tasks],
+                [options] * len(tasks),
+            ))
+    else:
+        results = [index_range(input_path, start, end, options) for _, input_path, start, end, _ in tasks]
+
+    with engine.begin() as connection:
+        for (key, input_path, _, _, offset), (hours, file_bad_lines) in zip(tasks, results):
+            write_rollups(connection, hours)
+            connection.execute(
+                insert(indexed_files).on_conflict_do_update(
+                    index_elements=[indexed_files.c.key],
+                    set_={"path": str(input_path), "offset": offset},
+                ),
+                {"key": key, "path": str(input_path), "offset": offset},
+            )
+            bad_lines.merge(file_bad_lines)
+
+    engine.dispose()
+
+    if bad_lines.count:
+        logging.warning(f"Skipped {bad_lines.count} malformed lines while indexing: {bad_lines.samples}")
+
+    return bad_lines
+
+
+def parse_time(value: str | None) -> int | None:
+    """
+    Converts an ISO 8601 date or time into a Unix timestamp, UTC unless an offset is given.
+
+    Args:
+        value (str | None): E.g. "2024-02-10", "2024-02-10T14:00" or "2024-02-10T14:00+02:00".
+
+    Returns:
+        int | None: Seconds since the epoch, or None if no value is given.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date or time.
+    """
+    if value is None:
+        return None
+
+    moment = datetime.fromisoformat(value)
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+
+    return int(moment.timestamp())
+
+
+def query_index(index_path: Path, since: int | None = None, until: int | None = None) -> LogStatistics:
+    """
+    Answers a query over a time range from the per-hour rollups.
+
+    Only the hours that start within [since, until) are included, so the
+    bounds are effectively rounded to whole hours. Only the IPs and error
+    statuses that make it into the report are read, ranked and limited by
+    SQLite, so the query does not grow with the number of distinct IPs.
+
+    Args:
+        index_path (Path): Path to the SQLite file of the rollups.
+        since (int | None): Unix timestamp of the start of the range, unbounded if None.
+        until (int | None): Unix timestamp of the end of the range, unbounded if None.
+
+    Returns:
+        LogStatistics:
+            Statistics of the entries within the range, with the TOP_IPS
+            most common IPs and the TOP_ERRORS most common client and server
+            error statuses. Equally common IPs and statuses are ordered by
+            their first occurrence, as rows are inserted in that order within an hour.
+
+    Raises:
+        FileNotFoundError: If the index does not exist.
+    """
+    if not index_path.is_file():
+        raise FileNotFoundError(f"The index {index_path} was not found.")
+
+    def in_range(table: Table) -> list:
+        conditions = []
+
+        if since is not None:
+            conditions.append(table.c.hour >= since)
+        if until is not None:
+            conditions.append(table.c.hour < until)
+
+        return conditions
+
+    engine = open_index(index_path)
+
+    with engine.connect() as connection:
+        count, total_size = connection.execute(
+            select(func.coalesce(func.sum(hourly.c.count), 0), func.coalesce(func.sum(hourly.c.total_size), 0))
+            .where(*in_range(hourly))
+        ).one()
+        ip_total = func.sum(hourly_ips.c.count)
+        ip_requests = Counter(dict(connection.execute(
+            select(hourly_ips.c.ip, ip_total)
+            .where(*in_range(hourly_ips))
+            .group_by(hourly_ips.c.ip)
+            .order_by(
+                ip_total.desc(),
+                func.min(hourly_ips.c.hour),
+                func.min(literal_column("hourly_ips.rowid")),
+            )
+            .limit(TOP_IPS)
+        ).all()))
+        error_total = func.sum(hourly_errors.c.count)
+
+        def top_errors(*conditions) -> Counter:
+            return Counter(dict(connection.execute(
+                select(hourly_errors.c.status, error_total)
+                .where(*in_range(hourly_errors), *conditions)
+                .group_by(hourly_errors.c.status)
+                .order_by(
+                    error_total.desc(),
+                    func.min(hourly_errors.c.hour),
+                    func.min(literal_column("hourly_errors.rowid")),
+                )
+                .limit(TOP_ERRORS)
+            ).all()))
+
+        client_errors = top_errors(hourly_errors.c.status < 500)
+        server_errors = top_errors(hourly_errors.c.status >= 500)
+
+    engine.dispose()
+
+    return LogStatistics(
+        total_size=total_size,
+        count=count,
+        ip_requests=ip_requests,
+        client_errors=client_errors,
+        server_errors=server_errors,
+    )
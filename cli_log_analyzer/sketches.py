@@ -0,0 +1,169 @@
+import heapq
+import math
+from collections import Counter
+
+
+class HeavyHitters(Counter):
+    """
+    Approximate counter that keeps at most 2 * capacity items.
+
+    A drop-in replacement for the exact Counter of IP requests, based on the
+    Misra-Gries / Space-Saving summary. When the number of items exceeds
+    2 * capacity, the (capacity + 1)-th largest count is subtracted from
+    every item and items that reach zero are dropped. The subtracted total
+    is accumulated in `error`, so for every item:
+
+        count <= true count <= count + error, and error <= N / (capacity + 1)
+
+    where N is the number of counted events. Summaries built over separate
+    chunks can be merged with update and keep the same guarantee.
+
+    Attributes:
+        capacity (int): Number of items guaranteed to be kept after pruning.
+        error (int): Maximum underestimation of any count.
+    """
+
+    def __init__(self, capacity: int = 1000, items: list[tuple] | None = None, error: int = 0):
+        self.capacity = capacity
+        self.error = error
+        super().__init__()
+
+        for item, count in items or []:
+            dict.__setitem__(self, item, count)
+
+    def __setitem__(self, item, count: int) -> None:
+        dict.__setitem__(self, item, count)
+
+        if len(self) > 2 * self.capacity:
+            self.prune()
+
+    def __reduce__(self):
+        return self.__class__, (self.capacity, list(self.items()), self.error)
+
+    def prune(self) -> None:
+        """
+        Shrinks the summary to at most capacity items.
+        """
+        if len(self) <= self.capacity:
+            return
+
+        threshold = heapq.nlargest(self.capacity + 1, self.values())[-1]
+        survivors = [(item, count - threshold) for item, count in self.items() if count > threshold]
+
+        self.error += threshold
+        self.clear()
+
+        for item, count in survivors:
+            dict.__setitem__(self, item, count)
+
+    def update(self, other=None, **kwargs) -> None:
+        """
+        Merges another summary or exact counts into this summary.
+        """
+        if other is not None:
+            for item, count in other.items():
+                dict.__setitem__(self, item, self.get(item, 0) + count)
+
+            self.error += getattr(other, "error", 0)
+
+        for item, count in kwargs.items():
+            dict.__setitem__(self, item, self.get(item, 0) + count)
+
+        self.prune()
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch with relative accuracy guarantees.
+
+    Positive values are counted in logarithmically sized buckets
+    (the DDSketch scheme): a value x falls into the bucket
+    ceil(log(x) / log(gamma)) with gamma = (1 + accuracy) / (1 - accuracy),
+    so every quantile is returned within `relative_accuracy` of the true
+    value. The number of buckets grows only with the logarithm of the value
+    range (about 1200 buckets for 1 byte to 10 GB at 1% accuracy), not with
+    the number of values.
+
+    Attributes:
+        relative_accuracy (float): Maximum relative error of a quantile.
+        count (int): Number of added values.
+    """
+
+    def __init__(
+            self,
+            relative_accuracy: float = 0.01,
+            bins: dict[int, int] | None = None,
+            zero_count: int = 0,
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = bins or {}
+        self.zero_count = zero_count
+        self.count = zero_count + sum(self.bins.values())
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, QuantileSketch)
+            and self.relative_accuracy == other.relative_accuracy
+            and self.bins == other.bins
+            and self.zero_count == other.zero_count
+        )
+
+    def add(self, value: float) -> None:
+        self.count += 1
+
+        if value <= 0:
+            self.zero_count += 1
+            return
+
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-quantile of the added values.
+
+        Args:
+            q (float): Quantile between 0 and 1, e.g. 0.95.
+
+        Returns:
+            float: The estimated value, or 0 if no values were added.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": list(self.bins.items()),
+            "zero_count": self.zero_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        return cls(data["relative_accuracy"], dict(data["bins"]), data["zero_count"])
@@ -0,0 +1,105 @@
+from datetime import date, datetime
+
+
+TIMESTAMP_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+}
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+class TimestampDecoder:
+    """
+    Converts Nginx $time_local values into Unix timestamps without strptime.
+
+    The fixed "dd/Mon/yyyy:HH:MM:SS +zzzz" layout is decoded by slicing.
+    Consecutive log lines mostly share the same second, so the last value
+    and its timestamp are cached; the epoch of every date and the offset of
+    every time zone are cached as well, so a new second only costs three
+    small integer conversions.
+    """
+
+    def __init__(self):
+        # Kept as a single tuple, so that concurrent callers never see a value with another's timestamp.
+        self._last: tuple[str | None, int] = (None, 0)
+        self._days: dict[str, int] = {}
+        self._offsets: dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        """
+        Args:
+            value (str): Timestamp in the "dd/Mon/yyyy:HH:MM:SS +zzzz" layout.
+
+        Returns:
+            int: Seconds since the epoch.
+
+        Raises:
+            ValueError: If the value does not match the expected layout.
+        """
+        last_value, last_timestamp = self._last
+
+        if value == last_value:
+            return last_timestamp
+
+        if len(value) != 26 or value[11] != ":" or value[14] != ":" or value[17] != ":" or value[20] != " ":
+            raise ValueError(f"time data {value!r} does not match format {TIMESTAMP_FORMAT!r}")
+
+        day = self._days.get(value[:11])
+
+        if day is None:
+            day = self._days[value[:11]] = self._decode_day(value)
+
+        offset = self._offsets.get(value[21:])
+
+        if offset is None:
+            offset = self._offsets[value[21:]] = self._decode_offset(value)
+
+        hours, minutes, seconds = int(value[12:14]), int(value[15:17]), int(value[18:20])
+
+        if hours > 23 or minutes > 59 or seconds > 61:
+            raise ValueError(f"time data {value!r} does not match format {TIMESTAMP_FORMAT!r}")
+
+        timestamp = day + hours * 3600 + minutes * 60 + seconds - offset
+        self._last = (value, timestamp)
+
+        return timestamp
+
+    @staticmethod
+    def _decode_day(value: str) -> int:
+        if value[2] != "/" or value[6] != "/" or value[3:6] not in MONTHS:
+            raise ValueError(f"time data {value!r} does not match format {TIMESTAMP_FORMAT!r}")
+
+        return (date(int(value[7:11]), MONTHS[value[3:6]], int(value[:2])).toordinal() - EPOCH_DAY) * 86400
+
+    @staticmethod
+    def _decode_offset(value: str) -> int:
+        sign = value[21]
+
+        if sign not in "+-" or not value[22:].isdigit():
+            raise ValueError(f"time data {value!r} does not match format {TIMESTAMP_FORMAT!r}")
+
+        offset = int(value[22:24]) * 3600 + int(value[24:26]) * 60
+
+        return offset if sign == "+" else -offset
+
+
+parse_timestamp = TimestampDecoder()
+
+
+def parse_timestamp_strptime(value: str) -> int:
+    """
+    Converts an Nginx $time_local value into a Unix timestamp with strptime.
+
+    Kept as the reference implementation for TimestampDecoder.
+
+    Args:
+        value (str): Timestamp in the "dd/Mon/yyyy:HH:MM:SS +zzzz" layout.
+
+    Returns:
+        int: Seconds since the epoch.
+
+    Raises:
+        ValueError: If the value does not match the expected layout.
+    """
+    return int(datetime.strptime(value, TIMESTAMP_FORMAT).timestamp())
@@ -1,9 +1,14 @@
 import sys
+from abc import ABC, abstractmethod
 from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timezone
 from pathlib import Path
 import logging
 
-from cli_log_analyzer.dataclass import NginxLog
+from cli_log_analyzer.dataclass import LogBatch, LogStatistics, NginxLog
+from cli_log_analyzer.sketches import QuantileSketch
+from cli_log_analyzer.timestamps import parse_timestamp
 
 
 logging.basicConfig(
@@ -15,11 +20,256 @@ logging.basicConfig(
 )
 
 
+AGGREGATORS: dict[str, type["Aggregator"]] = {}
+PERCENTILES = (50, 95, 99)
+# Number of IPs and of client and server error statuses in a report.
+TOP_IPS = 5
+TOP_ERRORS = 3
+
+
+def register_aggregator(name: str):
+    """
+    Class decorator adding an aggregator to the registry under the given name.
+
+    Registered aggregators can be enabled with the --metrics option and are
+    computed in the same pass over the data as the basic statistics.
+    """
+    def decorator(cls: type["Aggregator"]) -> type["Aggregator"]:
+        cls.name = name
+        AGGREGATORS[name] = cls
+
+        return cls
+
+    return decorator
+
+
+class Aggregator(ABC):
+    """
+    Base class of additional metrics folded in together with LogStatistics.
+
+    Aggregators must be mergeable, so that partial results of byte ranges,
+    worker processes and checkpoints can be combined, and serializable to
+    JSON-compatible data for checkpoints.
+
+    Attributes:
+        name (str): Name under which the aggregator is registered.
+        fields (tuple[str, ...]): NginxLog fields the aggregator reads.
+        optional_fields (tuple[str, ...]): Fields among them a custom log format may lack.
+    """
+    name: str = ""
+    fields: tuple[str, ...] = ()
+    optional_fields: tuple[str, ...] = ()
+
+    @abstractmethod
+    def add(self, entity: NginxLog) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def merge(self, other: "Aggregator") -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def result(self) -> dict[str, object]:
+        """
+        Returns:
+            dict[str, object]: Report lines as label and value.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def to_dict(self) -> dict:
+        raise NotImplementedError
+
+    @classmethod
+    @abstractmethod
+    def from_dict(cls, data: dict) -> "Aggregator":
+        raise NotImplementedError
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+
+def percentiles(sketch: QuantileSketch) -> list[tuple]:
+    return [(f"p{percentile}", round(sketch.quantile(percentile / 100), 2)) for percentile in PERCENTILES]
+
+
+@register_aggregator("size_percentiles")
+class SizePercentiles(Aggregator):
+    """
+    p50/p95/p99 of the response size, estimated with a QuantileSketch.
+    """
+    fields = ("response_size",)
+
+    def __init__(self, sketch: QuantileSketch | None = None):
+        self.sketch = sketch or QuantileSketch()
+
+    def add(self, entity: NginxLog) -> None:
+        self.sketch.add(entity.response_size)
+
+    def merge(self, other: "SizePercentiles") -> None:
+        self.sketch.merge(other.sketch)
+
+    def result(self) -> dict[str, object]:
+        return {"Response size percentiles": percentiles(self.sketch)}
+
+    def to_dict(self) -> dict:
+        return self.sketch.to_dict()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SizePercentiles":
+        return cls(QuantileSketch.from_dict(data))
+
+
+@register_aggregator("request_time_percentiles")
+class RequestTimePercentiles(SizePercentiles):
+    """
+    p50/p95/p99 of $request_time for the entries whose format includes it.
+    """
+    fields = ("request_time",)
+    optional_fields = ("request_time",)
+
+    def add(self, entity: NginxLog) -> None:
+        if entity.request_time is not None:
+            self.sketch.add(entity.request_time)
+
+    def result(self) -> dict[str, object]:
+        if not self.sketch.count:
+            return {"Request time percentiles": "No request times in the log format"}
+
+        return {"Request time percentiles": percentiles(self.sketch)}
+
+
+@register_aggregator("paths")
+class PathRequests(Aggregator):
+    """
+    Number of requests per path; the 10 most requested paths are reported.
+    """
+    fields = ("path_",)
+
+    def __init__(self, counts: Counter | None = None):
+        self.counts = counts or Counter()
+
+    def add(self, entity: NginxLog) -> None:
+        self.counts[entity.path_] += 1
+
+    def merge(self, other: "PathRequests") -> None:
+        self.counts.update(other.counts)
+
+    def result(self) -> dict[str, object]:
+        return {"Top 10 paths": [(path.rstrip(), count) for path, count in self.counts.most_common(10)]}
+
+    def to_dict(self) -> dict:
+        return {"counts": list(self.counts.items())}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PathRequests":
+        return cls(Counter(dict(data["counts"])))
+
+
+@register_aggregator("per_minute")
+class MinuteSeries(Aggregator):
+    """
+    Number of requests and of 4xx/5xx errors per minute.
+    """
+    fields = ("timestamp", "status")
+
+    def __init__(self, requests: Counter | None = None, errors: Counter | None = None):
+        self.requests = requests or Counter()
+        self.errors = errors or Counter()
+
+    def add(self, entity: NginxLog) -> None:
+        timestamp = parse_timestamp(entity.timestamp)
+        minute = timestamp - timestamp % 60
+
+        self.requests[minute] += 1
+
+        if entity.status >= 400:
+            self.errors[minute] += 1
+
+    def merge(self, other: "MinuteSeries") -> None:
+        self.requests.update(other.requests)
+        self.errors.update(other.errors)
+
+    def result(self) -> dict[str, object]:
+        return {
+            "Requests and errors per minute": [
+                (
+                    datetime.fromtimestamp(minute, timezone.utc).strftime("%Y-%m-%d %H:%M"),
+                    self.requests[minute],
+                    self.errors[minute],
+                )
+                for minute in sorted(self.requests)
+            ],
+        }
+
+    def to_dict(self) -> dict:
+        return {"requests": list(self.requests.items()), "errors": list(self.errors.items())}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MinuteSeries":
+        return cls(Counter(dict(data["requests"])), Counter(dict(data["errors"])))
+
+
+def format_result(
+        avg_size: float,
+        ip_requests: list[tuple],
+        client_err: list[tuple] | str,
+        server_err: list[tuple] | str,
+        source: str | None = None,
+        ip_error: int | None = None,
+        metrics: dict[str, object] | None = None,
+) -> list[str]:
+    """
+    Formats the analysis results as the lines of the text report.
+
+    Args:
+        avg_size (float): The average size of responses in bytes.
+        ip_requests (list[tuple]):
+            A list of the top 5 IP addresses making the most requests,
+            where each tuple contains (IP address, request count).
+        client_err (list[tuple] or str):
+            A list of the top 3 most common client error status codes (4xx)
+            with their occurrences, or a string indicating no errors.
+        server_err (list[tuple] or str):
+            A list of the top 3 most common server error status codes (5xx)
+            with their occurrences, or a string indicating no errors.
+        source (str | None): Name of the analyzed file for per-file reports.
+        ip_error (int | None):
+            Maximum underestimation of the IP request counts
+            if they were counted approximately.
+        metrics (dict[str, object] | None):
+            Results of additional aggregators as label and value.
+
+    Returns:
+        list[str]: Lines of the report without line endings.
+    """
+    lines = []
+
+    if source:
+        lines.append(f"Results for {source}:")
+    lines.append(f"Average weight of responses: {avg_size}")
+    lines.append(f"Top 5 IP requests: {ip_requests}")
+
+    if ip_error is not None:
+        lines.append(f"IP request counts are approximate, each may be up to {ip_error} higher")
+
+    lines.append(f"Top 3 client errors: {client_err}")
+    lines.append(f"Top 3 server errors: {server_err}")
+
+    for label, value in (metrics or {}).items():
+        lines.append(f"{label}: {value}")
+
+    return lines
+
+
 def save_result(
         avg_size: float,
         ip_requests: list[tuple],
         client_err: list[tuple],
         server_err: list[tuple],
+        source: str | None = None,
+        ip_error: int | None = None,
+        metrics: dict[str, object] | None = None,
 ) -> None:
     """
     Saves the analysis results to a text file.
@@ -35,59 +285,197 @@ def save_result(
         server_err (list[tuple] or str):
             A list of the top 3 most common server error status codes (5xx)
             with their occurrences, or a string indicating no errors.
+        source (str | None): Name of the analyzed file for per-file reports.
+        ip_error (int | None):
+            Maximum underestimation of the IP request counts
+            if they were counted approximately.
+        metrics (dict[str, object] | None):
+            Results of additional aggregators as label and value.
 
     Returns:
         None
     """
     target_file = Path("analysis_result.txt")
+    lines = format_result(avg_size, ip_requests, client_err, server_err, source, ip_error, metrics)
 
     with open(target_file, "a", encoding="utf-8") as file:
-        file.write(f"Average weight of responses: {avg_size}\n")
-        file.write(f"Top 5 IP requests: {ip_requests}\n")
-        file.write(f"Top 3 client errors: {client_err}\n")
-        file.write(f"Top 3 server errors: {server_err}\n")
+        file.write("".join(f"{line}\n" for line in lines))
+
+
+def collect_statistics(
+        data: Iterable[NginxLog] | LogBatch,
+        statistics: LogStatistics | None = None,
+) -> LogStatistics:
+    """
+    Folds log entries into running aggregates one entry at a time.
+
+    Args:
+        data (Iterable[NginxLog] | LogBatch):
+            Parsed log entries. Any iterable works, including lazy generators,
+            so the entries never have to be held in memory at once.
+            A columnar LogBatch is aggregated in bulk.
+        statistics (LogStatistics | None):
+            Aggregates to fold the entries into. A new exact LogStatistics by default.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the processed entries.
+    """
+    if statistics is None:
+        statistics = LogStatistics()
+
+    if isinstance(data, LogBatch):
+        statistics.merge(data.to_statistics())
+        return statistics
+
+    for entity in data:
+        statistics.update(entity)
+
+    return statistics
+
+
+def collect_fields(
+        data: Iterable[tuple[str, int, int]],
+        statistics: LogStatistics | None = None,
+) -> LogStatistics:
+    """
+    Folds (ip, status, response size) tuples into running aggregates.
+
+    Args:
+        data (Iterable[tuple[str, int, int]]):
+            Aggregated fields of log entries, e.g. produced by iter_mmap_fields.
+        statistics (LogStatistics | None):
+            Aggregates to fold the entries into. A new exact LogStatistics by default.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the processed entries.
+    """
+    if statistics is None:
+        statistics = LogStatistics()
+    add = statistics.add
+
+    for ip, status, response_size in data:
+        add(ip, status, response_size)
+
+    return statistics
+
+
+def merge_statistics(data: Iterable[LogStatistics]) -> LogStatistics:
+    """
+    Merges partial statistics, e.g. of several files or byte ranges, in order.
+
+    Args:
+        data (Iterable[LogStatistics]): Partial statistics.
+
+    Returns:
+        LogStatistics: The combined statistics.
+    """
+    statistics = LogStatistics()
 
+    for partial in data:
+        statistics.merge(partial)
 
-def analyze_data(data: list[NginxLog]) -> None:
+    return statistics
+
+
+def build_report(statistics: LogStatistics, source: str | None = None) -> dict:
+    """
+    Calculates the final metrics from the aggregates as JSON-compatible data.
+
+    Args:
+        statistics (LogStatistics): Aggregated statistics of the log entries.
+        source (str | None): Name of the analyzed file for per-file reports.
+
+    Returns:
+        dict: The report with the source, number of requests, average response
+            size, top IPs and errors, additional metrics and skipped lines.
+    """
+    metrics = {}
+
+    for metric in statistics.metrics.values():
+        metrics.update(metric.result())
+
+    return {
+        "source": source,
+        "requests": statistics.count,
+        "average_response_size": (
+            round(statistics.total_size / statistics.count, 2) if statistics.count else 0
+        ),
+        "top_ips": statistics.ip_requests.most_common(TOP_IPS),
+        "ip_error": getattr(statistics.ip_requests, "error", None),
+        "top_client_errors": statistics.client_errors.most_common(TOP_ERRORS),
+        "top_server_errors": statistics.server_errors.most_common(TOP_ERRORS),
+        "metrics": metrics,
+        "skipped_lines": statistics.bad_lines.count,
+        "malformed_samples": statistics.bad_lines.samples,
+    }
+
+
+def report_arguments(report: dict) -> dict:
+    """
+    Converts a report built by build_report into the arguments of save_result and format_result.
+    """
+    metrics = dict(report["metrics"])
+
+    if report["skipped_lines"]:
+        total = report["requests"] + report["skipped_lines"]
+        metrics["Skipped malformed lines"] = (
+            f"{report['skipped_lines']} of {total} ({report['skipped_lines'] / total:.2%})"
+        )
+        metrics["Malformed line samples"] = report["malformed_samples"]
+
+    return {
+        "avg_size": report["average_response_size"],
+        "ip_requests": report["top_ips"],
+        "client_err": report["top_client_errors"] or "No client errors",
+        "server_err": report["top_server_errors"] or "No server errors",
+        "source": report["source"],
+        "ip_error": report["ip_error"],
+        "metrics": metrics,
+    }
+
+
+def log_report(report: dict) -> None:
+    """
+    Logs a report built by build_report line by line.
+
+    Args:
+        report (dict): The report.
+
+    Returns:
+        None
+    """
+    for line in format_result(**report_arguments(report)):
+        logging.info(line)
+
+
+def report_statistics(statistics: LogStatistics, source: str | None = None) -> None:
+    """
+    Calculates the final metrics from the aggregates, saves and logs them.
+
+    Args:
+        statistics (LogStatistics): Aggregated statistics of the log entries.
+        source (str | None): Name of the analyzed file for per-file reports.
+
+    Returns:
+        None
+    """
+    report = build_report(statistics, source)
+
+    save_result(**report_arguments(report))
+    log_report(report)
+
+
+def analyze_data(data: Iterable[NginxLog] | LogBatch) -> None:
     """
     Analyzes the log data, calculating key statistics such as response sizes,
     most frequent requesters, and error rates.
 
     Args:
-        data (list[NginxLog]):
-            A list of NginxLog objects representing parsed log entries.
+        data (Iterable[NginxLog] | LogBatch):
+            NginxLog objects representing parsed log entries. Either a list,
+            a lazy iterable produced by the streaming parser or a columnar batch.
 
     Returns:
         None
     """
-    total_weight_of_responses = 0
-    ip_storage = {}
-    client_errors  = {}
-    server_errors = {}
-
-    for entity in data:
-        total_weight_of_responses += entity.response_size
-
-        ip_storage[entity.ip] = ip_storage.get(entity.ip, 0) + 1
-
-        if 400 <= entity.status < 500:
-            client_errors[entity.status] = client_errors.get(entity.status, 0) + 1
-        elif 500 <= entity.status < 600:
-            server_errors[entity.status] = server_errors.get(entity.status, 0) + 1
-
-    average_weight_of_responses = round(total_weight_of_responses / len(data), 2) if data else 0
-    top_ip_requests = Counter(ip_storage).most_common(5)
-    top_client_errors = Counter(client_errors).most_common(3) or "No client errors"
-    top_server_errors = Counter(server_errors).most_common(3) or "No server errors"
-
-    save_result(
-        avg_size=average_weight_of_responses,
-        ip_requests=top_ip_requests,
-        client_err=top_client_errors,
-        server_err=top_server_errors,
-    )
-
-    logging.info(f"Average weight of responses: {average_weight_of_responses}")
-    logging.info(f"Top 5 IP requests: {top_ip_requests}")
-    logging.info(f"Top 3 client errors: {top_client_errors}")
-    logging.info(f"Top 3 server errors: {top_server_errors}")
+    report_statistics(collect_statistics(data))
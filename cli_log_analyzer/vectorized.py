@@ -0,0 +1,210 @@
+import re
+from collections import Counter
+from collections.abc import Iterable
+from itertools import islice
+from pathlib import Path
+
+from cli_log_analyzer.dataclass import LogBatch, LogStatistics
+from cli_log_analyzer.parsers import LOG_PATTERN_BYTES, compile_fields_pattern, iter_mmap_matches
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+
+BATCH_SIZE = 1_000_000
+# Widths of the fixed-size byte string columns matched fields are copied into.
+IP_WIDTH = 64
+NUMBER_WIDTH = 20
+
+
+def check_numpy() -> None:
+    """
+    Raises:
+        ModuleNotFoundError: If numpy is not installed.
+    """
+    if np is None:
+        raise ModuleNotFoundError("The numpy backend requires the 'numpy' package.")
+
+
+def ordered_counts(values, counts) -> Counter:
+    """
+    Builds a Counter of the values with nonzero counts, in order of first occurrence.
+    """
+    unique_values, first_indexes = np.unique(values, return_index=True)
+    order = np.argsort(first_indexes, kind="stable")
+
+    return Counter({
+        int(value): int(counts[value])
+        for value in unique_values[order]
+    })
+
+
+def aggregate_batch(batch: LogBatch) -> LogStatistics:
+    """
+    Aggregates a columnar batch with NumPy.
+
+    IP codes are counted with bincount and status codes with a histogram.
+    Counters are built in order of first occurrence, so the result is
+    identical to LogBatch.to_statistics and to the per-record Python path.
+
+    Args:
+        batch (LogBatch): Columnar log entries.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the batch.
+
+    Raises:
+        ModuleNotFoundError: If numpy is not installed.
+    """
+    check_numpy()
+
+    if not len(batch):
+        return LogStatistics()
+
+    ip_codes = np.frombuffer(batch.ip_codes, dtype=np.uint32)
+    statuses = np.frombuffer(batch.statuses, dtype=np.uint16)
+    sizes = np.frombuffer(batch.sizes, dtype=np.uint64)
+
+    ip_counts = np.bincount(ip_codes, minlength=len(batch.ip_values))
+    status_counts = np.bincount(statuses)
+
+    client_statuses = statuses[(statuses >= 400) & (statuses < 500)]
+    server_statuses = statuses[(statuses >= 500) & (statuses < 600)]
+
+    return LogStatistics(
+        total_size=int(sizes.sum(dtype=np.uint64)),
+        count=len(batch),
+        ip_requests=Counter(dict(zip(batch.ip_values, ip_counts.tolist()))),
+        client_errors=ordered_counts(client_statuses, status_counts),
+        server_errors=ordered_counts(server_statuses, status_counts),
+    )
+
+
+def collect_vectorized(
+        data: Iterable[tuple[str, int, int]],
+        statistics: LogStatistics | None = None,
+        batch_size: int = BATCH_SIZE,
+) -> LogStatistics:
+    """
+    Collects (ip, status, response size) tuples into batches and aggregates them with NumPy.
+
+    Memory is bounded by the batch size, so arbitrarily long streams can be processed.
+
+    Args:
+        data (Iterable[tuple[str, int, int]]): Aggregated fields of log entries.
+        statistics (LogStatistics | None):
+            Aggregates to fold the entries into. A new exact LogStatistics by default.
+        batch_size (int): Number of entries aggregated at once.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the processed entries.
+
+    Raises:
+        ModuleNotFoundError: If numpy is not installed.
+    """
+    check_numpy()
+
+    if statistics is None:
+        statistics = LogStatistics()
+
+    iterator = iter(data)
+
+    while batch := LogBatch.from_fields(islice(iterator, batch_size)):
+        statistics.merge(aggregate_batch(batch))
+
+    return statistics
+
+
+def aggregate_matches(matches: list[tuple[bytes, ...]], groups: tuple[str, ...]) -> LogStatistics:
+    """
+    Aggregates the fields matched in a block of log lines with NumPy.
+
+    The tuples are copied into fixed-size byte string columns in one
+    call, and statuses and sizes are converted to integers by NumPy, so
+    no Python code runs per entry. IPs are counted over np.unique codes
+    in order of first occurrence, like in aggregate_batch.
+
+    Args:
+        matches (list[tuple[bytes, ...]]): Matched fields of every entry, e.g. from iter_mmap_matches.
+        groups (tuple[str, ...]): Names of the fields in the order of the tuples.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the entries.
+
+    Raises:
+        ModuleNotFoundError: If numpy is not installed.
+    """
+    check_numpy()
+
+    if not matches:
+        return LogStatistics()
+
+    dtype = [(name, f"S{IP_WIDTH if name == 'ip' else NUMBER_WIDTH}") for name in groups]
+    columns = np.fromiter(matches, dtype=dtype, count=len(matches))
+    ips = columns["ip"]
+
+    if (np.char.str_len(ips) >= IP_WIDTH).any():
+        # A value may have been truncated; let NumPy size the column instead.
+        ips = np.array([entry[groups.index("ip")] for entry in matches])
+
+    sizes = columns["response_size"]
+    sizes[sizes == b"-"] = b"0"
+    sizes = sizes.astype(np.uint64)
+    statuses = columns["status"].astype(np.uint16)
+
+    unique_ips, first_indexes, ip_codes = np.unique(ips, return_index=True, return_inverse=True)
+    ip_counts = np.bincount(ip_codes)
+    order = np.argsort(first_indexes, kind="stable")
+    status_counts = np.bincount(statuses)
+
+    return LogStatistics(
+        total_size=int(sizes.sum(dtype=np.uint64)),
+        count=len(matches),
+        ip_requests=Counter(dict(zip(
+            [ip.decode(errors="replace") for ip in unique_ips[order].tolist()],
+            ip_counts[order].tolist(),
+        ))),
+        client_errors=ordered_counts(statuses[(statuses >= 400) & (statuses < 500)], status_counts),
+        server_errors=ordered_counts(statuses[(statuses >= 500) & (statuses < 600)], status_counts),
+    )
+
+
+def collect_mmap_vectorized(
+        input_path: Path,
+        start: int = 0,
+        end: int | None = None,
+        pattern: re.Pattern = LOG_PATTERN_BYTES,
+        statistics: LogStatistics | None = None,
+) -> LogStatistics:
+    """
+    Parses a memory-mapped log file straight into NumPy columns and aggregates them.
+
+    Args:
+        input_path (Path): Path to the plain log file.
+        start (int): Offset of the first byte to read, at a line start.
+        end (int | None): Offset of the first byte after the range, at a line start.
+        pattern (re.Pattern): Bytes pattern with the ip, status and response_size groups.
+        statistics (LogStatistics | None):
+            Aggregates to fold the entries into. A new exact LogStatistics by default.
+
+    Returns:
+        LogStatistics: Aggregated statistics of the range.
+
+    Raises:
+        AttributeError: If a log entry does not match the expected format.
+        ModuleNotFoundError: If numpy is not installed.
+    """
+    check_numpy()
+
+    if statistics is None:
+        statistics = LogStatistics()
+
+    groupindex = compile_fields_pattern(pattern).groupindex
+    groups = tuple(sorted(groupindex, key=groupindex.get))
+
+    for matches in iter_mmap_matches(input_path, start, end, pattern):
+        statistics.merge(aggregate_matches(matches, groups))
+
+    return statistics
@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import os
+from pathlib import Path
+
+from cli_log_analyzer.utilities import format_result, report_arguments
+
+
+DEFAULT_OUTPUTS = {
+    "text": Path("analysis_result.txt"),
+    "json": Path("analysis_result.json"),
+    "ndjson": Path("analysis_result.ndjson"),
+    "csv": Path("analysis_result.csv"),
+}
+CSV_HEADERS = ["source", "metric", "key", "value"]
+
+
+def render_text(reports: list[dict]) -> str:
+    """
+    Renders the reports in the text layout of save_result.
+    """
+    return "".join(
+        f"{line}\n"
+        for report in reports
+        for line in format_result(**report_arguments(report))
+    )
+
+
+def render_json(reports: list[dict]) -> str:
+    """
+    Renders the reports as a single JSON array.
+    """
+    return json.dumps(reports, indent=2) + "\n"
+
+
+def render_ndjson(reports: list[dict]) -> str:
+    """
+    Renders every report as a JSON object on its own line.
+    """
+    return "".join(f"{json.dumps(report)}\n" for report in reports)
+
+
+def render_csv(reports: list[dict]) -> str:
+    """
+    Renders the reports as rows of (source, metric, key, value).
+
+    Ranked results such as top IPs get a row per item with the item as key.
+    Items with more than one value, e.g. requests and errors per minute,
+    have their values stored as a JSON array.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADERS)
+
+    for report in reports:
+        source = report["source"] or ""
+        results = {
+            "top_ips": report["top_ips"],
+            "top_client_errors": report["top_client_errors"],
+            "top_server_errors": report["top_server_errors"],
+            **report["metrics"],
+            "malformed_samples": report["malformed_samples"],
+        }
+
+        for metric in ("requests", "average_response_size", "ip_error", "skipped_lines"):
+            if report[metric] is not None:
+                writer.writerow([source, metric, "", report[metric]])
+
+        for metric, value in results.items():
+            if not isinstance(value, list):
+                writer.writerow([source, metric, "", value])
+                continue
+
+            for key, *values in value:
+                writer.writerow([source, metric, key, values[0] if len(values) == 1 else json.dumps(values)])
+
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    "text": render_text,
+    "json": render_json,
+    "ndjson": render_ndjson,
+    "csv": render_csv,
+}
+
+
+def write_reports(reports: list[dict], output_format: str = "text", output_path: Path | None = None) -> Path:
+    """
+    Writes the reports of a run in one buffered write.
+
+    The text report is appended to the file, like save_result does. Other
+    formats replace the file atomically: the rendered output is written to
+    a temporary file next to it, which is then renamed, so readers never
+    see a partially written report.
+
+    Args:
+        reports (list[dict]): Reports built by build_report.
+        output_format (str): One of "text", "json", "ndjson" and "csv".
+        output_path (Path | None): Target file, analysis_result.<format> by default.
+
+    Returns:
+        Path: The written file.
+    """
+    output_path = output_path or DEFAULT_OUTPUTS[output_format]
+    content = RENDERERS[output_format](reports)
+
+    if output_format == "text":
+        with open(output_path, "a", encoding="utf-8") as file:
+            file.write(content)
+
+        return output_path
+
+    temporary_path = output_path.with_name(f"{output_path.name}.tmp")
+
+    with open(temporary_path, "w", encoding="utf-8", newline="") as file:
+        file.write(content)
+
+    os.replace(temporary_path, output_path)
+
+    return output_path
@@ -1,21 +1,44 @@
-from unittest.mock import AsyncMock
+import asyncio
+import json
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from unittest.mock import AsyncMock, MagicMock
 
 import aiohttp
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer, unused_port
 from pydantic import ValidationError
 from pytest_mock import MockerFixture
 from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, Session
 
+from api_fetcher.cache import ResponseCache
 from api_fetcher.database.models.base import Base
 from api_fetcher.database.models.posts import PostModel
+from api_fetcher.exceptions import (
+    APICircuitOpenError,
+    APIConnectionError,
+    APIDataError,
+    APIResponseError,
+)
 from api_fetcher.fetch_data import (
+    get_page,
     get_posts,
+    ingest_posts,
+    iter_post_pages,
+    iter_posts,
     validate_json,
     create_post_instances,
 )
+from api_fetcher.json_stream import JSONArrayParser
+from api_fetcher.rate_limiter import TokenBucket
+from api_fetcher.retry import CircuitBreaker, RetryPolicy, parse_retry_after, request
 from api_fetcher.schemas import PostSchema
-from api_fetcher.storages import write_to_db
+from api_fetcher.session import ACCEPT_ENCODING, ConnectionStats, create_session
+from api_fetcher.storages import insert_posts, write_to_db
 
 
 TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -37,6 +60,31 @@ def db_session():
     Base.metadata.drop_all(test_engine)
 
 
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+@pytest.fixture(scope="function")
+async def serve() -> AsyncIterator[Callable[[Handler], Awaitable[str]]]:
+    """
+    Starts test servers answering /posts with a handler and closes them on teardown.
+    """
+    servers = []
+
+    async def start(handler: Handler) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/posts", handler)
+        server = TestServer(app)
+        await server.start_server()
+        servers.append(server)
+
+        return str(server.make_url("/posts"))
+
+    yield start
+
+    for server in servers:
+        await server.close()
+
+
 @pytest.mark.asyncio
 async def test_get_posts(mocker: MockerFixture):
     mock_response = [
@@ -44,11 +92,10 @@ async def test_get_posts(mocker: MockerFixture):
         {"id": 2, "userId": 2, "title": "second test title", "body": "second test body"},
     ]
 
-    mock_get = AsyncMock()
-    mock_get.__aenter__.return_value.status = 200
-    mock_get.__aenter__.return_value.json.return_value = mock_response
+    mock_get = MagicMock(status=200)
+    mock_get.json = AsyncMock(return_value=mock_response)
 
-    mocker.patch("aiohttp.ClientSession.get", return_value=mock_get)
+    mocker.patch("aiohttp.ClientSession.request", AsyncMock(return_value=mock_get))
 
     async with aiohttp.ClientSession() as session:
         posts = await get_posts(session)
@@ -134,3 +181,614 @@ def test_write_to_db(mocker: MockerFixture, db_session: Session):
     assert len(stored_posts) == 2
     assert stored_posts[0].title == "first test title"
     assert stored_posts[1].body == "second test body"
+
+
+def test_insert_posts_in_chunks(db_session: Session):
+    posts = [PostModel(user_id=1, title=f"title {index}", body=f"body {index}") for index in range(25)]
+
+    insert_posts(db_session, posts, chunk_size=10)
+
+    stored_posts = db_session.query(PostModel).order_by(PostModel.id).all()
+
+    assert [post.id for post in posts] == [post.id for post in stored_posts] == list(range(1, 26))
+    assert [post.title for post in stored_posts] == [post.title for post in posts]
+
+
+def test_insert_posts_commits_previous_chunks(db_session: Session):
+    posts = [PostModel(user_id=1, title=f"title {index}", body=f"body {index}") for index in range(25)]
+    posts[15].title = None
+
+    with pytest.raises(SQLAlchemyError):
+        insert_posts(db_session, posts, chunk_size=10)
+
+    assert db_session.query(PostModel).count() == 10
+    assert posts[9].id == 10
+    assert posts[10].id is None
+
+
+def make_posts(count: int) -> list[dict]:
+    return [
+        {"id": index, "userId": 1, "title": f"title {index}", "body": f"body {index}"}
+        for index in range(1, count + 1)
+    ]
+
+
+def posts_handler(
+        posts: list[dict],
+        total_count_header: bool = True,
+        failing_page: int | None = None,
+        fail_once: bool = False,
+) -> tuple[Handler, dict]:
+    state = {"in_flight": 0, "max_in_flight": 0, "requests": 0, "failed_pages": set()}
+
+    async def handler(request: web.Request) -> web.Response:
+        state["requests"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+
+        try:
+            await asyncio.sleep(0.01)
+            page = int(request.query["_page"])
+            limit = int(request.query["_limit"])
+
+            if page == failing_page or (fail_once and page not in state["failed_pages"]):
+                state["failed_pages"].add(page)
+                return web.json_response({"error": "unavailable"}, status=503)
+
+            headers = {"X-Total-Count": str(len(posts))} if total_count_header else {}
+
+            return web.json_response(posts[(page - 1) * limit:page * limit], headers=headers)
+        finally:
+            state["in_flight"] -= 1
+
+    return handler, state
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("total_count_header", [True, False])
+async def test_iter_post_pages_bounded_concurrency(serve, total_count_header: bool):
+    handler, state = posts_handler(make_posts(255), total_count_header)
+    url = await serve(handler)
+
+    async with aiohttp.ClientSession() as session:
+        pages = [page async for page in iter_post_pages(session, limit=10, concurrency=4, url=url)]
+
+    assert sorted(post["id"] for page in pages for post in page) == list(range(1, 256))
+    assert 1 < state["max_in_flight"] <= 4
+
+
+@pytest.mark.asyncio
+async def test_iter_post_pages_raises_on_failed_page(serve):
+    handler, _ = posts_handler(make_posts(100), failing_page=5)
+    url = await serve(handler)
+
+    async with aiohttp.ClientSession() as session:
+        with pytest.raises(APIResponseError):
+            async for _ in iter_post_pages(session, limit=10, concurrency=3, url=url):
+                pass
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 10_000])
+def test_json_array_parser_chunked(chunk_size: int):
+    values = make_posts(3) + [12345, -1.5e10, "a \\\" ]", [1, "x"], True, None, {}]
+    text = json.dumps(values, indent=2)
+    parser = JSONArrayParser()
+    elements = []
+
+    for start in range(0, len(text), chunk_size):
+        elements.extend(parser.feed(text[start:start + chunk_size]))
+    parser.close()
+
+    assert elements == values
+
+
+@pytest.mark.parametrize("text", ["{}", "[1, 2", "[1 2]", "[1,]", "[1] 2", ""])
+def test_json_array_parser_invalid(text: str):
+    parser = JSONArrayParser()
+
+    with pytest.raises(json.JSONDecodeError):
+        parser.feed(text)
+        parser.close()
+
+
+def stream_handler(body: bytes) -> Handler:
+    async def handler(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+
+        for start in range(0, len(body), 1000):
+            await response.write(body[start:start + 1000])
+
+        await response.write_eof()
+
+        return response
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_iter_posts_streams_large_array(serve):
+    posts = make_posts(5_000)
+    posts[10]["title"] = "заголовок"
+    url = await serve(stream_handler(json.dumps(posts, ensure_ascii=False).encode()))
+
+    async with aiohttp.ClientSession() as session:
+        received = [post async for post in iter_posts(session, url=url)]
+
+    assert received == posts
+
+
+@pytest.mark.asyncio
+async def test_iter_posts_raises_on_invalid_json(serve):
+    url = await serve(stream_handler(b'[{"id": 1}, {"id": '))
+
+    async with aiohttp.ClientSession() as session:
+        with pytest.raises(APIDataError):
+            async for _ in iter_posts(session, url=url):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_get_page_parses_streamed_body(serve):
+    posts = make_posts(500)
+    url = await serve(stream_handler(json.dumps(posts).encode()))
+
+    async with aiohttp.ClientSession() as session:
+        received, total = await get_page(session, 1, url=url)
+
+    assert received == posts
+    assert total is None
+
+
+@pytest.mark.asyncio
+async def test_get_page_raises_on_invalid_json(serve):
+    url = await serve(stream_handler(b'[{"id": 1}, {"id": '))
+
+    async with aiohttp.ClientSession() as session:
+        with pytest.raises(APIDataError):
+            await get_page(session, 1, url=url)
+
+
+@pytest.mark.asyncio
+async def test_ingest_posts_in_batches(mocker: MockerFixture):
+    mock_write_db = mocker.patch("api_fetcher.fetch_data.write_to_db")
+    mock_write_csv = mocker.patch("api_fetcher.fetch_data.write_to_csv")
+
+    async def stream():
+        for post in make_posts(25):
+            yield post
+
+    threads = set()
+    mock_write_db.side_effect = lambda data: threads.add(threading.get_ident())
+
+    stored = await ingest_posts(stream(), batch_size=10)
+
+    assert stored == 25
+    assert [len(call.args[0]) for call in mock_write_db.call_args_list] == [10, 10, 5]
+    assert mock_write_csv.call_count == 3
+    assert threading.get_ident() not in threads
+
+
+def flaky_handler(statuses: list[int], headers: dict | None = None) -> tuple[Handler, dict]:
+    state = {"requests": 0}
+
+    async def handler(request: web.Request) -> web.Response:
+        state["requests"] += 1
+
+        if state["requests"] <= len(statuses):
+            return web.json_response({"error": "unavailable"}, status=statuses[state["requests"] - 1], headers=headers)
+
+        return web.json_response(make_posts(3), headers={"X-Total-Count": "3"})
+
+    return handler, state
+
+
+@pytest.mark.asyncio
+async def test_get_page_retries_transient_errors(serve):
+    handler, state = flaky_handler([503, 502])
+    url = await serve(handler)
+
+    async with aiohttp.ClientSession() as session:
+        posts, total = await get_page(session, 1, url=url, retry=RetryPolicy(attempts=3, base_delay=0.001))
+
+    assert len(posts) == total == 3
+    assert state["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_get_page_gives_up_after_attempts(serve):
+    handler, state = flaky_handler([503] * 10)
+    url = await serve(handler)
+
+    async with aiohttp.ClientSession() as session:
+        with pytest.raises(APIResponseError):
+            await get_page(session, 1, url=url, retry=RetryPolicy(attempts=4, base_delay=0.001))
+
+    assert state["requests"] == 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("retry_after, expected_requests, expected_sleeps", [("7", 2, [7.0]), ("600", 1, [])])
+async def test_request_honors_retry_after(
+        serve,
+        mocker: MockerFixture,
+        retry_after: str,
+        expected_requests: int,
+        expected_sleeps: list[float],
+):
+    mock_sleep = mocker.patch("api_fetcher.retry.asyncio.sleep", AsyncMock())
+    handler, state = flaky_handler([429], headers={"Retry-After": retry_after})
+    url = await serve(handler)
+
+    async with aiohttp.ClientSession() as session:
+        async with request(session, "GET", url, RetryPolicy()) as response:
+            status = response.status
+
+    assert status == (200 if expected_sleeps else 429)
+    assert state["requests"] == expected_requests
+    # aiohttp itself yields with asyncio.sleep(0).
+    assert [call.args[0] for call in mock_sleep.call_args_list if call.args[0]] == expected_sleeps
+
+
+@pytest.mark.asyncio
+async def test_request_does_not_retry_post(serve):
+    handler, state = flaky_handler([503])
+    url = await serve(handler)
+
+    async with aiohttp.ClientSession() as session:
+        async with request(session, "POST", url, RetryPolicy(base_delay=0.001)) as response:
+            status = response.status
+
+    assert status == 503
+    assert state["requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_request_retries_connection_errors(mocker: MockerFixture):
+    mock_sleep = mocker.patch("api_fetcher.retry.asyncio.sleep", AsyncMock())
+    url = f"http://127.0.0.1:{unused_port()}/posts"
+
+    async with aiohttp.ClientSession() as session:
+        with pytest.raises(APIConnectionError):
+            await get_page(session, 1, url=url, retry=RetryPolicy(attempts=3, base_delay=1, jitter=0))
+
+    assert [call.args[0] for call in mock_sleep.call_args_list if call.args[0]] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_stops_requests(serve):
+    handler, state = flaky_handler([503] * 10)
+    url = await serve(handler)
+    # The breaker recovers later than the longest wait of a retry.
+    policy = RetryPolicy(attempts=5, base_delay=0.001, breaker=CircuitBreaker(failure_threshold=2, recovery_time=600))
+
+    async with aiohttp.ClientSession() as session:
+        with pytest.raises(APICircuitOpenError):
+            await get_page(session, 1, url=url, retry=policy)
+
+        with pytest.raises(APICircuitOpenError):
+            await get_page(session, 2, url=url, retry=policy)
+
+    assert state["requests"] == 2
+    assert policy.breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_retries_wait_for_circuit_breaker_recovery(serve):
+    handler, state = posts_handler(make_posts(300), fail_once=True)
+    url = await serve(handler)
+    breaker = CircuitBreaker(failure_threshold=5, recovery_time=0.05)
+    policy = RetryPolicy(base_delay=0.001, breaker=breaker)
+
+    async with aiohttp.ClientSession() as session:
+        pages = [page async for page in iter_post_pages(session, limit=10, concurrency=10, url=url, retry=policy)]
+
+    assert sorted(post["id"] for page in pages for post in page) == list(range(1, 301))
+    assert len(state["failed_pages"]) == 30
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, recovery_time=10, clock=lambda: now[0])
+
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+
+    with pytest.raises(APICircuitOpenError):
+        breaker.before_request()
+
+    now[0] = 10
+    breaker.before_request()
+    assert breaker.state == "half_open"
+
+    with pytest.raises(APICircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+
+def test_retry_policy_backoff():
+    policy = RetryPolicy(base_delay=0.5, multiplier=2, max_delay=3, jitter=0)
+
+    assert [policy.backoff(retry) for retry in range(5)] == [0.5, 1, 2, 3, 3]
+
+    jittered = RetryPolicy(base_delay=0.5, multiplier=2, max_delay=3, jitter=1)
+
+    assert all(0 <= jittered.backoff(2) <= 2 for _ in range(100))
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("120", 120.0),
+        ("Thu, 01 Jan 1970 00:01:40 GMT", 40.0),
+        ("Thu, 01 Jan 1970 00:00:10 GMT", 0.0),
+        ("soon", None),
+        (None, None),
+    ]
+)
+def test_parse_retry_after(value: str | None, expected: float | None):
+    assert parse_retry_after(value, now=60) == expected
+
+
+def test_token_bucket_burst_and_sustained_rate():
+    now = [0.0]
+    bucket = TokenBucket(10, burst=3, clock=lambda: now[0])
+
+    assert [bucket.delay() for _ in range(3)] == [0, 0, 0]
+    assert bucket.delay() == pytest.approx(0.1)
+
+    now[0] = 0.1
+    assert bucket.delay() == 0
+    assert bucket.delay() == pytest.approx(0.1)
+
+    # Idle time refills the bucket up to the burst only.
+    now[0] = 10
+    assert [bucket.delay() for _ in range(3)] == [0, 0, 0]
+    assert bucket.delay() > 0
+
+
+def test_token_bucket_adapts_to_throttling():
+    now = [0.0]
+    bucket = TokenBucket(8, burst=4, min_rate=1, increase=0.5, clock=lambda: now[0])
+
+    bucket.on_throttled()
+    assert bucket.rate == 4
+    assert bucket.delay() == pytest.approx(0.25)
+
+    for _ in range(3):
+        bucket.on_throttled()
+    assert bucket.rate == 1
+
+    bucket.on_success()
+    assert bucket.rate == 1.5
+
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 8
+
+    bucket.on_throttled(retry_after=5)
+    now[0] = 1
+    assert bucket.delay() == pytest.approx(4)
+
+
+def test_token_bucket_invalid_settings():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+    with pytest.raises(ValueError):
+        TokenBucket(1, burst=0)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_shared_by_concurrent_tasks():
+    bucket = TokenBucket(100, burst=2)
+    start = time.monotonic()
+
+    await asyncio.gather(*(bucket.acquire() for _ in range(12)))
+
+    # Two requests go at once, the other ten are spaced at 100 per second.
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_request_slows_limiter_on_429(serve):
+    handler, state = flaky_handler([429], headers={"Retry-After": "0"})
+    url = await serve(handler)
+    limiter = TokenBucket(50, burst=5, increase=1)
+    policy = RetryPolicy(attempts=2, limiter=limiter)
+
+    async with aiohttp.ClientSession() as session:
+        posts, _ = await get_page(session, 1, url=url, retry=policy)
+
+    assert len(posts) == 3
+    assert state["requests"] == 2
+    assert limiter.rate == 26
+
+
+def compressing_handler() -> tuple[Handler, list[str]]:
+    encodings = []
+
+    async def handler(request: web.Request) -> web.Response:
+        encodings.append(request.headers.get("Accept-Encoding", ""))
+        response = web.json_response(make_posts(50))
+        response.enable_compression()
+
+        return response
+
+    return handler, encodings
+
+
+@pytest.mark.asyncio
+async def test_create_session_reuses_connections(serve):
+    handler, encodings = compressing_handler()
+    url = await serve(handler)
+    stats = ConnectionStats()
+
+    async with create_session(stats, limit_per_host=2, connect_timeout=5) as session:
+        assert session.connector.limit_per_host == 2
+        assert session.timeout.connect == 5
+
+        for _ in range(5):
+            async with session.get(url) as response:
+                assert response.headers["Content-Encoding"] in ("gzip", "deflate", "br")
+                assert len(await response.json()) == 50
+
+    assert encodings == [ACCEPT_ENCODING] * 5
+    assert stats.requests == 5
+    assert stats.new_connections == 1
+    assert stats.reused_connections == 4
+    assert stats.reuse_rate == 0.8
+
+
+@pytest.mark.asyncio
+async def test_create_session_without_compression(serve):
+    handler, encodings = compressing_handler()
+    url = await serve(handler)
+
+    async with create_session(compress=False) as session:
+        async with session.get(url) as response:
+            assert "Content-Encoding" not in response.headers
+
+    assert encodings == ["identity"]
+
+
+def etag_handler(
+        posts: list[dict],
+        total_count_header: bool = True,
+        total_count_not_modified: bool = True,
+) -> tuple[Handler, dict]:
+    state = {"statuses": []}
+
+    async def handler(request: web.Request) -> web.Response:
+        page = int(request.query["_page"])
+        limit = int(request.query["_limit"])
+        body = json.dumps(posts[(page - 1) * limit:page * limit])
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        headers = {"ETag": etag}
+
+        if total_count_header:
+            headers["X-Total-Count"] = str(len(posts))
+
+        status = 304 if request.headers.get("If-None-Match") == etag else 200
+        state["statuses"].append(status)
+
+        if status == 304:
+            if not total_count_not_modified:
+                headers.pop("X-Total-Count", None)
+
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(text=body, content_type="application/json", headers=headers)
+
+    return handler, state
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("total_count_header", [True, False])
+async def test_iter_post_pages_skips_not_modified_pages(serve, tmp_path, total_count_header: bool):
+    posts = make_posts(45)
+    handler, state = etag_handler(posts, total_count_header)
+    url = await serve(handler)
+    cache = ResponseCache(tmp_path)
+
+    async def fetch_ids() -> list[int]:
+        async with aiohttp.ClientSession() as session:
+            pages = [page async for page in iter_post_pages(session, limit=10, concurrency=2, url=url, cache=cache)]
+
+        return sorted(post["id"] for page in pages for post in page)
+
+    assert await fetch_ids() == list(range(1, 46))
+    cache.commit()
+
+    state["statuses"].clear()
+    assert await fetch_ids() == []
+    assert state["statuses"].count(304) == 5
+    cache.commit()
+
+    posts[12]["title"] = "changed title"
+    assert await fetch_ids() == list(range(11, 21))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("total_count_not_modified", [True, False])
+async def test_iter_post_pages_fetches_posts_added_since_cached(serve, tmp_path, total_count_not_modified: bool):
+    posts = make_posts(45)
+    handler, state = etag_handler(posts, total_count_not_modified=total_count_not_modified)
+    url = await serve(handler)
+    cache = ResponseCache(tmp_path)
+
+    async def fetch_ids() -> list[int]:
+        async with aiohttp.ClientSession() as session:
+            pages = [page async for page in iter_post_pages(session, limit=10, concurrency=2, url=url, cache=cache)]
+
+        return sorted(post["id"] for page in pages for post in page)
+
+    assert await fetch_ids() == list(range(1, 46))
+    cache.commit()
+
+    posts.extend(make_posts(70)[45:])
+    state["statuses"].clear()
+
+    assert await fetch_ids() == list(range(41, 71))
+    assert state["statuses"].count(304) == 4
+
+
+@pytest.mark.asyncio
+async def test_discarded_cache_entries_are_not_used(serve, tmp_path):
+    handler, state = etag_handler(make_posts(5))
+    url = await serve(handler)
+    cache = ResponseCache(tmp_path)
+
+    async with aiohttp.ClientSession() as session:
+        await get_page(session, 1, url=url, cache=cache)
+        cache.discard()
+        posts, total = await get_page(session, 1, url=url, cache=cache)
+
+    assert len(posts) == total == 5
+    assert state["statuses"] == [200, 200]
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_response_cache_eviction(tmp_path):
+    now = [0.0]
+    cache = ResponseCache(tmp_path, ttl=100, max_size=25, clock=lambda: now[0])
+    keys = [ResponseCache.make_key("https://example.com/posts", {"_page": page}) for page in range(4)]
+
+    for index, key in enumerate(keys):
+        now[0] = index * 10
+        cache.stage(key, f"https://example.com/posts?_page={index}", {"ETag": f'"{index}"'}, b"x" * 10)
+        cache.commit()
+
+    # Only the two most recently stored bodies fit in 25 bytes.
+    assert [cache.get(key) is not None for key in keys] == [False, False, True, True]
+    assert cache.read_body(cache.get(keys[3])) == b"x" * 10
+    assert cache.get(keys[3]).conditional_headers() == {"If-None-Match": '"3"'}
+
+    now[0] = 110
+    cache.revalidated(cache.get(keys[2]))
+    now[0] = 135
+    cache.commit()
+
+    # Entry 3, stored at 30, has expired; entry 2, stored at 20, was revalidated at 110.
+    assert [cache.get(key) is not None for key in keys] == [False, False, True, False]
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".body", ".json"]
+
+
+def test_response_cache_requires_validators(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = ResponseCache.make_key("https://example.com/posts")
+
+    cache.stage(key, "https://example.com/posts", {"X-Total-Count": "1"}, b"[]")
+    cache.commit()
+
+    assert cache.get(key) is None
@@ -1,12 +1,55 @@
 import argparse
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import pickle
+import random
+import tracemalloc
+from collections import Counter
 from pathlib import Path
 
 import pytest
 from pytest_mock import MockerFixture
 
-from cli_log_analyzer.dataclass import NginxLog
-from cli_log_analyzer.log_analyzer import check_file, extract_data, data_formater
-from cli_log_analyzer.utilities import analyze_data
+from cli_log_analyzer import checkpoint as checkpoint_module
+from cli_log_analyzer.arg_parser import get_args
+from cli_log_analyzer.checkpoint import collect_incremental, load_checkpoint
+from cli_log_analyzer.compression import detect_compression
+from cli_log_analyzer.dataclass import AnalysisOptions, BadLines, LogBatch, LogStatistics, NginxLog
+from cli_log_analyzer.follow import RollingWindow, follow, follow_lines
+from cli_log_analyzer.log_analyzer import (
+    check_file,
+    check_files,
+    extract_data,
+    data_formater,
+    iter_lines,
+    iter_records,
+    main,
+)
+from cli_log_analyzer.log_format import compile_log_format
+from cli_log_analyzer.parallel import collect_files, collect_parallel, split_file
+from cli_log_analyzer.parsers import (
+    LOG_PATTERN_BYTES,
+    batch_formater,
+    compile_fields_pattern,
+    iter_mmap_fields,
+    iter_mmap_matches,
+)
+from cli_log_analyzer.readers import iter_range_lines
+from cli_log_analyzer.rollups import index_files, parse_time, query_index
+from cli_log_analyzer.sketches import HeavyHitters, QuantileSketch
+from cli_log_analyzer.timestamps import TimestampDecoder, parse_timestamp_strptime
+from cli_log_analyzer.utilities import Aggregator, analyze_data, build_report, collect_fields, collect_statistics
+
+
+TEST_LOG_LINES = [
+    "192.168.1.1 - - [10/Feb/2024:13:55:36 +0000] \"GET /index.html HTTP/1.1\" 200 1024\n",
+    "203.0.113.45 - - [10/Feb/2024:14:02:15 +0000] \"POST /api/login HTTP/1.1\" 401 512\n",
+    "172.16.0.23 - - [10/Feb/2024:14:30:10 +0000] \"GET /dashboard HTTP/1.1\" 500 2048\n",
+    "192.168.1.1 - - [10/Feb/2024:14:31:10 +0000] \"GET /missing HTTP/1.1\" 404 256\n",
+]
 
 
 def test_check_dirs_exist(tmp_path: Path):
@@ -74,6 +117,38 @@ def test_data_formater(file_content: list[str], expected_result: list[NginxLog])
     assert result == expected_result
 
 
+@pytest.mark.parametrize(
+    "line, expected_result",
+    [
+        (
+            '10.0.0.1 - alice [10/Feb/2024:17:40:30 +0100] "GET /a?b=c HTTP/2.0" 304 - '
+            '"https://example.com/" "Mozilla/5.0 \\"quoted\\""\n',
+            NginxLog(
+                ip="10.0.0.1",
+                timestamp="10/Feb/2024:17:40:30 +0100",
+                method="GET",
+                path_="/a?b=c ",
+                status=304,
+                response_size=0,
+            ),
+        ),
+        (
+            '2001:db8::1 - - [10/Feb/2024:17:40:30 +0000] "DELETE /api/item/7 HTTP/1.1" 204 0\r\n',
+            NginxLog(
+                ip="2001:db8::1",
+                timestamp="10/Feb/2024:17:40:30 +0000",
+                method="DELETE",
+                path_="/api/item/7 ",
+                status=204,
+                response_size=0,
+            ),
+        ),
+    ]
+)
+def test_data_formater_combined_format(line: str, expected_result: NginxLog):
+    assert data_formater([line]) == [expected_result]
+
+
 @pytest.mark.parametrize(
     "file_content, expected_result",
     [
@@ -149,3 +224,965 @@ def test_analyze_data_logging(
     mock_logger.info.assert_any_call(f"Top 5 IP requests: {expected_top_ips}")
     mock_logger.info.assert_any_call(f"Top 3 client errors: {expected_client_errors}")
     mock_logger.info.assert_any_call(f"Top 3 server errors: {expected_server_errors}")
+
+
+def test_iter_lines_is_lazy(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+
+    lines = iter_lines(log_file)
+
+    assert not isinstance(lines, list)
+    assert next(lines) == TEST_LOG_LINES[0]
+    assert list(lines) == TEST_LOG_LINES[1:]
+
+
+def test_collect_statistics_matches_list_api():
+    streamed = collect_statistics(iter_records(iter(TEST_LOG_LINES)))
+    listed = collect_statistics(data_formater(TEST_LOG_LINES))
+
+    assert streamed == listed
+    assert streamed == LogStatistics(
+        total_size=3840,
+        count=4,
+        ip_requests=Counter({"192.168.1.1": 2, "203.0.113.45": 1, "172.16.0.23": 1}),
+        client_errors=Counter({401: 1, 404: 1}),
+        server_errors=Counter({500: 1}),
+    )
+
+
+def test_main_streaming(mocker: MockerFixture, tmp_path: Path):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+
+    main(argparse.Namespace(log_file=str(log_file)))
+
+    mock_logger.info.assert_any_call("Average weight of responses: 960.0")
+    mock_logger.info.assert_any_call(
+        "Top 5 IP requests: [('192.168.1.1', 2), ('203.0.113.45', 1), ('172.16.0.23', 1)]"
+    )
+    mock_logger.info.assert_any_call("Top 3 client errors: [(401, 1), (404, 1)]")
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 100])
+def test_split_file_aligns_ranges_to_lines(tmp_path: Path, parts: int):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES * 5), encoding="utf-8")
+
+    chunks = split_file(log_file, parts)
+    lines = [line for start, end in chunks for line in iter_range_lines(log_file, start, end)]
+
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == log_file.stat().st_size
+    assert len(chunks) <= parts
+    assert lines == TEST_LOG_LINES * 5
+
+
+def test_collect_parallel_matches_sequential(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES * 50), encoding="utf-8")
+
+    parallel = collect_parallel(log_file, workers=3)
+    sequential = collect_statistics(iter_records(iter_lines(log_file)))
+
+    assert parallel == sequential
+    assert list(parallel.ip_requests) == list(sequential.ip_requests)
+
+
+def test_iter_mmap_fields(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES).rstrip("\n"), encoding="utf-8")
+
+    result = list(iter_mmap_fields(log_file))
+
+    assert result == [
+        ("192.168.1.1", 200, 1024),
+        ("203.0.113.45", 401, 512),
+        ("172.16.0.23", 500, 2048),
+        ("192.168.1.1", 404, 256),
+    ]
+    assert collect_fields(result) == collect_statistics(data_formater(TEST_LOG_LINES))
+
+
+def test_iter_mmap_fields_empty_file(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.touch()
+
+    assert list(iter_mmap_fields(log_file)) == []
+
+
+def test_iter_mmap_fields_invalid_line(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text(TEST_LOG_LINES[0] + "not a log line\n", encoding="utf-8")
+
+    with pytest.raises(AttributeError):
+        list(iter_mmap_fields(log_file))
+
+
+def test_collect_parallel_mmap(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES * 50), encoding="utf-8")
+
+    assert collect_parallel(log_file, workers=3, options=AnalysisOptions(use_mmap=True)) == collect_parallel(log_file, workers=3)
+
+
+@pytest.mark.parametrize(
+    "compress, expected_compression",
+    [
+        (gzip.compress, "gzip"),
+        (bz2.compress, "bz2"),
+        (lzma.compress, "xz"),
+        (lambda data: data, None),
+    ]
+)
+def test_iter_lines_compressed(tmp_path: Path, compress, expected_compression: str | None):
+    log_file = tmp_path / "access.log.1"
+    log_file.write_bytes(compress("".join(TEST_LOG_LINES * 1000).encode()))
+
+    assert detect_compression(log_file) == expected_compression
+    assert list(iter_lines(log_file)) == TEST_LOG_LINES * 1000
+    assert extract_data(log_file) == TEST_LOG_LINES * 1000
+
+
+def test_iter_lines_zstd(tmp_path: Path):
+    zstandard = pytest.importorskip("zstandard")
+    log_file = tmp_path / "access.log.1.zst"
+    log_file.write_bytes(zstandard.ZstdCompressor().compress("".join(TEST_LOG_LINES).encode()))
+
+    assert detect_compression(log_file) == "zstd"
+    assert list(iter_lines(log_file)) == TEST_LOG_LINES
+
+
+def test_iter_lines_compressed_early_close(tmp_path: Path):
+    log_file = tmp_path / "access.log.1.gz"
+    log_file.write_bytes(gzip.compress("".join(TEST_LOG_LINES * 100_000).encode()))
+
+    lines = iter_lines(log_file)
+
+    assert next(lines) == TEST_LOG_LINES[0]
+    lines.close()
+
+
+def test_main_compressed_falls_back_to_streaming(mocker: MockerFixture, tmp_path: Path):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+    log_file = tmp_path / "access.log.1.gz"
+    log_file.write_bytes(gzip.compress("".join(TEST_LOG_LINES).encode()))
+
+    main(argparse.Namespace(log_file=str(log_file), workers=4, mmap=True))
+
+    mock_logger.info.assert_any_call("Average weight of responses: 960.0")
+
+
+def test_check_files_expands_globs(tmp_path: Path):
+    for name in ["access.log", "access.log.1", "access.log.2.gz", "error.log"]:
+        (tmp_path / name).touch()
+
+    args = argparse.Namespace(log_file=[str(tmp_path / "access.log*"), str(tmp_path / "access.log")])
+
+    result = check_files(args)
+
+    assert result == [tmp_path / "access.log", tmp_path / "access.log.1", tmp_path / "access.log.2.gz"]
+
+
+def test_check_files_no_matches(tmp_path: Path):
+    args = argparse.Namespace(log_file=[str(tmp_path / "access.log*")])
+
+    with pytest.raises(FileNotFoundError):
+        check_files(args)
+
+
+@pytest.mark.parametrize("workers", [1, 2, 5])
+def test_collect_files(tmp_path: Path, workers: int):
+    plain_file = tmp_path / "access.log"
+    plain_file.write_text("".join(TEST_LOG_LINES * 10), encoding="utf-8")
+    compressed_file = tmp_path / "access.log.1.gz"
+    compressed_file.write_bytes(gzip.compress("".join(TEST_LOG_LINES[:2]).encode()))
+
+    result = collect_files([plain_file, compressed_file], workers=workers)
+
+    assert result == [
+        collect_statistics(data_formater(TEST_LOG_LINES * 10)),
+        collect_statistics(data_formater(TEST_LOG_LINES[:2])),
+    ]
+
+
+def test_main_multiple_files_per_file(mocker: MockerFixture, tmp_path: Path):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mock_write = mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+    (tmp_path / "access.log").write_text("".join(TEST_LOG_LINES[:2]), encoding="utf-8")
+    (tmp_path / "access.log.1").write_text("".join(TEST_LOG_LINES[2:]), encoding="utf-8")
+
+    main(argparse.Namespace(log_file=[str(tmp_path / "access.log*")], workers=2, per_file=True))
+
+    mock_write.assert_called_once()
+    assert len(mock_write.call_args.args[0]) == 3
+    mock_logger.info.assert_any_call(f"Results for {tmp_path / 'access.log'}:")
+    mock_logger.info.assert_any_call("Average weight of responses: 768.0")
+    mock_logger.info.assert_any_call("Average weight of responses: 1152.0")
+    mock_logger.info.assert_any_call("Average weight of responses: 960.0")
+
+
+def test_log_statistics_serialization():
+    statistics = collect_statistics(data_formater(TEST_LOG_LINES))
+
+    restored = LogStatistics.from_dict(json.loads(json.dumps(statistics.to_dict())))
+
+    assert restored == statistics
+    assert list(restored.ip_requests) == list(statistics.ip_requests)
+
+
+def test_collect_incremental_parses_appended_lines(mocker: MockerFixture, tmp_path: Path):
+    log_file = tmp_path / "access.log"
+    checkpoint = tmp_path / "checkpoint.json"
+    log_file.write_text(TEST_LOG_LINES[0] + TEST_LOG_LINES[1].rstrip("\n"), encoding="utf-8")
+
+    first = collect_incremental([log_file], checkpoint)
+
+    assert first == [collect_statistics(data_formater(TEST_LOG_LINES[:1]))]
+
+    with open(log_file, "a", encoding="utf-8") as file:
+        file.write("\n" + "".join(TEST_LOG_LINES[2:]))
+
+    spy = mocker.spy(checkpoint_module, "collect_ranges")
+    second = collect_incremental([log_file], checkpoint)
+
+    assert second == [collect_statistics(data_formater(TEST_LOG_LINES))]
+    assert spy.call_args.args[0] == [(log_file, len(TEST_LOG_LINES[0]), log_file.stat().st_size)]
+    assert list(load_checkpoint(checkpoint).values())[0]["offset"] == log_file.stat().st_size
+
+
+@pytest.mark.parametrize(
+    "options",
+    [AnalysisOptions(ip_capacity=2), AnalysisOptions(lenient=True), AnalysisOptions(metrics=("paths",))],
+)
+def test_collect_incremental_restarts_with_other_options(
+        mocker: MockerFixture,
+        tmp_path: Path,
+        options: AnalysisOptions,
+):
+    log_file = tmp_path / "access.log"
+    checkpoint = tmp_path / "checkpoint.json"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+    collect_incremental([log_file], checkpoint)
+
+    spy = mocker.spy(checkpoint_module, "collect_ranges")
+    collect_incremental([log_file], checkpoint, options)
+
+    assert spy.call_args.args[0] == [(log_file, 0, log_file.stat().st_size)]
+
+    collect_incremental([log_file], checkpoint, options)
+
+    assert spy.call_args.args[0] == []
+
+
+def test_collect_incremental_with_workers(tmp_path: Path):
+    log_file = tmp_path / "access.log"
+    checkpoint = tmp_path / "checkpoint.json"
+    log_file.write_text("".join(TEST_LOG_LINES * 50), encoding="utf-8")
+    collect_incremental([log_file], checkpoint, workers=3)
+
+    with open(log_file, "a", encoding="utf-8") as file:
+        file.write("".join(TEST_LOG_LINES * 30))
+
+    result = collect_incremental([log_file], checkpoint, workers=3)
+
+    assert result == [collect_statistics(data_formater(TEST_LOG_LINES * 80))]
+
+
+def test_collect_incremental_detects_rotation(tmp_path: Path):
+    log_file = tmp_path / "access.log"
+    checkpoint = tmp_path / "checkpoint.json"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+    collect_incremental([log_file], checkpoint)
+
+    log_file.rename(tmp_path / "access.log.1")
+    log_file.write_text(TEST_LOG_LINES[0], encoding="utf-8")
+
+    result = collect_incremental([log_file, tmp_path / "access.log.1"], checkpoint)
+
+    assert result == [
+        collect_statistics(data_formater(TEST_LOG_LINES[:1])),
+        collect_statistics(data_formater(TEST_LOG_LINES)),
+    ]
+
+
+def test_collect_incremental_detects_truncation(tmp_path: Path):
+    log_file = tmp_path / "access.log"
+    checkpoint = tmp_path / "checkpoint.json"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+    collect_incremental([log_file], checkpoint)
+
+    log_file.write_text(TEST_LOG_LINES[3], encoding="utf-8")
+
+    assert collect_incremental([log_file], checkpoint) == [collect_statistics(data_formater(TEST_LOG_LINES[3:]))]
+
+
+def test_rolling_window_expires_buckets():
+    entities = data_formater(TEST_LOG_LINES)
+    rolling_window = RollingWindow(window=60, bucket_size=10)
+
+    rolling_window.add(entities[0], timestamp=1000)
+    rolling_window.add(entities[1], timestamp=1015)
+    rolling_window.add(entities[2], timestamp=1012)
+
+    assert rolling_window.statistics() == collect_statistics(entities[:3])
+
+    rolling_window.add(entities[3], timestamp=1071)
+
+    assert rolling_window.statistics() == collect_statistics(entities[1:])
+    assert len(rolling_window._buckets) == 2
+
+    rolling_window.add(entities[0], timestamp=1005)
+
+    assert rolling_window.statistics() == collect_statistics(entities[1:])
+
+
+def test_rolling_window_parses_timestamps():
+    entities = data_formater(TEST_LOG_LINES)
+    rolling_window = RollingWindow(window=300, bucket_size=10)
+
+    for entity in entities:
+        rolling_window.add(entity)
+
+    assert rolling_window.latest == 1707575470
+    assert rolling_window.statistics() == collect_statistics(entities[2:])
+
+
+def test_follow_lines(tmp_path: Path):
+    log_file = tmp_path / "access.log"
+    log_file.write_text(TEST_LOG_LINES[0], encoding="utf-8")
+    lines = follow_lines(log_file, poll_interval=0)
+
+    assert next(lines) is None
+
+    with open(log_file, "a", encoding="utf-8") as file:
+        file.write(TEST_LOG_LINES[1][:10])
+
+    assert next(lines) is None
+
+    with open(log_file, "a", encoding="utf-8") as file:
+        file.write(TEST_LOG_LINES[1][10:])
+
+    assert next(lines) == TEST_LOG_LINES[1]
+    assert next(lines) is None
+
+    with open(log_file, "ab") as file:
+        file.write(b"\xff\xfe garbage\n")
+
+    assert next(lines) == "\ufffd\ufffd garbage\n"
+
+    log_file.rename(tmp_path / "access.log.1")
+    log_file.write_text(TEST_LOG_LINES[2], encoding="utf-8")
+
+    assert next(lines) == TEST_LOG_LINES[2]
+
+    log_file.write_text(TEST_LOG_LINES[3], encoding="utf-8")
+
+    assert next(lines) == TEST_LOG_LINES[3]
+    lines.close()
+
+
+def test_heavy_hitters_error_bounds():
+    rnd = random.Random(7)
+    stream = [f"10.0.0.{rnd.randrange(200)}" for _ in range(20_000)]
+    stream += ["192.168.1.1"] * 3000 + ["192.168.1.2"] * 2000
+    rnd.shuffle(stream)
+    exact = Counter(stream)
+    sketch = HeavyHitters(capacity=50)
+
+    for ip in stream:
+        sketch[ip] += 1
+
+    assert len(sketch) <= 100
+    assert sketch.error <= len(stream) / 51
+    assert [ip for ip, _ in sketch.most_common(2)] == ["192.168.1.1", "192.168.1.2"]
+
+    for ip, count in sketch.items():
+        assert count <= exact[ip] <= count + sketch.error
+
+
+def test_heavy_hitters_merge_and_pickle():
+    stream = [f"10.0.0.{index % 300}" for index in range(10_000)] + ["192.168.1.1"] * 500
+    exact = Counter(stream)
+    left, right = HeavyHitters(capacity=20), HeavyHitters(capacity=20)
+
+    for ip in stream[::2]:
+        left[ip] += 1
+    for ip in stream[1::2]:
+        right[ip] += 1
+
+    left.update(pickle.loads(pickle.dumps(right)))
+
+    assert len(left) <= 20
+    assert left.most_common(1)[0][0] == "192.168.1.1"
+
+    for ip, count in left.items():
+        assert count <= exact[ip] <= count + left.error
+
+
+def test_collect_parallel_approx(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES * 50), encoding="utf-8")
+
+    result = collect_parallel(log_file, workers=3, options=AnalysisOptions(ip_capacity=2))
+    restored = LogStatistics.from_dict(json.loads(json.dumps(result.to_dict())))
+
+    assert isinstance(result.ip_requests, HeavyHitters)
+    assert result.ip_requests.most_common(1)[0][0] == "192.168.1.1"
+    assert result.count == 200
+    assert restored == result
+    assert restored.ip_requests.error == result.ip_requests.error
+
+
+def test_main_approx_reports_error(mocker: MockerFixture, tmp_path: Path):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+
+    main(argparse.Namespace(log_file=str(log_file), approx=1000))
+
+    mock_logger.info.assert_any_call("IP request counts are approximate, each may be up to 0 higher")
+
+
+def test_nginx_log_is_slotted():
+    entity = data_formater(TEST_LOG_LINES[:1])[0]
+
+    assert not hasattr(entity, "__dict__")
+
+
+def test_log_batch_matches_records():
+    batch = batch_formater(TEST_LOG_LINES * 3)
+
+    assert len(batch) == 12
+    assert batch.ip_values == ["192.168.1.1", "203.0.113.45", "172.16.0.23"]
+    assert list(batch)[:2] == [("192.168.1.1", 200, 1024), ("203.0.113.45", 401, 512)]
+    assert collect_statistics(batch) == collect_statistics(data_formater(TEST_LOG_LINES * 3))
+    assert list(collect_statistics(batch).ip_requests) == batch.ip_values
+
+
+def test_analyze_data_accepts_log_batch(mocker: MockerFixture):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+
+    analyze_data(LogBatch.from_fields([("10.0.0.1", 404, 100), ("10.0.0.2", 503, 300)]))
+
+    mock_logger.info.assert_any_call("Average weight of responses: 200.0")
+    mock_logger.info.assert_any_call("Top 3 client errors: [(404, 1)]")
+    mock_logger.info.assert_any_call("Top 3 server errors: [(503, 1)]")
+
+
+def test_log_batch_memory_per_million_records():
+    records = 100_000
+    fields = [(f"10.0.{index % 100}.{index % 250}", 200, index) for index in range(records)]
+
+    tracemalloc.start()
+    batch = LogBatch.from_fields(fields)
+    batch_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    entities = [
+        NginxLog(ip=ip, timestamp="10/Feb/2024:13:55:36 +0000", method="GET", path_="/ ", status=status,
+                 response_size=size)
+        for ip, status, size in fields
+    ]
+    records_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    batch_mb_per_million = batch_bytes * (1_000_000 / records) / 1024 ** 2
+
+    assert len(batch) == len(entities)
+    assert batch_mb_per_million < 20
+    assert batch_bytes * 4 < records_bytes
+
+
+def test_aggregate_batch_matches_python():
+    pytest.importorskip("numpy")
+    from cli_log_analyzer.vectorized import aggregate_batch
+
+    rnd = random.Random(11)
+    statuses = [200, 201, 304, 400, 401, 403, 404, 500, 502, 503]
+    batch = LogBatch.from_fields(
+        (f"10.0.{rnd.randrange(4)}.{rnd.randrange(50)}", rnd.choice(statuses), rnd.randrange(10_000))
+        for _ in range(20_000)
+    )
+
+    result = aggregate_batch(batch)
+    expected = collect_fields(batch)
+
+    assert result == expected
+    assert list(result.ip_requests) == list(expected.ip_requests)
+    assert list(result.client_errors) == list(expected.client_errors)
+    assert list(result.server_errors) == list(expected.server_errors)
+    assert result.ip_requests.most_common(5) == expected.ip_requests.most_common(5)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_collect_files_numpy_backend(tmp_path: Path, use_mmap: bool):
+    pytest.importorskip("numpy")
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES * 50), encoding="utf-8")
+
+    options = AnalysisOptions(use_mmap=use_mmap, backend="numpy")
+
+    assert collect_files([log_file], workers=1, options=options) == collect_files([log_file])
+    assert collect_files([log_file], workers=2, options=options) == collect_files([log_file])
+
+
+@pytest.mark.parametrize("block_size", [64, 1000, 1 << 20])
+def test_collect_mmap_vectorized_matches_python(tmp_path: Path, block_size: int):
+    pytest.importorskip("numpy")
+    from cli_log_analyzer.vectorized import aggregate_matches
+
+    long_ip = "host-" + "x" * 80
+    lines = TEST_LOG_LINES * 20 + [TEST_LOG_LINES[2].replace("172.16.0.23", long_ip).replace(" 2048", " -")]
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(lines).rstrip("\n"), encoding="utf-8")
+    groups = ("ip", "status", "response_size")
+
+    assert compile_fields_pattern(LOG_PATTERN_BYTES).groupindex == {"ip": 1, "status": 2, "response_size": 3}
+
+    result = LogStatistics()
+    for matches in iter_mmap_matches(log_file, pattern=LOG_PATTERN_BYTES, block_size=block_size):
+        result.merge(aggregate_matches(matches, groups))
+    expected = collect_statistics(data_formater(lines))
+
+    assert result == expected
+    assert list(result.ip_requests) == list(expected.ip_requests)
+    assert result.ip_requests[long_ip] == 1
+
+
+def test_iter_mmap_matches_reports_malformed_entry(tmp_path: Path):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES[:2]) + 'bad "line\n' + "".join(TEST_LOG_LINES[2:]), encoding="utf-8")
+
+    with pytest.raises(AttributeError, match="bad"):
+        for _ in iter_mmap_matches(log_file):
+            pass
+
+
+def test_parse_request_time():
+    line = TEST_LOG_LINES[0].rstrip("\n") + ' "-" "curl/8.0" 0.125\n'
+
+    assert data_formater([line])[0].request_time == 0.125
+    assert data_formater(TEST_LOG_LINES[:1])[0].request_time is None
+
+
+def test_quantile_sketch_relative_accuracy():
+    rnd = random.Random(3)
+    values = [rnd.lognormvariate(8, 2) for _ in range(50_000)] + [0] * 100
+    left, right = QuantileSketch(0.01), QuantileSketch(0.01)
+
+    for index, value in enumerate(values):
+        (left if index % 2 else right).add(value)
+
+    left.merge(QuantileSketch.from_dict(json.loads(json.dumps(right.to_dict()))))
+    ordered = sorted(values)
+
+    assert left.count == len(values)
+    assert len(left.bins) < 2000
+
+    for q in [0.5, 0.95, 0.99]:
+        expected = ordered[int(q * (len(ordered) - 1))]
+        assert abs(left.quantile(q) - expected) <= 0.011 * expected
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_collect_files_with_metrics(tmp_path: Path, workers: int):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES * 25), encoding="utf-8")
+    options = AnalysisOptions(
+        use_mmap=True,
+        metrics=("size_percentiles", "request_time_percentiles", "paths", "per_minute"),
+    )
+
+    result = collect_files([log_file], workers=workers, options=options)[0]
+    restored = LogStatistics.from_dict(json.loads(json.dumps(result.to_dict())))
+
+    assert result.count == 100
+    assert restored == result
+    size_percentiles = result.metrics["size_percentiles"].result()["Response size percentiles"]
+
+    assert [label for label, _ in size_percentiles] == ["p50", "p95", "p99"]
+    assert [value for _, value in size_percentiles] == pytest.approx([512, 2048, 2048], rel=0.01)
+    assert result.metrics["request_time_percentiles"].result() == {
+        "Request time percentiles": "No request times in the log format",
+    }
+    assert result.metrics["paths"].result()["Top 10 paths"][0] == ("/index.html", 25)
+    assert result.metrics["per_minute"].result() == {
+        "Requests and errors per minute": [
+            ("2024-02-10 13:55", 25, 0),
+            ("2024-02-10 14:02", 25, 25),
+            ("2024-02-10 14:30", 25, 25),
+            ("2024-02-10 14:31", 25, 25),
+        ],
+    }
+
+
+def test_aggregator_requires_all_methods():
+    class PartialAggregator(Aggregator):
+        def add(self, entity: NginxLog) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialAggregator()
+
+
+def test_main_with_metrics(mocker: MockerFixture, tmp_path: Path):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+
+    main(argparse.Namespace(log_file=str(log_file), metrics=["paths"]))
+
+    mock_logger.info.assert_any_call(
+        "Top 10 paths: [('/index.html', 1), ('/api/login', 1), ('/dashboard', 1), ('/missing', 1)]"
+    )
+
+
+CUSTOM_LOG_FORMAT = '$status $body_bytes_sent $remote_addr [$time_local] "$request" rt=$request_time host=$host'
+CUSTOM_LOG_LINES = [
+    '200 1024 192.168.1.1 [10/Feb/2024:13:55:36 +0000] "GET /index.html HTTP/1.1" rt=0.120 host=example.com\n',
+    '401 - 203.0.113.45 [10/Feb/2024:14:02:15 +0000] "POST /api/login HTTP/1.1" rt=0.050 host=example.com\n',
+    '500 2048 172.16.0.23 [10/Feb/2024:14:30:10 +0000] "GET /dashboard HTTP/1.1" rt=1.500 host=example.org\n',
+]
+
+
+def test_compile_log_format_captures_only_needed_fields():
+    log_format = compile_log_format(CUSTOM_LOG_FORMAT)
+
+    assert log_format.fields == {"ip", "status", "response_size"}
+    assert log_format.pattern.groups == 3
+    assert log_format.parse(CUSTOM_LOG_LINES[1]) == NginxLog(
+        ip="203.0.113.45",
+        timestamp="",
+        method="",
+        path_="",
+        status=401,
+        response_size=0,
+    )
+
+    full_format = compile_log_format(CUSTOM_LOG_FORMAT, frozenset({"timestamp", "path_", "request_time"}))
+
+    assert full_format.parse(CUSTOM_LOG_LINES[2]) == NginxLog(
+        ip="172.16.0.23",
+        timestamp="10/Feb/2024:14:30:10 +0000",
+        method="GET",
+        path_="/dashboard ",
+        status=500,
+        response_size=2048,
+        request_time=1.5,
+    )
+    with pytest.raises(AttributeError):
+        full_format.parse(TEST_LOG_LINES[0])
+
+
+def test_compile_log_format_requires_base_fields():
+    with pytest.raises(ValueError, match="response_size"):
+        compile_log_format("$remote_addr $status")
+
+
+def test_follow_requires_time_local(tmp_path: Path):
+    log_file = tmp_path / "access.log"
+    log_file.touch()
+
+    with pytest.raises(ValueError, match="time_local"):
+        follow(log_file, log_format='$remote_addr "$request" $status $body_bytes_sent')
+
+    with pytest.raises(SystemExit):
+        get_args([str(log_file), "--follow", "--log-format", '$remote_addr "$request" $status $body_bytes_sent'])
+
+    args = get_args([str(log_file), "--follow", "--log-format", "$remote_addr [${time_local}] $status $body_bytes_sent"])
+
+    assert args.follow
+
+
+def test_main_follow_uses_output_settings(mocker: MockerFixture, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    log_file = tmp_path / "access.log"
+    log_file.touch()
+
+    def appended_lines(*args, **kwargs):
+        yield from TEST_LOG_LINES
+        raise KeyboardInterrupt
+
+    mocker.patch("cli_log_analyzer.follow.follow_lines", appended_lines)
+    args = get_args([
+        str(log_file), "--follow", "--interval", "0", "--format", "json", "--output", "window.json", "--quiet",
+    ])
+
+    main(args)
+
+    reports = json.loads((tmp_path / "window.json").read_text(encoding="utf-8"))
+
+    assert [report["source"] for report in reports] == [f"{log_file} (last 300 s)"]
+    assert reports[0]["requests"] == 2
+    assert not (tmp_path / "analysis_result.txt").exists()
+    mock_logger.info.assert_not_called()
+
+
+@pytest.mark.parametrize("command", [["index"], ["analyze", "--index", "rollups.db"]])
+def test_index_requires_time_local(tmp_path: Path, command: list[str]):
+    log_file = tmp_path / "access.log"
+    log_file.write_text("127.0.0.1 200 512\n", encoding="utf-8")
+    options = AnalysisOptions(log_format="$remote_addr $status $body_bytes_sent", lenient=True)
+
+    with pytest.raises(ValueError, match="time_local"):
+        index_files([log_file], tmp_path / "rollups.db", options=options)
+
+    with pytest.raises(SystemExit):
+        get_args([*command, str(log_file), "--log-format", "$remote_addr $status $body_bytes_sent"])
+
+    args = get_args([*command, str(log_file), "--log-format", "$remote_addr [$time_local] $status $body_bytes_sent"])
+
+    assert args.log_format == "$remote_addr [$time_local] $status $body_bytes_sent"
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_collect_files_custom_log_format(tmp_path: Path, use_mmap: bool):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(CUSTOM_LOG_LINES), encoding="utf-8")
+    options = AnalysisOptions(use_mmap=use_mmap, log_format=CUSTOM_LOG_FORMAT)
+
+    result = collect_files([log_file], workers=2, options=options)[0]
+
+    assert result == LogStatistics(
+        total_size=3072,
+        count=3,
+        ip_requests=Counter({"192.168.1.1": 1, "203.0.113.45": 1, "172.16.0.23": 1}),
+        client_errors=Counter({401: 1}),
+        server_errors=Counter({500: 1}),
+    )
+
+    options = AnalysisOptions(log_format=CUSTOM_LOG_FORMAT, metrics=("request_time_percentiles",))
+    result = collect_files([log_file], options=options)[0]
+
+    assert result.metrics["request_time_percentiles"].sketch.count == 3
+
+
+@pytest.mark.parametrize(
+    "metric, variables",
+    [("per_minute", r"\$time_local"), ("paths", r"\$request"), ("request_time_percentiles", None)],
+)
+def test_metrics_require_their_log_format_fields(tmp_path: Path, metric: str, variables: str | None):
+    log_file = tmp_path / "test.log"
+    log_file.write_text("127.0.0.1 200 512\n", encoding="utf-8")
+    options = AnalysisOptions(log_format="$remote_addr $status $body_bytes_sent", metrics=(metric,), lenient=True)
+
+    if variables is None:
+        assert collect_files([log_file], options=options)[0].count == 1
+    else:
+        with pytest.raises(ValueError, match=f"{metric} metric requires a log format with {variables}"):
+            collect_files([log_file], options=options)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_collect_files_lenient(tmp_path: Path, use_mmap: bool, workers: int):
+    lines = TEST_LOG_LINES * 10
+    lines[3] = "garbage\n"
+    lines[20] = "192.168.1.1 - - [broken timestamp] \"GET / HTTP/1.1\" 200 1\n"
+    lines[37] = "\n"
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(lines), encoding="utf-8")
+    options = AnalysisOptions(use_mmap=use_mmap, lenient=True, max_samples=2)
+
+    result = collect_files([log_file], workers=workers, options=options)[0]
+
+    assert result.count == 37
+    assert result.bad_lines == BadLines(
+        count=3,
+        samples=[(4, "garbage"), (21, lines[20].rstrip("\n"))],
+        max_samples=2,
+    )
+    assert LogStatistics.from_dict(json.loads(json.dumps(result.to_dict()))) == result
+
+    with pytest.raises(AttributeError):
+        collect_files([log_file], workers=workers, options=AnalysisOptions(use_mmap=use_mmap))
+
+
+@pytest.mark.parametrize("compress", [None, gzip.compress])
+@pytest.mark.parametrize("use_mmap, backend", [(False, "python"), (True, "python"), (False, "numpy")])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_collect_files_lenient_invalid_utf8(tmp_path: Path, compress, use_mmap: bool, backend: str, workers: int):
+    content = "".join(TEST_LOG_LINES).encode()
+    content += b"\xff\xfe garbage\n" + TEST_LOG_LINES[0].replace("192.168.1.1", "10.0.0.\xff").encode("latin-1")
+    log_file = tmp_path / "test.log"
+    log_file.write_bytes(compress(content) if compress else content)
+    options = AnalysisOptions(use_mmap=use_mmap, backend=backend, lenient=True)
+
+    result = collect_files([log_file], workers=workers, options=options)[0]
+
+    assert result.count == 5
+    assert result.ip_requests["10.0.0.\ufffd"] == 1
+    assert result.bad_lines == BadLines(count=1, samples=[(5, "\ufffd\ufffd garbage")])
+
+
+def test_main_lenient_reports_skip_rate(mocker: MockerFixture, tmp_path: Path):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES) + "garbage\n", encoding="utf-8")
+
+    main(argparse.Namespace(log_file=str(log_file), lenient=True))
+
+    mock_logger.info.assert_any_call("Skipped malformed lines: 1 of 5 (20.00%)")
+    mock_logger.info.assert_any_call("Malformed line samples: [(5, 'garbage')]")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_index_files_and_query(tmp_path: Path, workers: int):
+    first_file = tmp_path / "first.log"
+    second_file = tmp_path / "second.log.gz"
+    first_file.write_text("".join(TEST_LOG_LINES[:2]), encoding="utf-8")
+    second_file.write_bytes(gzip.compress("".join(TEST_LOG_LINES[2:]).encode()))
+    index_path = tmp_path / "index.db"
+
+    index_files([first_file, second_file], index_path, workers)
+    # Only appended lines are indexed by the next run.
+    with open(first_file, "a", encoding="utf-8") as file:
+        file.write(TEST_LOG_LINES[0])
+    index_files([first_file, second_file], index_path, workers)
+
+    assert query_index(index_path) == LogStatistics(
+        total_size=4864,
+        count=5,
+        ip_requests=Counter({"192.168.1.1": 3, "203.0.113.45": 1, "172.16.0.23": 1}),
+        client_errors=Counter({401: 1, 404: 1}),
+        server_errors=Counter({500: 1}),
+    )
+    assert query_index(index_path, parse_time("2024-02-10T14:00"), parse_time("2024-02-10T15:00")) == LogStatistics(
+        total_size=2816,
+        count=3,
+        ip_requests=Counter({"203.0.113.45": 1, "172.16.0.23": 1, "192.168.1.1": 1}),
+        client_errors=Counter({401: 1, 404: 1}),
+        server_errors=Counter({500: 1}),
+    )
+    assert query_index(index_path, until=parse_time("2024-02-10")).count == 0
+
+
+def test_query_index_reads_only_reported_entries(tmp_path: Path):
+    rnd = random.Random(3)
+    lines = [
+        f"10.0.0.{rnd.randrange(20)} - - [10/Feb/2024:1{hour}:00:00 +0000] "
+        f"\"GET / HTTP/1.1\" {rnd.choice([200, 400, 401, 403, 404, 500, 502, 503, 504])} 100\n"
+        for hour in range(4)
+        for _ in range(200)
+    ]
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(lines), encoding="utf-8")
+    index_path = tmp_path / "index.db"
+
+    index_files([log_file], index_path)
+    result = query_index(index_path)
+    expected = build_report(collect_files([log_file])[0])
+
+    assert len(result.ip_requests) == 5
+    assert len(result.client_errors) == len(result.server_errors) == 3
+    assert build_report(result) == expected
+
+
+def test_main_index_commands(mocker: MockerFixture, tmp_path: Path):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    mocker.patch("cli_log_analyzer.log_analyzer.write_reports")
+    log_file = tmp_path / "test.log"
+    log_file.write_text("".join(TEST_LOG_LINES), encoding="utf-8")
+    index_path = tmp_path / "index.db"
+
+    main(get_args(["index", str(log_file), "--index", str(index_path)]))
+    main(get_args(["--index", str(index_path), "--since", "2024-02-10T14:00"]))
+
+    mock_logger.info.assert_any_call("Top 5 IP requests: [('203.0.113.45', 1), ('172.16.0.23', 1), ('192.168.1.1', 1)]")
+    assert get_args([str(log_file)]).command == "analyze"
+
+    with pytest.raises(FileNotFoundError):
+        main(get_args(["--index", str(tmp_path / "missing.db")]))
+
+
+@pytest.mark.parametrize("output_format", ["json", "ndjson", "csv", "text"])
+def test_main_writes_structured_reports(mocker: MockerFixture, tmp_path: Path, output_format: str):
+    mock_logger = mocker.patch("cli_log_analyzer.utilities.logging")
+    (tmp_path / "access.log").write_text("".join(TEST_LOG_LINES[:2]), encoding="utf-8")
+    (tmp_path / "access.log.1").write_text("".join(TEST_LOG_LINES[2:]), encoding="utf-8")
+    output = tmp_path / f"report.{output_format}"
+
+    main(get_args([
+        str(tmp_path / "access.log*"),
+        "--per-file",
+        "--metrics", "paths",
+        "--format", output_format,
+        "--output", str(output),
+        "--quiet",
+    ]))
+
+    mock_logger.info.assert_not_called()
+    content = output.read_text(encoding="utf-8")
+
+    if output_format == "json":
+        reports = json.loads(content)
+    elif output_format == "ndjson":
+        reports = [json.loads(line) for line in content.splitlines()]
+    elif output_format == "csv":
+        rows = list(csv.DictReader(content.splitlines()))
+
+        assert {"source": "", "metric": "average_response_size", "key": "", "value": "960.0"} in rows
+        assert {"source": "", "metric": "top_ips", "key": "192.168.1.1", "value": "2"} in rows
+        assert {"source": "", "metric": "Top 10 paths", "key": "/dashboard", "value": "1"} in rows
+        return
+    else:
+        assert content.count("Average weight of responses:") == 3
+        assert "Top 3 client errors: [(401, 1), (404, 1)]\n" in content
+        return
+
+    assert len(reports) == 3
+    assert reports[-1] == {
+        "source": None,
+        "requests": 4,
+        "average_response_size": 960.0,
+        "top_ips": [["192.168.1.1", 2], ["203.0.113.45", 1], ["172.16.0.23", 1]],
+        "ip_error": None,
+        "top_client_errors": [[401, 1], [404, 1]],
+        "top_server_errors": [[500, 1]],
+        "metrics": {
+            "Top 10 paths": [["/index.html", 1], ["/api/login", 1], ["/dashboard", 1], ["/missing", 1]],
+        },
+        "skipped_lines": 0,
+        "malformed_samples": [],
+    }
+
+
+def test_timestamp_decoder_matches_strptime():
+    rnd = random.Random(7)
+    decoder = TimestampDecoder()
+    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+    for _ in range(2000):
+        value = (
+            f"{rnd.randrange(1, 29):02d}/{rnd.choice(months)}/{rnd.randrange(1990, 2040)}:"
+            f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d} "
+            f"{rnd.choice('+-')}{rnd.randrange(15):02d}{rnd.choice([0, 30, 45]):02d}"
+        )
+
+        assert decoder(value) == parse_timestamp_strptime(value)
+        # The cached second is returned for a repeated value.
+        assert decoder(value) == parse_timestamp_strptime(value)
+
+
+@pytest.mark.parametrize("value", [
+    "",
+    "10/Feb/2024 13:55:36 +0000",
+    "10/Fbr/2024:13:55:36 +0000",
+    "30/Feb/2024:13:55:36 +0000",
+    "10/Feb/2024:25:55:36 +0000",
+    "10/Feb/2024:13:55:36 *0000",
+    "10/Feb/2024:13:55:36 +00:0",
+])
+def test_timestamp_decoder_rejects_invalid_values(value: str):
+    with pytest.raises(ValueError):
+        TimestampDecoder()(value)